@@ -0,0 +1,173 @@
+"""
+Precalculado de niveles: escribe un único artefacto por mapa con todo lo que el juego calcula al arrancar
+(colisionadores, la rejilla de su índice espacial, la NavMesh con portales y adyacencia y las tablas de caminos).
+
+Uso, desde src/:
+	python -m imports.bake ../assets/mapa/mapa.tmx [--force]
+
+El artefacto usa el formato de mesh_cache y su clave es la huella del TMX, de sus tilesets externos y de
+las opciones de la malla, así que si nada ha cambiado el mapa se salta.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+import numpy as np
+import pygame
+import pytmx
+from imports.map.mapa import load_obstacles, merge_obstacles
+from imports.map.obstacle_index import OBSTACLE_CELL_SIZE, ObstacleIndex
+from imports.mesh_cache import read_cache, write_cache
+from imports.nav_mesh import NavMesh, SPATIAL_CELL_SIZE
+
+# Versión del contenido del artefacto: cambiarla obliga a repetir el precalculado de todos los mapas
+BAKE_VERSION = 4
+# Datos derivados de la NavMesh que usa el juego (Game los pide con estas mismas opciones)
+NAV_MESH_OPTIONS = {'build_path_table': True, 'cluster_size': 256, 'landmark_count': 16}
+BAKE_DIR = Path(__file__).resolve().parents[1] / "database"
+
+OBSTACLE_KINDS = ('rect', 'poly', 'edges')
+
+def artifact_path(tmx_path):
+	return BAKE_DIR / f"{Path(tmx_path).stem}.bake"
+
+def input_hash(tmx_path):
+	"""Huella SHA-256 del TMX, de los tilesets externos que referencia y de las opciones del precalculado."""
+	tmx_path = Path(tmx_path)
+	digest = hashlib.sha256()
+	digest.update(json.dumps({
+		'bake': BAKE_VERSION,
+		'nav_mesh': NAV_MESH_OPTIONS,
+		'spatial_cell_size': SPATIAL_CELL_SIZE,
+		'obstacle_cell_size': OBSTACLE_CELL_SIZE,
+	}, sort_keys=True).encode('utf-8'))
+	data = tmx_path.read_bytes()
+	digest.update(data)
+	# Los colisionadores de los tiles viven en los .tsx: también forman parte de la entrada
+	for tileset in ElementTree.fromstring(data).iter('tileset'):
+		source = tileset.get('source')
+		if source is not None:
+			digest.update(source.encode('utf-8'))
+			digest.update((tmx_path.parent / source).read_bytes())
+	return digest.hexdigest()
+
+def _obstacle_arrays(obstacles, obstacle_grid):
+	# Cada obstáculo es un tramo de obstacle_points: un rect guarda (left, top) y (width, height),
+	# un polígono sus vértices y una lista de aristas los dos extremos de cada segmento.
+	# En float64 para no truncar vértices con decimales (los enteros de los rects se conservan exactos)
+	points = []
+	offsets = [0]
+	for kind, shape in obstacles:
+		if kind == 'rect':
+			points.extend([(shape.left, shape.top), (shape.width, shape.height)])
+		elif kind == 'edges':
+			points.extend((x, y) for segment in shape for x, y in segment)
+		else:
+			points.extend((x, y) for x, y in shape)
+		offsets.append(len(points))
+	cells = obstacle_grid['cells']
+	return {
+		'obstacle_kinds': np.array([OBSTACLE_KINDS.index(kind) for kind, _ in obstacles], dtype=np.uint8),
+		'obstacle_offsets': np.array(offsets, dtype=np.int64),
+		'obstacle_points': np.array(points, dtype=np.float64).reshape(-1, 2),
+		'obstacle_cell_keys': np.array(list(cells), dtype=np.int64).reshape(-1, 2),
+		'obstacle_cell_offsets': np.cumsum([0] + [len(items) for items in cells.values()]).astype(np.int64),
+		'obstacle_cell_items': np.array([i for items in cells.values() for i in items], dtype=np.int32),
+	}
+
+def _obstacles_from_arrays(arrays):
+	kinds = arrays['obstacle_kinds'].tolist()
+	offsets = arrays['obstacle_offsets'].tolist()
+	points = [tuple(point) for point in arrays['obstacle_points'].tolist()]
+	obstacles = []
+	for i, kind in enumerate(kinds):
+		shape = points[offsets[i]:offsets[i + 1]]
+		if OBSTACLE_KINDS[kind] == 'rect':
+			(left, top), (width, height) = shape
+			obstacles.append(('rect', pygame.Rect(int(left), int(top), int(width), int(height))))
+		elif OBSTACLE_KINDS[kind] == 'edges':
+			obstacles.append(('edges', list(zip(shape[0::2], shape[1::2]))))
+		else:
+			obstacles.append(('poly', shape))
+	return obstacles
+
+def _obstacle_grid_from_arrays(meta, arrays):
+	offsets = arrays['obstacle_cell_offsets'].tolist()
+	items = arrays['obstacle_cell_items'].tolist()
+	return {
+		'cell_size': meta['cell_size'],
+		'cells': {
+			(cx, cy): items[offsets[i]:offsets[i + 1]]
+			for i, (cx, cy) in enumerate(arrays['obstacle_cell_keys'].tolist())
+		},
+	}
+
+def bake(tmx_path, force=False):
+	"""Escribe el artefacto de tmx_path. Devuelve False si ya estaba al día (y no se pidió force)."""
+	path = artifact_path(tmx_path)
+	key = input_hash(tmx_path)
+	if not force and read_cache(path, key) is not None:
+		print(f"{tmx_path}: sin cambios, se conserva {path}")
+		return False
+
+	started = time.perf_counter()
+	# Sin imágenes: basta con los datos del TMX y no hace falta abrir una ventana
+	tmx_data = pytmx.TiledMap(str(tmx_path))
+	obstacles = merge_obstacles(load_obstacles(tmx_data))
+	obstacle_grid = ObstacleIndex(obstacles, OBSTACLE_CELL_SIZE).grid
+	# Desde el TMX: el artefacto no depende de la caché del juego ni la modifica
+	nav_mesh = NavMesh(tmx_data, cache_path=None, **NAV_MESH_OPTIONS)
+	nav_meta, nav_arrays = nav_mesh.to_arrays()
+
+	arrays = _obstacle_arrays(obstacles, obstacle_grid)
+	arrays.update({f"nav_{name}": array for name, array in nav_arrays.items()})
+	meta = {
+		'map': {
+			'tmx': Path(tmx_path).name,
+			'width_pixels': tmx_data.width * tmx_data.tilewidth,
+			'height_pixels': tmx_data.height * tmx_data.tileheight,
+		},
+		'obstacle_grid': {'cell_size': obstacle_grid['cell_size']},
+		'nav_mesh': nav_meta,
+	}
+	path.parent.mkdir(parents=True, exist_ok=True)
+	write_cache(path, key, meta, arrays)
+	print(
+		f"{tmx_path}: {len(obstacles)} obstáculos, {len(nav_mesh.nodes)} nodos, {len(nav_mesh.edges)} aristas "
+		f"-> {path} ({path.stat().st_size / 1024:.0f} KiB, {time.perf_counter() - started:.2f} s)"
+	)
+	return True
+
+def load_artifact(tmx_path):
+	"""
+	Datos precalculados de tmx_path si su artefacto existe y coincide con el TMX actual; si no, None.
+	Devuelve {'map', 'obstacles', 'obstacle_grid', 'nav_mesh': (metadatos, arrays)}, listo para Map y NavMesh.
+	"""
+	path = artifact_path(tmx_path)
+	cached = read_cache(path, input_hash(tmx_path))
+	if cached is None:
+		print(f"No hay artefacto precalculado al día para {tmx_path} (python -m imports.bake desde src/)")
+		return None
+	meta, arrays = cached
+	print(f"Cargando nivel precalculado: {path}")
+	return {
+		'map': meta['map'],
+		'obstacles': _obstacles_from_arrays(arrays),
+		'obstacle_grid': _obstacle_grid_from_arrays(meta['obstacle_grid'], arrays),
+		'nav_mesh': (meta['nav_mesh'], {name[len("nav_"):]: array for name, array in arrays.items() if name.startswith("nav_")}),
+	}
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog="python -m imports.bake", description="Precalcula los datos de navegación y colisión de cada mapa.")
+	parser.add_argument("maps", nargs="+", help="ficheros .tmx")
+	parser.add_argument("--force", action="store_true", help="rehace el artefacto aunque el mapa no haya cambiado")
+	args = parser.parse_args(argv)
+	for tmx_path in args.maps:
+		bake(tmx_path, force=args.force)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
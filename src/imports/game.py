@@ -5,8 +5,17 @@ from imports.renderer import Renderer
 from imports.map.mapa import Map
 from imports.player.player import Player
 from imports.scenario_factory import ScenarioFactory
-from imports.pathfinding.a_star import a_star_search, draw_path
+from imports.pathfinding.a_star import draw_path
+from imports.pathfinding.path_planner import PathPlanner
+from imports.pathfinding.hierarchical import HierarchicalPlanner
+from imports.pathfinding.path_pool import PathWorkerPool
+from imports.pathfinding.path_queue import PathRequestQueue
+from imports.pathfinding.flow_field import FlowField
+from imports.pathfinding.landmarks import compare_heuristics
+from imports.pathfinding.jps import GridPlanner, compare_planners
 from imports.nav_mesh import NavMesh
+from imports.bake import NAV_MESH_OPTIONS, load_artifact
+from imports.pathfinding.node_tracker import NodeTracker
 from imports.objects.game_obj import HoneyPot, PowerUp, SpiderWeb, SeedProjectile
 from imports.npc.hsm_data import build_tejedora_hsm, build_cazadora_hsm, build_criadora_hsm
 from imports.npc.npc import NPC
@@ -16,7 +25,9 @@ class Game:
         self.screen = pygame.display.set_mode((800, 600))
         pygame.display.set_caption("Bee-Collector")
         self.clock = pygame.time.Clock()
-        self.map = Map('assets/mapa/mapa.tmx')
+        # Colisionadores y NavMesh precalculados con imports.bake (None si falta o el mapa cambió)
+        self.baked_level = load_artifact('assets/mapa/mapa.tmx')
+        self.map = Map('assets/mapa/mapa.tmx', baked=self.baked_level)
         self.renderer = Renderer(self.screen, self.map)
         self.player = Player(
             "Hero", 
@@ -28,6 +39,11 @@ class Game:
         self.enemies = []
         self.uses_rotation = False
         self.test_path = []
+        self.test_path_nodes = None     # posiciones de los nodos de test_path si no son de la NavMesh
+        # Modo de búsqueda del click: 'flat' (A* sobre toda la malla), 'hierarchical' (HPA*) o 'grid' (JPS)
+        self.path_mode = 'flat'
+        # Rejilla de celdas rasterizada a partir de los colisionadores del mapa (Jump Point Search)
+        self.grid_planner = GridPlanner(self.map)
 
         self.honey_pots = pygame.sprite.Group()
         self.power_ups = pygame.sprite.Group()
@@ -38,11 +54,30 @@ class Game:
         self.show_loading_screen("Cargando Navigation Mesh...")
 
         try:
-            self.nav_mesh = NavMesh(self.map.tmx_data)
+            self.nav_mesh = NavMesh(
+                self.map.tmx_data,
+                baked=self.baked_level['nav_mesh'] if self.baked_level is not None else None,
+                **NAV_MESH_OPTIONS
+            )
+            self.path_planner = PathPlanner(self.nav_mesh, heuristic='alt')
+            self.hierarchical_planner = HierarchicalPlanner(self.nav_mesh, cluster_size=NAV_MESH_OPTIONS['cluster_size'])
+            # Pool de búsquedas asíncronas (los procesos sólo se crean con la primera petición)
+            self.path_pool = PathWorkerPool(self.nav_mesh, planner=self.path_planner)
+            # Cola de búsquedas repartidas entre frames (como mucho budget_ms por frame)
+            self.path_queue = PathRequestQueue(self.path_planner, budget_ms=2.0)
+            # Campo de flujo hacia el jugador compartido por todos los perseguidores
+            self.flow_field = FlowField(self.nav_mesh)
+            # El nodo actual del jugador se actualiza junto al de los enemigos (ver _locate_agents)
+            self.player.batch_locate = True
             self._spawn_objects()
         except ValueError as e:
             print(e)
             self.nav_mesh = None
+            self.path_planner = None
+            self.hierarchical_planner = None
+            self.path_pool = None
+            self.path_queue = None
+            self.flow_field = None
         
         
     def spawn_enemy(self, enemy_type, x, y):
@@ -63,8 +98,29 @@ class Game:
             self.enemies, self.uses_rotation = self.scenario_factory.create_scenario("DynamicArrive", self.player, None)
         
         if enemy and self.nav_mesh:
+            enemy.batch_locate = True
             self.enemies.append(enemy)
 
+    def _locate_agents(self, agents=None):
+        if not self.nav_mesh:
+            return
+        # Cada agente sigue su nodo caminando por la malla; los que se pierden se localizan juntos en lote
+        lost = []
+        for agent in agents if agents is not None else [self.player] + self.enemies:
+            if agent.node_tracker is None or agent.node_tracker.nav_mesh is not self.nav_mesh:
+                agent.node_tracker = NodeTracker(self.nav_mesh, agent.current_node_id, agent.kinematic.position)
+            node_id = agent.node_tracker.track(agent.kinematic.position, agent.current_node_id)
+            if node_id is None:
+                lost.append(agent)
+            else:
+                agent.current_node_id = node_id
+        if not lost:
+            return
+        positions = [(agent.kinematic.position.x, agent.kinematic.position.y) for agent in lost]
+        for agent, position, node_id in zip(lost, positions, self.nav_mesh.locate_many(positions)):
+            agent.current_node_id = node_id
+            agent.node_tracker.reset(node_id, position)
+
     def show_loading_screen(self, message):
         self.screen.fill((20, 20, 40))
         # Configura la fuente para el mensaje.
@@ -167,6 +223,22 @@ class Game:
                     if event.key == pygame.K_g:
                         show_nav_mesh = not show_nav_mesh
                         print(f"Nav mesh display toggled to {'ON' if show_nav_mesh else 'OFF'}")
+                    elif event.key == pygame.K_h:
+                        modes = ['flat', 'hierarchical', 'grid']
+                        self.path_mode = modes[(modes.index(self.path_mode) + 1) % len(modes)]
+                        print(f"Modo de búsqueda: {self.path_mode}")
+                    elif event.key == pygame.K_l and self.nav_mesh:
+                        report = compare_heuristics(self.nav_mesh)
+                        print(f"Heurística euclídea: {report['euclidean']['expanded']} nodos expandidos ({report['euclidean']['ms']:.1f} ms)")
+                        print(f"Heurística ALT: {report['alt']['expanded']} nodos expandidos ({report['alt']['ms']:.1f} ms)")
+                        print(f"Expansiones ahorradas con ALT: {report['saved']:.0%} en {report['samples']} búsquedas")
+                    elif event.key == pygame.K_b and self.nav_mesh:
+                        report = compare_planners(self.nav_mesh, self.grid_planner)
+                        for name in ('nav_mesh', 'grid'):
+                            result = report[name]
+                            print(f"{name}: {result['ms']:.1f} ms, {result['expanded']} nodos expandidos, longitud media {result['mean_length']:.0f} px ({result['found']}/{report['samples']})")
+                    elif event.key == pygame.K_p and self.path_queue:
+                        print(f"Cola de caminos: {self.path_queue.stats()}")
                     elif event.key == pygame.K_SPACE:
                         attack_data = self.player.attack()
                         if attack_data:
@@ -180,20 +252,59 @@ class Game:
                         world_pos = (mouse_pos[0] + self.renderer.camera.x, mouse_pos[1] + self.renderer.camera.y)
                         
                         seeker = self.enemies[0]
+                        self.test_path_nodes = None
+
+                        if self.path_mode == 'grid':
+                            # Camino exacto sobre la rejilla: se siguen los puntos de salto de JPS
+                            path_cells = self.grid_planner.find_path(
+                                self.grid_planner.locate(seeker.kinematic.position),
+                                self.grid_planner.locate(world_pos)
+                            )
+                            print(f"Nodos expandidos (JPS): {self.grid_planner.last_expanded}")
+                            if path_cells:
+                                self.test_path = path_cells
+                                self.test_path_nodes = {cell: self.grid_planner.cell_center(cell) for cell in path_cells}
+                                seeker.follow_path_from_nodes(
+                                    path_cells,
+                                    self.test_path_nodes,
+                                    explicit_target=Player("Target", 0, world_pos[0], world_pos[1])
+                                )
+                            else:
+                                print("No path found between the selected cells.")
+                                self.test_path = []
+                            continue
 
                         start_node = seeker.current_node_id
                         goal_node = self.nav_mesh.find_node_at_position(world_pos)
 
                         if start_node is not None and goal_node is not None and start_node != goal_node:
                             print(f"Buscando camino desde el nodo {start_node} al nodo {goal_node}...")
-                            path_node_ids = a_star_search(start_node, goal_node, self.nav_mesh.nodes, self.nav_mesh.edges)
+                            if self.path_mode == 'hierarchical':
+                                # Búsqueda abstracta; los tramos se refinan a medida que el NPC avanza
+                                route = self.hierarchical_planner.plan(start_node, goal_node)
+                                print(f"Nodos expandidos (jerárquico): {self.hierarchical_planner.last_expanded}")
+                                if route:
+                                    self.test_path = route.nodes
+                                    seeker.follow_route(
+                                        route,
+                                        self.nav_mesh.nodes,
+                                        explicit_target=Player("Target", 0, world_pos[0], world_pos[1]),
+                                        nav_mesh=self.nav_mesh
+                                    )
+                                else:
+                                    print("No path found between the selected nodes.")
+                                    self.test_path = []
+                                continue
+                            path_node_ids = self.path_planner.find_path(start_node, goal_node)
+                            print(f"Nodos expandidos: {self.path_planner.last_expanded}")
                             if path_node_ids:
                                 print("¡Camino encontrado!", path_node_ids)
                                 self.test_path = path_node_ids
                                 seeker.follow_path_from_nodes(
                                     path_node_ids,
                                     self.nav_mesh.nodes,
-                                    explicit_target=Player("Target", 0, world_pos[0], world_pos[1])
+                                    explicit_target=Player("Target", 0, world_pos[0], world_pos[1]),
+                                    nav_mesh=self.nav_mesh
                                 )
                             else:
                                 print("No path found between the selected nodes.")
@@ -206,19 +317,21 @@ class Game:
             self.spider_projectiles.update(dt)
             # Actualizar jugador
             keys = pygame.key.get_pressed()
-            # Se pasa la lista de obstáculos al método de movimiento del jugador.
+            # Se pasa el índice de obstáculos al método de movimiento del jugador.
             self.player.move(
                 keys,
                 pygame.math.Vector2(0,0),
                 dt, 
                 bounds=(self.map.width_pixels, self.map.height_pixels), 
                 margin=(self.player.sprite_size[0] / 2, self.player.sprite_size[1] / 2),
-                obstacles=self.map.obstacles,
+                obstacles=self.map.obstacle_index,
                 nav_mesh=self.nav_mesh,
                 spider_webs=self.spider_webs
             )
             self.player.update_animation(dt)
             self.player.update(dt)
+            # Nodo actual del jugador ya movido: los enemigos lo consultan en su update
+            self._locate_agents([self.player])
 
             self._handle_collisions()
             # Actualizar enemigos
@@ -229,11 +342,19 @@ class Game:
                         uses_rotation=self.uses_rotation,
                         bounds=(self.map.width_pixels, self.map.height_pixels),
                         margin=(enemy.sprite_size[0] // 2, enemy.sprite_size[1] // 2),
-                        obstacles=self.map.obstacles,
+                        obstacles=self.map.obstacle_index,
                         nav_mesh=self.nav_mesh
                     )
                 enemy.update_animation(dt)
                 enemy.update(dt)
+            # Nodo actual de los enemigos una vez que todos se han movido, en una sola consulta en lote
+            self._locate_agents(self.enemies)
+            # Avanzar las búsquedas encoladas dentro del presupuesto del frame
+            if self.path_queue:
+                self.path_queue.tick()
+            # Enviar en un solo lote las búsquedas pedidas por los NPC en este frame
+            if self.path_pool:
+                self.path_pool.flush()
 
             # Actualizar cámara
             self.renderer.update_camera(self.player)
@@ -268,7 +389,7 @@ class Game:
                     draw_path(
                         self.screen,
                         self.test_path,
-                        self.nav_mesh.nodes,
+                        self.test_path_nodes or self.nav_mesh.nodes,
                         self.renderer.camera,
                         color=(255, 0, 0),
                         width=4
@@ -277,4 +398,6 @@ class Game:
             pygame.display.flip()
             dt = self.clock.tick(60) / 1000
             
+        if self.path_pool:
+            self.path_pool.shutdown()
         pygame.quit()
@@ -1,64 +1,165 @@
+import math
+import numpy as np
 import pygame
 import pytmx
 from typing import Any, cast  
+from imports.map.obstacle_index import ObstacleIndex
 
 class Map:
-    def __init__(self, tmx_file):
+    def __init__(self, tmx_file, baked=None):
+        # Las imágenes de los tiles siempre salen del TMX; baked (ver imports.bake.load_artifact) aporta
+        # los colisionadores y la rejilla de su índice ya calculados
         self.tmx_data = pytmx.load_pygame(tmx_file, pixelalpha=True)
         self.width_pixels = self.tmx_data.width * self.tmx_data.tilewidth
         self.height_pixels = self.tmx_data.height * self.tmx_data.tileheight
         self.obstacles = []
-        self._load_walls_and_obstacles()
+        if baked is not None:
+            self.obstacles = baked['obstacles']
+        else:
+            self._load_walls_and_obstacles()
+        # Índice espacial de los obstáculos para las consultas de colisión (Kinematic, ObstacleAvoidance)
+        self.obstacle_index = ObstacleIndex(self.obstacles, grid=baked['obstacle_grid'] if baked is not None else None)
 
     def _load_walls_and_obstacles(self):
-        # --- Procesar colisionadores ---
-        # Busca el índice de la capa llamada "walls" (donde están los tiles de colisión)
-        walls_layer = None
-        for i, layer in enumerate(self.tmx_data.layers):
-            if hasattr(layer, 'name') and layer.name == "estructuras":
-                walls_layer = i
+        self.obstacles = merge_obstacles(load_obstacles(self.tmx_data))
 
-        if walls_layer is None:
-            raise Exception("No se encontró la capa 'walls' en el mapa.")
-        
-        colliders_gen = self.tmx_data.get_tile_colliders()
-        colliders_list = list(colliders_gen)
+def merge_rects(rects):
+    """
+    Une rectángulos alineados con los ejes en rectángulos máximos que cubren exactamente la misma área.
+    Las coordenadas de los bordes se comprimen en una rejilla de celdas elementales (así sirve para
+    colisionadores de cualquier tamaño) y se recorre por filas: cada celda libre crece a la derecha
+    todo lo posible y luego hacia abajo mientras la fila entera esté ocupada. Los duplicados desaparecen solos.
+    """
+    unique = {(r.left, r.top, r.width, r.height) for r in rects if r.width > 0 and r.height > 0}
+    if not unique:
+        return []
+    xs = sorted({x for left, _, width, _ in unique for x in (left, left + width)})
+    ys = sorted({y for _, top, _, height in unique for y in (top, top + height)})
+    x_index = {x: i for i, x in enumerate(xs)}
+    y_index = {y: j for j, y in enumerate(ys)}
+    pending = np.zeros((len(ys) - 1, len(xs) - 1), dtype=bool)
+    for left, top, width, height in unique:
+        pending[y_index[top]:y_index[top + height], x_index[left]:x_index[left + width]] = True
 
-        # Para cada tile del tileset que tiene colisionador (objectgroup)
-        for i, (tile_id_local, obj_group) in enumerate(colliders_list):
-            if obj_group is not None:
-                for obj in obj_group:
-                    # Recorre todo el mapa buscando las posiciones donde ese tile está colocado
-                    for y in range(self.tmx_data.height):
-                        for x in range(self.tmx_data.width):
-                            gid = self.tmx_data.get_tile_gid(x, y, walls_layer)
-                            # Si el GID del tile en el mapa coincide con el tile_id_local del colisionador
-                            if gid == tile_id_local:
-                                # Se realiza un cast a Any para evitar errores de tipado
-                                obj_any = cast(Any, obj)
-                                
-                                # Calcula la posición base del tile en el mapa (en píxeles)
-                                tile_base_x = x * self.tmx_data.tilewidth
-                                tile_base_y = y * self.tmx_data.tileheight
+    merged = []
+    rows, cols = pending.shape
+    for j, i in zip(*np.nonzero(pending)):
+        if not pending[j, i]:
+            continue
+        i1 = i + 1
+        while i1 < cols and pending[j, i1]:
+            i1 += 1
+        j1 = j + 1
+        while j1 < rows and pending[j1, i:i1].all():
+            j1 += 1
+        pending[j:j1, i:i1] = False
+        merged.append(pygame.Rect(xs[i], ys[j], xs[i1] - xs[i], ys[j1] - ys[j]))
+    return merged
 
-                                # Verifica si el objeto de colisión es un polígono
-                                if hasattr(obj_any, 'points'):
-                                    # Es un polígono (como un triángulo).
-                                    # Calcula las coordenadas absolutas de cada punto del polígono.
-                                    points = [
-                                        (int(tile_base_x + p[0]), int(tile_base_y + p[1]))
-                                        for p in obj_any.points
-                                    ]
-                                    # Almacena el tipo de forma y la lista de puntos.
-                                    self.obstacles.append(('poly', points))
-                                else:
-                                    # Es un rectángulo.
-                                    # Crea el rectángulo de colisión en coordenadas absolutas.
-                                    rect = pygame.Rect(
-                                        int(tile_base_x + obj_any.x),
-                                        int(tile_base_y + obj_any.y),
-                                        int(obj_any.width),
-                                        int(obj_any.height)
-                                    )
-                                    # Almacena el tipo de forma y el objeto Rect.
-                                    self.obstacles.append(('rect', rect))
+def polygon_edges(polygons):
+    """
+    Lista compacta de aristas de los polígonos: cada segmento aparece una sola vez (sin importar el
+    sentido) y los colineales que se tocan o solapan se unen en uno.
+    """
+    lines = {}
+    for points in polygons:
+        for p, q in zip(points, points[1:] + points[:1]):
+            p, q = sorted((tuple(p), tuple(q)))
+            dx, dy = q[0] - p[0], q[1] - p[1]
+            if dx == 0 and dy == 0:
+                continue
+            step = math.gcd(dx, dy)
+            dx, dy = dx // step, dy // step
+            # La recta queda identificada por su dirección reducida y su desplazamiento
+            key = (dx, dy, dy * p[0] - dx * p[1])
+            lines.setdefault(key, []).append((p, q))
+
+    edges = []
+    for (dx, dy, _), segments in lines.items():
+        # Sobre una misma recta se ordenan por proyección y se unen los tramos que se tocan
+        segments.sort(key=lambda segment: segment[0][0] * dx + segment[0][1] * dy)
+        start, end = segments[0]
+        for p, q in segments[1:]:
+            if p[0] * dx + p[1] * dy <= end[0] * dx + end[1] * dy:
+                if q[0] * dx + q[1] * dy > end[0] * dx + end[1] * dy:
+                    end = q
+                continue
+            edges.append((start, end))
+            start, end = p, q
+        edges.append((start, end))
+    return edges
+
+def merge_obstacles(obstacles):
+    """
+    Posprocesa los colisionadores por tile: los rectángulos se unen en rectángulos máximos (merge_rects)
+    y los polígonos se sustituyen por una única entrada ('edges', [((x1, y1), (x2, y2)), ...]) con sus aristas.
+    """
+    merged = [('rect', rect) for rect in merge_rects([shape for kind, shape in obstacles if kind == 'rect'])]
+    edges = polygon_edges([shape for kind, shape in obstacles if kind == 'poly'])
+    if edges:
+        merged.append(('edges', edges))
+    return merged
+
+def build_gid_index(gids):
+    """
+    Índice invertido de una capa de tiles: gid -> (xs, ys) con las posiciones (en tiles) donde aparece,
+    en el orden de la capa (por filas). Se obtiene con una sola ordenación del array de gids.
+    """
+    height, width = gids.shape
+    flat = gids.ravel()
+    order = np.argsort(flat, kind='stable')
+    values, starts = np.unique(flat[order], return_index=True)
+    index = {}
+    for gid, positions in zip(values.tolist(), np.split(order, starts[1:])):
+        if gid == 0:
+            continue
+        index[gid] = (positions % width, positions // width)
+    return index
+
+def load_obstacles(tmx_data):
+    """
+    Lista de colisionadores del mapa: ('rect', pygame.Rect) o ('poly', [(x, y), ...]) en píxeles.
+    Sólo usa los datos del TMX (no las imágenes), así que sirve tanto con load_pygame como con pytmx.TiledMap.
+    """
+    obstacles = []
+    # --- Procesar colisionadores ---
+    # Busca el índice de la capa llamada "walls" (donde están los tiles de colisión)
+    walls_layer = None
+    for i, layer in enumerate(tmx_data.layers):
+        if hasattr(layer, 'name') and layer.name == "estructuras":
+            walls_layer = i
+
+    if walls_layer is None:
+        raise Exception("No se encontró la capa 'walls' en el mapa.")
+
+    # La capa se lee una sola vez a un array de gids y se indexa por gid
+    gids = np.array(tmx_data.layers[walls_layer].data, dtype=np.int64).reshape(tmx_data.height, tmx_data.width)
+    positions_by_gid = build_gid_index(gids)
+
+    # Para cada tile del tileset que tiene colisionador (objectgroup)
+    for tile_id_local, obj_group in tmx_data.get_tile_colliders():
+        if obj_group is None or tile_id_local not in positions_by_gid:
+            continue
+        xs, ys = positions_by_gid[tile_id_local]
+        # Posición base (en píxeles) de cada aparición del tile en el mapa
+        tile_base_x = xs * tmx_data.tilewidth
+        tile_base_y = ys * tmx_data.tileheight
+        for obj in obj_group:
+            # Se realiza un cast a Any para evitar errores de tipado
+            obj_any = cast(Any, obj)
+
+            # Verifica si el objeto de colisión es un polígono
+            if hasattr(obj_any, 'points'):
+                # Es un polígono (como un triángulo): se desplazan sus vértices a todas las posiciones a la vez
+                px = np.array([p[0] for p in obj_any.points])
+                py = np.array([p[1] for p in obj_any.points])
+                abs_x = (tile_base_x[:, None] + px[None, :]).astype(np.int64).tolist()
+                abs_y = (tile_base_y[:, None] + py[None, :]).astype(np.int64).tolist()
+                obstacles.extend(('poly', list(zip(row_x, row_y))) for row_x, row_y in zip(abs_x, abs_y))
+            else:
+                # Es un rectángulo: mismo tamaño en todas las posiciones
+                lefts = (tile_base_x + obj_any.x).astype(np.int64).tolist()
+                tops = (tile_base_y + obj_any.y).astype(np.int64).tolist()
+                width, height = int(obj_any.width), int(obj_any.height)
+                obstacles.extend(('rect', pygame.Rect(left, top, width, height)) for left, top in zip(lefts, tops))
+    return obstacles
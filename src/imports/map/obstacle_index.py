@@ -0,0 +1,131 @@
+import math
+
+# Tamaño de celda (px) de la rejilla uniforme que indexa los obstáculos
+OBSTACLE_CELL_SIZE = 64
+
+def obstacle_bounds(kind, shape):
+	"""Caja (x0, y0, x1, y1) de los píxeles que ocupa una forma, con ambos extremos incluidos."""
+	if kind == 'rect':
+		# Un pygame.Rect ocupa de left a right - 1
+		return shape.left, shape.top, shape.right - 1, shape.bottom - 1
+	xs = [p[0] for p in shape]
+	ys = [p[1] for p in shape]
+	return min(xs), min(ys), max(xs), max(ys)
+
+def obstacle_shapes(obstacles):
+	"""
+	Formas sueltas que indexa ObstacleIndex, en el orden de obstacles: cada rect y polígono tal cual
+	y cada arista de una lista 'edges' como ('segment', ((x1, y1), (x2, y2))).
+	"""
+	shapes = []
+	for kind, shape in obstacles:
+		if kind == 'edges':
+			shapes.extend(('segment', segment) for segment in shape)
+		else:
+			shapes.append((kind, shape))
+	return shapes
+
+def build_obstacle_grid(shapes, cell_size):
+	"""Reparte los índices de las formas entre las celdas de una rejilla uniforme que toca su caja."""
+	cells = {}
+	for i, (kind, shape) in enumerate(shapes):
+		x0, y0, x1, y1 = obstacle_bounds(kind, shape)
+		for cy in range(int(y0 // cell_size), int(y1 // cell_size) + 1):
+			for cx in range(int(x0 // cell_size), int(x1 // cell_size) + 1):
+				cells.setdefault((cx, cy), []).append(i)
+	return {'cell_size': cell_size, 'cells': cells}
+
+def _segment_intersection(a, b, p, q):
+	"""Parámetro t en [0, 1] del primer punto de a->b que toca el segmento p-q, o None."""
+	rx, ry = b[0] - a[0], b[1] - a[1]
+	sx, sy = q[0] - p[0], q[1] - p[1]
+	denominator = rx * sy - ry * sx
+	if denominator == 0:
+		return None
+	t = ((p[0] - a[0]) * sy - (p[1] - a[1]) * sx) / denominator
+	u = ((p[0] - a[0]) * ry - (p[1] - a[1]) * rx) / denominator
+	if 0.0 <= t <= 1.0 and 0.0 <= u <= 1.0:
+		return t
+	return None
+
+class ObstacleIndex:
+	"""
+	Índice espacial estático (rejilla uniforme) sobre Map.obstacles, construido una sola vez.
+	Las consultas sólo recorren las formas de las celdas que tocan, así que su coste depende de la
+	densidad local de obstáculos y no del tamaño del mapa. Las listas 'edges' se indexan arista a arista.
+	Los resultados respetan el orden de Map.obstacles, como el recorrido lineal al que sustituye.
+	"""
+	def __init__(self, obstacles, cell_size=OBSTACLE_CELL_SIZE, grid=None):
+		self.shapes = obstacle_shapes(obstacles)
+		# Rejilla {'cell_size', 'cells': {(cx, cy): [índices en shapes]}}; la del artefacto de bake si se da
+		self.grid = grid if grid is not None else build_obstacle_grid(self.shapes, cell_size)
+		self.cell_size = self.grid['cell_size']
+		self.cells = self.grid['cells']
+
+	def __len__(self):
+		return len(self.shapes)
+
+	def _candidates(self, x0, y0, x1, y1):
+		# Índices (ordenados) de las formas de las celdas que cubren la caja, ambos extremos incluidos
+		size = self.cell_size
+		cx0, cy0, cx1, cy1 = int(x0 // size), int(y0 // size), int(x1 // size), int(y1 // size)
+		if cx0 == cx1 and cy0 == cy1:
+			return self.cells.get((cx0, cy0), ())
+		found = set()
+		for cy in range(cy0, cy1 + 1):
+			for cx in range(cx0, cx1 + 1):
+				found.update(self.cells.get((cx, cy), ()))
+		return sorted(found)
+
+	@staticmethod
+	def _hits(kind, shape, rect):
+		if kind == 'rect':
+			return rect.colliderect(shape)
+		if kind == 'segment':
+			return bool(rect.clipline(shape[0], shape[1]))
+		return any(rect.clipline(p, q) for p, q in zip(shape, shape[1:] + shape[:1]))
+
+	def overlaps(self, rect):
+		"""Formas (kind, shape) que colisionan con rect."""
+		shapes = self.shapes
+		return [
+			shapes[i] for i in self._candidates(rect.left, rect.top, rect.right - 1, rect.bottom - 1)
+			if self._hits(*shapes[i], rect)
+		]
+
+	def first_hit(self, rect):
+		"""Primera forma (kind, shape) que colisiona con rect o (None, None), como Kinematic._get_colliding_obstacle."""
+		shapes = self.shapes
+		for i in self._candidates(rect.left, rect.top, rect.right - 1, rect.bottom - 1):
+			kind, shape = shapes[i]
+			if self._hits(kind, shape, rect):
+				return kind, shape
+		return None, None
+
+	def query_segment(self, a, b):
+		"""
+		Formas que corta el segmento a->b como [(punto, kind, shape)], ordenadas por distancia a a;
+		punto es la primera intersección del segmento con la forma.
+		"""
+		a = (float(a[0]), float(a[1]))
+		b = (float(b[0]), float(b[1]))
+		length = math.dist(a, b)
+		hits = []
+		for i in self._candidates(min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1])):
+			kind, shape = self.shapes[i]
+			if kind == 'rect':
+				clipped = shape.clipline(a, b)
+				if not clipped:
+					continue
+				point = min(clipped, key=lambda p: math.dist(a, p))
+				t = math.dist(a, point) / length if length > 0 else 0.0
+			else:
+				edges = [shape] if kind == 'segment' else list(zip(shape, shape[1:] + shape[:1]))
+				ts = [t for t in (_segment_intersection(a, b, p, q) for p, q in edges) if t is not None]
+				if not ts:
+					continue
+				t = min(ts)
+				point = (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t)
+			hits.append((t, i, point, kind, shape))
+		hits.sort(key=lambda hit: (hit[0], hit[1]))
+		return [(point, kind, shape) for _, _, point, kind, shape in hits]
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Versión del formato del fichero de caché (o de cómo se calcula su contenido): cambiarla invalida todas las cachés existentes
+FORMAT_VERSION = 2
+MAGIC = b'NAVMESH\x00'
+# Alineación (bytes) de la cabecera y de cada array, para poder mapearlos directamente en memoria
+ALIGNMENT = 64
+
+def nav_layer_hash(mapa_tmx, layer_name='nav_mesh'):
+	"""Huella SHA-256 de los objetos de la capa de navegación del TMX (id, tipo y vértices)."""
+	digest = hashlib.sha256()
+	for layer in mapa_tmx.layers:
+		if getattr(layer, 'name', None) != layer_name:
+			continue
+		for obj in sorted(layer, key=lambda obj: obj.id):
+			points = [(round(float(x), 4), round(float(y), 4)) for x, y in getattr(obj, 'points', ())]
+			digest.update(repr((obj.id, obj.type, points)).encode('utf-8'))
+	return digest.hexdigest()
+
+def _aligned(size):
+	return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_cache(path, key, meta, arrays):
+	"""
+	Escribe la caché: MAGIC, longitud de la cabecera, cabecera JSON (formato, clave, metadatos y descripción
+	de cada array) y los arrays en bruto, cada uno alineado a ALIGNMENT bytes. Se escribe a un fichero
+	temporal que luego sustituye al anterior, así que nunca queda una caché a medias.
+	"""
+	descriptors = {}
+	offset = 0
+	for name, array in arrays.items():
+		array = np.ascontiguousarray(array)
+		arrays[name] = array
+		descriptors[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+		offset = _aligned(offset + array.nbytes)
+	header = json.dumps({'format': FORMAT_VERSION, 'key': key, 'meta': meta, 'arrays': descriptors}).encode('utf-8')
+	data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+	temporary = f"{path}.tmp"
+	with open(temporary, 'wb') as f:
+		f.write(MAGIC)
+		f.write(len(header).to_bytes(8, 'little'))
+		f.write(header)
+		for name, array in arrays.items():
+			f.write(b'\x00' * (data_start + descriptors[name]['offset'] - f.tell()))
+			f.write(array.tobytes())
+	os.replace(temporary, path)
+
+def read_cache(path, key):
+	"""
+	Devuelve (metadatos, arrays) si la caché existe, tiene el formato actual y la misma clave; si no, None.
+	Los arrays son vistas de sólo lectura sobre el fichero mapeado en memoria (np.memmap), de modo que
+	varios procesos que abren la misma caché comparten sus páginas.
+	"""
+	if not os.path.exists(path):
+		return None
+	with open(path, 'rb') as f:
+		if f.read(len(MAGIC)) != MAGIC:
+			return None
+		header_size = int.from_bytes(f.read(8), 'little')
+		header = json.loads(f.read(header_size).decode('utf-8'))
+	if header.get('format') != FORMAT_VERSION or header.get('key') != key:
+		return None
+	data_start = _aligned(len(MAGIC) + 8 + header_size)
+	buffer = np.memmap(path, dtype=np.uint8, mode='r')
+	arrays = {}
+	for name, descriptor in header['arrays'].items():
+		if 0 in descriptor['shape']:
+			arrays[name] = np.zeros(tuple(descriptor['shape']), dtype=np.dtype(descriptor['dtype']))
+			continue
+		arrays[name] = np.ndarray(
+			tuple(descriptor['shape']),
+			dtype=np.dtype(descriptor['dtype']),
+			buffer=buffer,
+			offset=data_start + descriptor['offset']
+		)
+	return header['meta'], arrays
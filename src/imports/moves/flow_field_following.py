@@ -0,0 +1,34 @@
+from imports.moves.dynamic_arrive import DynamicArrive
+from imports.moves.kinematic import SteeringOutput
+from pygame.math import Vector2
+
+class FlowFieldFollow:
+	def __init__(self, character, flow_field, target, max_acceleration=150, max_speed=100, target_radius=5, slow_radius=100, time_to_target=0.1):
+		self.character = character					# El personaje que persigue (NPC)
+		self.flow_field = flow_field				# El campo de flujo compartido (FlowField)
+		self.target = target						# El objetivo del campo (Player)
+		self.max_acceleration = max_acceleration	# La aceleración máxima del personaje
+		self.arrive_behavior = DynamicArrive(		# Llegada directa cuando se comparte nodo con el objetivo
+			character=character,
+			target=target,
+			max_acceleration=max_acceleration,
+			max_speed=max_speed,
+			target_radius=target_radius,
+			slow_radius=slow_radius,
+			time_to_target=time_to_target
+		)
+
+	def get_steering(self):
+		# Sólo el primer perseguidor que ve al objetivo en un nodo nuevo recalcula el campo; el resto sólo consulta
+		self.flow_field.update(self.target.current_node_id)
+		waypoint = self.flow_field.next_waypoint(self.character.current_node_id)
+		if waypoint is None:
+			return self.arrive_behavior.get_steering()
+
+		result = SteeringOutput(Vector2(0, 0), 0)
+		result.linear = Vector2(waypoint) - self.character.kinematic.position
+		if result.linear.length() == 0:
+			return result
+		result.linear = result.linear.normalize() * self.max_acceleration
+		result.angular = 0
+		return result
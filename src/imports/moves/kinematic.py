@@ -1,6 +1,7 @@
 # Algoritmos de movimiento
 import math
 from pygame import Vector2, Rect
+from imports.map.obstacle_index import ObstacleIndex
 
 class KinematicSteeringOutput:
 	def __init__(self, velocity, rotation):
@@ -79,6 +80,9 @@ class Kinematic:
 	def _get_colliding_obstacle(self, character_rect, obstacles):
 		if not obstacles:
 			return None, None
+		if isinstance(obstacles, ObstacleIndex):
+			# Con el índice espacial sólo se comprueban los obstáculos de las celdas que toca el personaje
+			return obstacles.first_hit(character_rect)
 		
 		for shape_type, shape_data in obstacles:
 			if shape_type == 'rect':
@@ -92,11 +96,18 @@ class Kinematic:
 					character_rect.clipline(shape_data[2], shape_data[0]):
 					
 					return shape_type, shape_data
+			elif shape_type == 'edges':
+				# Aristas sueltas (polígonos ya procesados por merge_obstacles): se devuelve la que se cruza
+				for segment in shape_data:
+					if character_rect.clipline(segment[0], segment[1]):
+						return shape_type, segment
 		return None, None
 
 	def _check_collision(self, character_rect, obstacles):
 		if not obstacles:
 			return False
+		if isinstance(obstacles, ObstacleIndex):
+			return obstacles.first_hit(character_rect)[0] is not None
 			
 		# Itera sobre cada obstáculo para comprobar la colisión.
 		for shape_type, shape_data in obstacles:
@@ -110,6 +121,11 @@ class Kinematic:
 					character_rect.clipline(shape_data[1], shape_data[2]) or \
 					character_rect.clipline(shape_data[2], shape_data[0]):
 					return True
+			elif shape_type == 'edges':
+				# Si es una lista de aristas, comprueba cada segmento.
+				for segment in shape_data:
+					if character_rect.clipline(segment[0], segment[1]):
+						return True
 		return False
 	
 	def new_orientation(self, velocity=None, orientation=None):
@@ -1,20 +1,43 @@
 from imports.moves.kinematic import SteeringOutput
 from imports.moves.dynamic_seek import DynamicSeek
+from imports.map.obstacle_index import ObstacleIndex
 from pygame.math import Vector2
 
 class ObstacleAvoidance:
 	def __init__(self, character, obstacles, explicit_target, avoid_distance, lookahead, max_acceleration):
 		self.character = character					# El personaje que evita obstáculos (NPC)
-		self.obstacles = obstacles					# Lista de obstáculos a evitar
+		# Índice espacial de los obstáculos a evitar (se construye si se recibe la lista de Map.obstacles)
+		self.obstacles = obstacles if isinstance(obstacles, ObstacleIndex) else ObstacleIndex(obstacles)
 		self.explicit_target = explicit_target		# El objetivo explícito para la orientación (Player)
 		self.avoid_distance = avoid_distance		# La distancia a la que el personaje debe evitar los obstáculos
 		self.lookahead = lookahead					# La distancia de anticipación para la detección de obstáculos
 		self.max_acceleration = max_acceleration	# La aceleración máxima del personaje
 
-	def _ray_intersects_rect(self, ray_start, ray_end, rect):
-		# Devuelve el punto de intersección si el rayo intersecta el rectángulo, de lo contrario None
-		return rect.clipline(ray_start, ray_end)
-	
+	def _collision_normal(self, collision_point, kind, shape, ray_start):
+		if kind == 'rect':
+			# Calcular la normal del obstáculo en el punto de colisión
+			center_collision = collision_point - Vector2(shape.width/2, shape.height/2)
+			dx = abs(center_collision.x) / (shape.width / 2)
+			dy = abs(center_collision.y) / (shape.height / 2)
+
+			normal = Vector2(0, 0)
+			if dx > dy:
+				# La colisión está en los lados izquierdo o derecho
+				normal.x = 1 if center_collision.x > 0 else -1
+			else:
+				# La colisión está en los lados superior o inferior
+				normal.y = 1 if center_collision.y > 0 else -1
+			return normal
+		if kind == 'segment':
+			# Perpendicular a la arista, del lado por el que llega el rayo
+			normal = (Vector2(shape[1]) - Vector2(shape[0])).rotate(90)
+			if normal.dot(ray_start - collision_point) < 0:
+				normal = -normal
+		else:
+			# Polígono: desde su centro hacia el punto de colisión
+			normal = collision_point - sum((Vector2(p) for p in shape), Vector2(0, 0)) / len(shape)
+		return normal.normalize() if normal.length_squared() > 0 else normal
+
 	def get_steering(self):
 		if self.character.kinematic.velocity.length_squared() == 0:
 			return SteeringOutput(Vector2(0, 0), 0)  # No hay movimiento si la velocidad es cero
@@ -24,35 +47,14 @@ class ObstacleAvoidance:
 		ray_start = self.character.kinematic.position
 		ray_end = ray_start + ray_vector
 
-		# Inicializar la colisión más cercana
+		# Colisión más cercana (getCollision): el índice sólo mira las celdas que recorre el rayo
 		closest_collision = None
-		closest_distance = float('inf')
-
-		# Iterar sobre los obstáculos para encontrar la colisión más cercana (getCollision)
-		for obstacle in self.obstacles:
-			collision = self._ray_intersects_rect(ray_start, ray_end, obstacle)
-			if collision:
-				# Hay una colisión, verificar si es la más cercana
-				collision_point = Vector2(collision[0])
-				distance = (collision_point - ray_start).length()
-				if distance < closest_distance:
-					closest_distance = distance
-					
-					# Calcular la normal del obstáculo en el punto de colisión
-					center_collision = collision_point - Vector2(obstacle.width/2, obstacle.height/2)
-					
-					dx = abs(center_collision.x) / (obstacle.width / 2)
-					dy = abs(center_collision.y) / (obstacle.height / 2)
-
-					normal = Vector2(0, 0)
-					if dx > dy:
-						# La colisión está en los lados izquierdo o derecho
-						normal.x = 1 if center_collision.x > 0 else -1
-					else:
-						# La colisión está en los lados superior o inferior
-						normal.y = 1 if center_collision.y > 0 else -1
-					
-					closest_collision = {"point": collision_point, "normal": normal} # Guardar el punto y la normal de la colisión
+		hits = self.obstacles.query_segment(ray_start, ray_end)
+		if hits:
+			point, kind, shape = hits[0]
+			collision_point = Vector2(point)
+			normal = self._collision_normal(collision_point, kind, shape, ray_start)
+			closest_collision = {"point": collision_point, "normal": normal} # Guardar el punto y la normal de la colisión
 
 		# Si no hay colisión, no hacer nada
 		if not closest_collision:
@@ -1,14 +1,20 @@
 from imports.moves.dynamic_arrive import DynamicArrive
+from imports.map.path import AStarPath
+from imports.moves.kinematic import SteeringOutput
 from pygame.math import Vector2
 
 class FollowPath:
-	def __init__(self, character, path, explicit_target, path_offset=20.0):
+	def __init__(self, character, path, explicit_target, path_offset=20.0, replanner=None, goal=None, nav_mesh=None):
 		self.character = character				# El personaje que sigue el camino (NPC)
 		self.explicit_target = explicit_target	# El objetivo explícito para la orientación (Player)
 		self.path = path						# El camino a seguir (Path)
 		self.path_offset = path_offset			# El offset del camino
 		self.current_target_index = 0			# El índice del objetivo actual en el camino
 		self.current_param = 0.0				# El parámetro actual en el camino
+		self.replanner = replanner				# Replanificador incremental (advance/path_nodes) para metas móviles
+		self.goal = goal						# La meta móvil que se persigue con el replanificador (Player)
+		self.nav_mesh = nav_mesh				# La NavMesh sobre la que trabaja el replanificador
+		self._tracked_nodes = (None, None)		# Nodos (personaje, meta) usados en la última replanificación
 		self.arrive_behavior =  DynamicArrive(
 			character=self.character, 
 			target=self.explicit_target, 
@@ -19,7 +25,31 @@ class FollowPath:
 			time_to_target=0.1
 		)
 
+	def _refresh_path(self):
+		# Sólo se replanifica cuando el personaje o la meta cambian de nodo; mientras tanto
+		# basta con mover el último punto del camino hasta la posición actual de la meta
+		nodes = (self.character.current_node_id, self.goal.current_node_id)
+		goal_position = Vector2(self.goal.kinematic.position)
+		if nodes == self._tracked_nodes:
+			if self.path is not None:
+				self.path.points[-1] = goal_position
+			return
+		self._tracked_nodes = nodes
+		if not self.replanner.advance(*nodes):
+			self.path = None
+			return
+		path_nodes = self.replanner.path_nodes()
+		points = [Vector2(point) for point in self.nav_mesh.smooth_path(self.character.kinematic.position, goal_position, path_nodes, margin=self.character.sprite_size[0] / 4)]
+		if len(points) < 2:
+			points = [Vector2(self.character.kinematic.position), goal_position]
+		self.path = AStarPath(points)
+
 	def get_steering(self):
+		if self.replanner is not None:
+			self._refresh_path()
+			if self.path is None:
+				return SteeringOutput(Vector2(0, 0), 0)
+
 		# calcular el punto mas cercano en el path
 		character_param = self.path.get_param(self.character.kinematic.position)
 		target_param = character_param + self.path_offset
@@ -14,6 +14,7 @@ from imports.moves.dynamic_wander import DynamicWander
 from imports.moves.blended_steering import BlendedSteeringLWYG
 from imports.moves.path_following import FollowPath
 from imports.moves.priority_steering import PrioritySteering
+from imports.moves.flow_field_following import FlowFieldFollow
 
 # Diccionario que mapea nombres de algoritmos a sus clases correspondientes
 SWITCHER_ALGORITHMS = {
@@ -33,4 +34,5 @@ SWITCHER_ALGORITHMS = {
 	"BlendedSteeringLWYG": BlendedSteeringLWYG,
 	"FollowPath": FollowPath,
 	"PrioritySteering": PrioritySteering,
+	"FlowFieldFollow": FlowFieldFollow,
 }
\ No newline at end of file
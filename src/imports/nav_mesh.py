@@ -1,50 +1,385 @@
-from shapely.geometry import Polygon, Point
+from shapely.geometry import MultiLineString, Polygon, box
+from shapely import constrained_delaunay_triangles, get_coordinates, get_parts, line_merge, STRtree
+import math
+import numpy as np
 import pygame
 from collections import deque
-import pickle
-import os
+from collections.abc import Mapping
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from imports.pathfinding.dijkstra import build_weighted_graph, edge_key, farthest_safe_node, nearest_targets, MIN_EDGE_COST, _init_worker, _worker_next_hops
+from imports.pathfinding.hierarchical import build_hierarchy, clusters_of
+from imports.pathfinding.landmarks import build_landmarks
+from imports.pathfinding.funnel import string_pull
+from imports.mesh_cache import nav_layer_hash, read_cache, write_cache
+
+def _straight_runs(coords, eps=1e-6):
+	# Tramos rectos (p, q) de una polilínea: se juntan los segmentos consecutivos alineados
+	runs = []
+	start = coords[0]
+	for i in range(1, len(coords) - 1):
+		a, b, c = coords[i - 1], coords[i], coords[i + 1]
+		cross = (b[0] - a[0]) * (c[1] - b[1]) - (b[1] - a[1]) * (c[0] - b[0])
+		dot = (b[0] - a[0]) * (c[0] - b[0]) + (b[1] - a[1]) * (c[1] - b[1])
+		if abs(cross) > eps or dot < 0:
+			runs.append((start, b))
+			start = b
+	runs.append((start, coords[-1]))
+	return runs
+
+def portal_from_intersection(intersection):
+	"""
+	Devuelve el segmento (p, q) compartido entre dos polígonos a partir de su intersección: el tramo recto
+	más largo del borde común. Si el borde común es una L o tiene varios trozos, la recta entre sus extremos
+	más alejados no está sobre ninguno de los dos polígonos y el funnel podría sacar el camino por ella.
+	Si la intersección no tiene líneas (solapamientos) se usan los dos puntos más alejados entre sí.
+	"""
+	lines = [part for part in get_parts(intersection) if part.geom_type == 'LineString']
+	if lines:
+		runs = []
+		for line in get_parts(line_merge(MultiLineString(lines))):
+			runs.extend(_straight_runs([tuple(c) for c in get_coordinates(line)]))
+		return max(runs, key=lambda run: (run[1][0] - run[0][0]) ** 2 + (run[1][1] - run[0][1]) ** 2)
+	coords = [tuple(c) for c in get_coordinates(intersection)]
+	best = (coords[0], coords[-1])
+	best_length = -1.0
+	for i in range(len(coords)):
+		for j in range(i + 1, len(coords)):
+			length = (coords[j][0] - coords[i][0]) ** 2 + (coords[j][1] - coords[i][1]) ** 2
+			if length > best_length:
+				best_length = length
+				best = (coords[i], coords[j])
+	return best
+
+# Polígonos compartidos por los procesos que calculan portales (se asignan en el inicializador)
+_worker_polygons = None
+
+def _init_portal_worker(polygons):
+	global _worker_polygons
+	_worker_polygons = polygons
+
+def _worker_portals(pairs):
+	return [_portal_between(_worker_polygons[i], _worker_polygons[j]) for i, j in pairs]
+
+def _portal_between(poly1, poly2):
+	"""
+	Portal entre dos polígonos o None si no comparten un tramo de borde.
+	Se considera una arista válida si la intersección tiene una longitud mayor que cero: esto funciona
+	para LineString (unión perfecta) y para pequeños solapamientos, pero ignora las uniones de un solo punto.
+	"""
+	intersection = poly1.intersection(poly2)
+	if intersection.length > 0:
+		return portal_from_intersection(intersection)
+	return None
+
+def _midpoint(segment):
+	(x1, y1), (x2, y2) = segment
+	return ((x1 + x2) / 2, (y1 + y2) / 2)
+
+def _triangle_centroid(triangle):
+	return (sum(p[0] for p in triangle) / 3, sum(p[1] for p in triangle) / 3)
+
+def _containing_triangle(triangles, point):
+	"""Índice del triángulo que contiene point; si está en un borde o algo fuera, el más cercano a contenerlo."""
+	x, y = point[0], point[1]
+	best, best_score = 0, -math.inf
+	for t, ((ax, ay), (bx, by), (cx, cy)) in enumerate(triangles):
+		area = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+		if area == 0:
+			continue
+		# Menor coordenada baricéntrica: >= 0 dentro del triángulo
+		score = min(
+			((bx - x) * (cy - y) - (by - y) * (cx - x)) / area,
+			((cx - x) * (ay - y) - (cy - y) * (ax - x)) / area,
+			((ax - x) * (by - y) - (ay - y) * (bx - x)) / area,
+		)
+		if score > best_score:
+			best, best_score = t, score
+	return best
+
+def _point_in_ring(ring, x, y):
+	"""Prueba par-impar de un punto contra un anillo de vértices (sin Shapely)."""
+	inside = False
+	x1, y1 = ring[-1]
+	for x2, y2 in ring:
+		if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+			inside = not inside
+		x1, y1 = x2, y2
+	return inside
+
+def _points_in_ring(ring, x, y):
+	"""Versión vectorizada de _point_in_ring para arrays de coordenadas."""
+	inside = np.zeros(len(x), dtype=bool)
+	x1 = ring[:, 0]
+	y1 = ring[:, 1]
+	x2 = np.roll(x1, -1)
+	y2 = np.roll(y1, -1)
+	for k in range(len(ring)):
+		if y1[k] == y2[k]:
+			continue
+		crosses = ((y1[k] > y) != (y2[k] > y)) & (x < x1[k] + (y - y1[k]) * (x2[k] - x1[k]) / (y2[k] - y1[k]))
+		inside ^= crosses
+	return inside
+
+class LazyPolygons(Mapping):
+	"""
+	node_id -> Polygon de Shapely creado sólo cuando se pide (dibujo de depuración, construcción de la malla)
+	a partir de un búfer plano de vértices y sus desplazamientos por polígono. ring() da los vértices sin Shapely.
+	"""
+	def __init__(self, node_ids, vertices, offsets, polygons=None):
+		self._index = {node_id: i for i, node_id in enumerate(node_ids)}
+		self._vertices = vertices
+		self._offsets = offsets
+		self._polygons = dict(polygons) if polygons else {}
+
+	@classmethod
+	def from_polygons(cls, polygons):
+		rings = [get_coordinates(polygon.exterior)[:-1] for polygon in polygons.values()]
+		vertices = np.concatenate(rings) if rings else np.zeros((0, 2))
+		offsets = np.cumsum([0] + [len(ring) for ring in rings])
+		return cls(list(polygons), vertices, offsets, polygons)
+
+	def ring(self, node_id):
+		i = self._index[node_id]
+		return self._vertices[self._offsets[i]:self._offsets[i + 1]]
+
+	def __getitem__(self, node_id):
+		polygon = self._polygons.get(node_id)
+		if polygon is None:
+			polygon = Polygon(self.ring(node_id))
+			self._polygons[node_id] = polygon
+		return polygon
+
+	def __contains__(self, node_id):
+		return node_id in self._index
+
+	def __iter__(self):
+		return iter(self._index)
+
+	def __len__(self):
+		return len(self._index)
+
+def index_by_node(objects, include=None):
+	"""Índice node_id -> [objetos] de los objetos (con atributo node_id) que cumplen include."""
+	index = {}
+	for obj in objects:
+		node_id = getattr(obj, 'node_id', None)
+		if node_id is None or (include is not None and not include(obj)):
+			continue
+		index.setdefault(node_id, []).append(obj)
+	return index
+
+# Tamaño de celda (px) de la rejilla uniforme que indexa los polígonos para localizar puntos
+SPATIAL_CELL_SIZE = 32
+# A partir de este número de pares candidatos los portales se calculan en un pool de procesos
+PARALLEL_PORTAL_PAIRS = 20000
+# Caché de la malla que usa el juego (cache_path=None la desactiva)
+CACHE_PATH = Path(__file__).resolve().parents[1] / "database" / "nav_mesh.cache"
+
 class NavMesh:
-	def __init__(self, mapa_tmx):
-		self.nav_polygons = {}
+	def __init__(self, mapa_tmx, build_path_table=False, cluster_size=None, landmark_count=None, baked=None, cache_path=CACHE_PATH):
+		self.nav_polygons = LazyPolygons([], np.zeros((0, 2)), np.zeros(1, dtype=np.int64))
 		self.nodes = {}
 		self.edges = []
 		self.graph = {}
+		# Segmento compartido (portal) de cada arista: edge_key(id1, id2) -> ((x1, y1), (x2, y2))
+		self.portals = {}
+		# Punto interior de cada polígono no convexo (sus claves marcan los polígonos que el funnel triangula)
+		self.anchors = {}
+		# Triangulación de cada polígono no convexo usado por el funnel: node_id -> (triángulos, arista -> triángulos)
+		self._triangulations = {}
+		# Tabla de caminos mínimos entre todos los pares en arrays densos (ver build_path_table):
+		# {'node_ids', 'index' (node_id -> fila), 'distance' (N x N), 'next_hop' (N x N, fila del siguiente nodo o -1)}
+		self.path_table = None
+		# Costes de aristas sobrescritos en tiempo de ejecución y versión del grafo (cambia con cada modificación)
+		self.edge_costs = {}
+		self.version = 0
+		# Registro de cambios del grafo: edge_changes[v] es la arista que cambió al pasar de la versión v a v + 1
+		self.edge_changes = []
+		# Grafo abstracto por regiones para la búsqueda jerárquica (ver build_hierarchy)
+		self.hierarchy = None
+		# Landmarks y sus distancias exactas para la heurística ALT (ver build_landmarks)
+		self.landmarks = None
+		# Grafo ponderado de la última versión consultada: (version, grafo)
+		self._weighted_graph = None
+		# Componentes conexas: node_id -> etiqueta y etiqueta -> número de nodos (ver label_components)
+		self.components = {}
+		self.component_sizes = {}
+		self._next_component = 0
+		# Aristas bloqueadas en tiempo de ejecución (retiradas de graph, se conservan en edges)
+		self.blocked_edges = set()
+		# Rejilla uniforme sobre los polígonos: {'cell_size', 'cells': {(cx, cy): [node_ids]}} (ver build_spatial_index)
+		self.spatial_index = None
+		# Datos para localizar puntos en lote con NumPy (semiplanos por polígono, ver _build_locator)
+		self._locator = None
 
-		# Sistema de cache para cargar el nav mesh
-		project_root = Path(__file__).resolve().parents[2]
-		cache_path = project_root / "src" / "database" / "nav_mesh.cache"
+		# Sistema de cache para cargar el nav mesh: sólo se usa si coincide con la capa nav_mesh actual del TMX.
+		# baked = (metadatos, arrays) de un artefacto de imports.bake, que ya está validado y sustituye a la caché
+		cached = baked
+		if baked is not None:
+			cache_path = None
+		elif cache_path is not None:
+			cache_key = nav_layer_hash(mapa_tmx)
+			cached = read_cache(cache_path, cache_key)
 		
-		if os.path.exists(cache_path):
+		if cached is not None:
 			print("Cargando navegación desde caché...")
-			self.load_from_cache(cache_path)
+			self.load_from_cache(*cached)
+			cache_outdated = False
 		else:
 			print("Generando NavMesh y creando cache...")
 			self.load_nav_mesh(mapa_tmx)
-			self.save_to_cache(cache_path)
+			cache_outdated = True
+
+		# Datos derivados opcionales: se calculan sólo si la caché no los incluye
+		if build_path_table and self.path_table is None:
+			self.build_path_table()
+			cache_outdated = True
+		if cluster_size is not None and (self.hierarchy is None or self.hierarchy['cluster_size'] != cluster_size):
+			self.build_hierarchy(cluster_size)
+			cache_outdated = True
+		if landmark_count is not None and (self.landmarks is None or self.landmarks['count'] != landmark_count):
+			self.build_landmarks(landmark_count)
+			cache_outdated = True
+		if self.spatial_index is None or self.spatial_index['cell_size'] != SPATIAL_CELL_SIZE:
+			self.build_spatial_index(SPATIAL_CELL_SIZE)
+			cache_outdated = True
+		if cache_outdated and cache_path is not None:
+			self.save_to_cache(cache_path, cache_key)
+		self.label_components()
 	
-	def save_to_cache(self, path):
+	def save_to_cache(self, path, key):
+		"""
+		Guarda la malla en el formato de mesh_cache (ver to_arrays), con la huella de la capa del TMX como clave.
+		"""
 		path.parent.mkdir(parents=True, exist_ok=True)
-		cache_data = {
-			'polygons': self.nav_polygons,
-			'nodes': self.nodes,
-			'edges': self.edges,
-			'graph': self.graph
-		}
-		with open(path, 'wb') as f:
-			pickle.dump(cache_data, f)
+		meta, arrays = self.to_arrays()
+		write_cache(path, key, meta, arrays)
 		print(f"NavMesh guardada en el cache: {path}")
 
-	def load_from_cache(self, path):
-		with open(path, 'rb') as f:
-			cache_data = pickle.load(f)
-		self.nav_polygons = cache_data['polygons']
-		self.nodes = cache_data['nodes']
-		self.edges = cache_data['edges']
-		self.graph = cache_data['graph']
+	def to_arrays(self):
+		"""
+		Malla como (metadatos, arrays planos): búfer de vértices, desplazamientos por polígono, centroides,
+		adyacencia CSR, portales, tabla de caminos... Es lo que guarda la caché y lo que lee load_from_cache.
+		"""
+		node_ids = list(self.nodes)
+		index = {node_id: i for i, node_id in enumerate(node_ids)}
+		rings = [self.nav_polygons.ring(node_id) for node_id in node_ids]
+		arrays = {
+			'node_ids': np.array(node_ids, dtype=np.int64),
+			'centroids': np.array([self.nodes[node_id] for node_id in node_ids], dtype=np.float64).reshape(-1, 2),
+			'vertices': np.concatenate(rings).astype(np.float64) if rings else np.zeros((0, 2)),
+			'polygon_offsets': np.cumsum([0] + [len(ring) for ring in rings]).astype(np.int64),
+			'adjacency_offsets': np.cumsum([0] + [len(self.graph[node_id]) for node_id in node_ids]).astype(np.int64),
+			'adjacency': np.array([index[neighbor_id] for node_id in node_ids for neighbor_id in self.graph[node_id]], dtype=np.int32),
+			'edges': np.array(self.edges, dtype=np.int64).reshape(-1, 2),
+			'portals': np.array([self.portals[edge_key(id1, id2)] for id1, id2 in self.edges], dtype=np.float64).reshape(-1, 2, 2),
+			'anchor_nodes': np.array(list(self.anchors), dtype=np.int64),
+			'anchor_points': np.array(list(self.anchors.values()), dtype=np.float64).reshape(-1, 2),
+		}
+		meta = {'path_table': False, 'hierarchy': None, 'landmarks': None, 'spatial_index': None}
+
+		if self.path_table is not None:
+			meta['path_table'] = True
+			arrays['path_distance'] = self.path_table['distance']
+			arrays['path_next_hop'] = self.path_table['next_hop']
+		if self.hierarchy is not None:
+			abstract_graph = self.hierarchy['abstract_graph']
+			meta['hierarchy'] = {'cluster_size': self.hierarchy['cluster_size'], 'version': self.hierarchy['version']}
+			arrays['abstract_nodes'] = np.array(list(abstract_graph), dtype=np.int64)
+			arrays['abstract_offsets'] = np.cumsum([0] + [len(links) for links in abstract_graph.values()]).astype(np.int64)
+			arrays['abstract_targets'] = np.array([target for links in abstract_graph.values() for target, _ in links], dtype=np.int64)
+			arrays['abstract_costs'] = np.array([cost for links in abstract_graph.values() for _, cost in links], dtype=np.float64)
+		if self.landmarks is not None:
+			meta['landmarks'] = {'count': self.landmarks['count'], 'version': self.landmarks['version'], 'nodes': list(self.landmarks['nodes'])}
+			arrays['landmark_distance'] = np.array(
+				[[distance.get(node_id, np.inf) for node_id in node_ids] for distance in self.landmarks['distance']],
+				dtype=np.float64
+			).reshape(-1, len(node_ids))
+		if self.spatial_index is not None:
+			cells = self.spatial_index['cells']
+			meta['spatial_index'] = {'cell_size': self.spatial_index['cell_size']}
+			arrays['cell_keys'] = np.array(list(cells), dtype=np.int64).reshape(-1, 2)
+			arrays['cell_offsets'] = np.cumsum([0] + [len(candidates) for candidates in cells.values()]).astype(np.int64)
+			arrays['cell_nodes'] = np.array([node_id for candidates in cells.values() for node_id in candidates], dtype=np.int64)
+		return meta, arrays
+
+	def load_from_cache(self, meta, arrays):
+		"""
+		Reconstruye la malla desde los arrays de la caché. Los vértices y la tabla de caminos se quedan
+		como vistas del fichero mapeado; los polígonos de Shapely se crean sólo si alguien los pide.
+		"""
+		node_ids = arrays['node_ids'].tolist()
+		self.nodes = {node_id: (x, y) for node_id, (x, y) in zip(node_ids, arrays['centroids'].tolist())}
+		self.nav_polygons = LazyPolygons(node_ids, arrays['vertices'], arrays['polygon_offsets'])
+		offsets = arrays['adjacency_offsets'].tolist()
+		adjacency = arrays['adjacency'].tolist()
+		self.graph = {
+			node_id: [node_ids[j] for j in adjacency[offsets[i]:offsets[i + 1]]]
+			for i, node_id in enumerate(node_ids)
+		}
+		self.edges = [(id1, id2) for id1, id2 in arrays['edges'].tolist()]
+		self.portals = {
+			edge_key(id1, id2): (tuple(p), tuple(q))
+			for (id1, id2), (p, q) in zip(self.edges, arrays['portals'].tolist())
+		}
+		self.anchors = {node_id: (x, y) for node_id, (x, y) in zip(arrays['anchor_nodes'].tolist(), arrays['anchor_points'].tolist())}
+
+		self.path_table = None
+		if meta['path_table']:
+			self.path_table = {
+				'node_ids': node_ids,
+				'index': {node_id: i for i, node_id in enumerate(node_ids)},
+				'distance': arrays['path_distance'],
+				'next_hop': arrays['path_next_hop'],
+			}
+		self.hierarchy = None
+		if meta['hierarchy'] is not None:
+			cluster_size = meta['hierarchy']['cluster_size']
+			offsets = arrays['abstract_offsets'].tolist()
+			targets = arrays['abstract_targets'].tolist()
+			costs = arrays['abstract_costs'].tolist()
+			abstract_graph = {
+				node_id: list(zip(targets[offsets[i]:offsets[i + 1]], costs[offsets[i]:offsets[i + 1]]))
+				for i, node_id in enumerate(arrays['abstract_nodes'].tolist())
+			}
+			cluster_of = clusters_of(self.nodes, cluster_size)
+			entrances = {}
+			for node_id in abstract_graph:
+				entrances.setdefault(cluster_of[node_id], []).append(node_id)
+			self.hierarchy = {
+				'cluster_size': cluster_size,
+				'version': meta['hierarchy']['version'],
+				'cluster_of': cluster_of,
+				'entrances': {cluster: sorted(nodes) for cluster, nodes in entrances.items()},
+				'abstract_graph': abstract_graph,
+			}
+		self.landmarks = None
+		if meta['landmarks'] is not None:
+			self.landmarks = {
+				'count': meta['landmarks']['count'],
+				'version': meta['landmarks']['version'],
+				'nodes': meta['landmarks']['nodes'],
+				'distance': [
+					{node_id: d for node_id, d in zip(node_ids, row) if d != float('inf')}
+					for row in arrays['landmark_distance'].tolist()
+				],
+			}
+		self.spatial_index = None
+		if meta['spatial_index'] is not None:
+			offsets = arrays['cell_offsets'].tolist()
+			candidates = arrays['cell_nodes'].tolist()
+			self.spatial_index = {
+				'cell_size': meta['spatial_index']['cell_size'],
+				'cells': {
+					(cx, cy): candidates[offsets[i]:offsets[i + 1]]
+					for i, (cx, cy) in enumerate(arrays['cell_keys'].tolist())
+				},
+			}
 		print("NavMesh cargada exitosamente desde el cache")
 
 	def load_nav_mesh(self, mapa_tmx):
+		polygons = {}
 		for layer in mapa_tmx.layers:
 			if layer.name == "nav_mesh":
 				for obj in layer:
@@ -56,30 +391,19 @@ class NavMesh:
 						continue
 
 					polygon = Polygon(abs_points)
-					self.nav_polygons[obj.id] = polygon
+					polygons[obj.id] = polygon
 
 					centroid = polygon.centroid
 					self.nodes[obj.id] = (centroid.x, centroid.y)
+					if polygon.convex_hull.area - polygon.area > 1e-6:
+						anchor = polygon.representative_point()
+						self.anchors[obj.id] = (anchor.x, anchor.y)
 
-		if not self.nav_polygons:
+		if not polygons:
 			raise ValueError("Navigation mesh layer 'nav_mesh' not found in the TMX file.")
+		self.nav_polygons = LazyPolygons.from_polygons(polygons)
 
-		polygon_ids = list(self.nav_polygons.keys())
-
-		for i in range(len(polygon_ids)):
-			for j in range(i + 1, len(polygon_ids)):
-				poly1 = self.nav_polygons[polygon_ids[i]]
-				poly2 = self.nav_polygons[polygon_ids[j]]
-
-				# Primero, se comprueba si los polígonos se intersectan.
-				if poly1.intersects(poly2):
-					# Se calcula la geometría de la intersección.
-					intersection = poly1.intersection(poly2)
-					# Se considera una arista válida si la intersección tiene una longitud mayor que cero.
-					# Esto funciona para LineString (unión perfecta) y para pequeños polígonos de superposición,
-					# pero ignora las uniones de un solo punto (que tienen longitud cero).
-					if intersection.length > 0:
-						self.edges.append((polygon_ids[i], polygon_ids[j]))
+		self._build_edges()
 		
 		# Se construye el grafo de adyacencia una vez cargadas las aristas.
 		self.graph = {node_id: [] for node_id in self.nodes}
@@ -87,6 +411,330 @@ class NavMesh:
 			self.graph[id1].append(id2)
 			self.graph[id2].append(id1)
 
+	def _build_edges(self, max_workers=None):
+		"""
+		Obtiene las aristas y sus portales. Los pares candidatos salen de un STRtree (cajas envolventes que
+		se tocan y prueba intersects) en lugar de comparar todos los pares; la intersección exacta de cada
+		candidato se reparte en un pool de procesos si hay más de PARALLEL_PORTAL_PAIRS.
+		"""
+		polygon_ids = list(self.nav_polygons.keys())
+		polygons = [self.nav_polygons[node_id] for node_id in polygon_ids]
+		tree = STRtree(polygons)
+		left, right = tree.query(polygons, predicate='intersects')
+		# Cada par una sola vez y en el mismo orden (i, j) que el recorrido por todos los pares
+		pairs = sorted((int(i), int(j)) for i, j in zip(left, right) if i < j)
+
+		if len(pairs) > PARALLEL_PORTAL_PAIRS:
+			chunk_size = 2048
+			chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+			with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_portal_worker, initargs=(polygons,)) as pool:
+				portals = [portal for chunk in pool.map(_worker_portals, chunks) for portal in chunk]
+		else:
+			portals = [_portal_between(polygons[i], polygons[j]) for i, j in pairs]
+
+		for (i, j), portal in zip(pairs, portals):
+			if portal is None:
+				continue
+			self.edges.append((polygon_ids[i], polygon_ids[j]))
+			# Se guarda el segmento compartido para el suavizado de caminos (funnel).
+			self.portals[edge_key(polygon_ids[i], polygon_ids[j])] = portal
+
+	def smooth_path(self, start_pos, goal_pos, path_nodes, margin=0.0):
+		"""
+		Convierte un camino de nodos en las esquinas mínimas entre start_pos y goal_pos (algoritmo del embudo).
+		El embudo sólo es válido en celdas convexas, así que cada polígono no convexo del camino se sustituye
+		por la cadena de triángulos de su triangulación que va de su portal de entrada al de salida.
+		Si faltan portales devuelve los centroides del camino.
+		"""
+		cells, centroids, portals = self._funnel_corridor(start_pos, goal_pos, path_nodes)
+		points = string_pull(start_pos, goal_pos, cells, centroids, portals, margin)
+		if points is None:
+			return [self.nodes[node_id] for node_id in path_nodes]
+		return points
+
+	def _funnel_corridor(self, start_pos, goal_pos, path_nodes):
+		# Celdas convexas del camino con su centroide y el portal entre cada par consecutivo: los polígonos
+		# convexos son una celda (su node_id) y los no convexos, la cadena de triángulos (node_id, índice)
+		if not any(node_id in self.anchors for node_id in path_nodes):
+			return path_nodes, self.nodes, self.portals
+		cells = []
+		centroids = {}
+		portals = {}
+		for i, node_id in enumerate(path_nodes):
+			entry_portal = self.portals.get(edge_key(path_nodes[i - 1], node_id)) if i > 0 else None
+			if node_id in self.anchors:
+				exit_portal = self.portals.get(edge_key(node_id, path_nodes[i + 1])) if i + 1 < len(path_nodes) else None
+				entry_point = _midpoint(entry_portal) if entry_portal is not None else start_pos
+				exit_point = _midpoint(exit_portal) if exit_portal is not None else goal_pos
+				triangles, chain, inner_portals = self._triangle_chain(node_id, entry_point, exit_point)
+				chain_cells = [(node_id, t) for t in chain]
+				for cell, t in zip(chain_cells, chain):
+					centroids[cell] = _triangle_centroid(triangles[t])
+				for a, b, portal in zip(chain_cells, chain_cells[1:], inner_portals):
+					portals[(a, b)] = portal
+			else:
+				chain_cells = [node_id]
+				centroids[node_id] = self.nodes[node_id]
+			# Sin portal entre los dos nodos, string_pull devuelve None y se usan los centroides
+			if cells and entry_portal is not None:
+				portals[(cells[-1], chain_cells[0])] = entry_portal
+			cells.extend(chain_cells)
+		return cells, centroids, portals
+
+	def _triangle_chain(self, node_id, entry_point, exit_point):
+		"""
+		Triángulos de node_id (triangulación restringida, calculada una vez) que unen el que contiene entry_point
+		con el que contiene exit_point: (triángulos, índices de la cadena, aristas compartidas entre triángulos consecutivos).
+		La triangulación de un polígono simple es un árbol, así que la cadena es única.
+		"""
+		triangulation = self._triangulations.get(node_id)
+		if triangulation is None:
+			triangles = [tuple(map(tuple, get_coordinates(t)[:3])) for t in get_parts(constrained_delaunay_triangles(self.nav_polygons[node_id]))]
+			shared = {}
+			for t, triangle in enumerate(triangles):
+				for k in range(3):
+					shared.setdefault(frozenset((triangle[k], triangle[(k + 1) % 3])), []).append(t)
+			triangulation = (triangles, shared)
+			self._triangulations[node_id] = triangulation
+		triangles, shared = triangulation
+		first = _containing_triangle(triangles, entry_point)
+		last = _containing_triangle(triangles, exit_point)
+		parents = {first: None}
+		frontier = [first]
+		while frontier and last not in parents:
+			t = frontier.pop()
+			triangle = triangles[t]
+			for k in range(3):
+				for neighbor in shared[frozenset((triangle[k], triangle[(k + 1) % 3]))]:
+					if neighbor not in parents:
+						parents[neighbor] = (t, (triangle[k], triangle[(k + 1) % 3]))
+						frontier.append(neighbor)
+		chain = [last]
+		inner_portals = []
+		while parents[chain[-1]] is not None:
+			t, portal = parents[chain[-1]]
+			chain.append(t)
+			inner_portals.append(portal)
+		return triangles, chain[::-1], inner_portals[::-1]
+
+	def edge_cost(self, id1, id2):
+		"""Coste de la arista id1-id2: el valor sobrescrito o la distancia entre centroides (como mínimo MIN_EDGE_COST)."""
+		cost = self.edge_costs.get(edge_key(id1, id2))
+		if cost is not None:
+			return cost
+		x1, y1 = self.nodes[id1]
+		x2, y2 = self.nodes[id2]
+		return max(((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5, MIN_EDGE_COST)
+
+	def set_edge_cost(self, id1, id2, cost=None):
+		"""
+		Sobrescribe el coste de una arista (None restaura el coste por defecto) e invalida los datos derivados.
+		El coste no debe bajar de la distancia entre centroides: es la heurística de A* y D* Lite.
+		"""
+		key = edge_key(id1, id2)
+		if cost is None:
+			self.edge_costs.pop(key, None)
+		else:
+			self.edge_costs[key] = cost
+		self._invalidate_derived(key)
+
+	def _invalidate_derived(self, key):
+		# Cualquier cambio del grafo deja obsoletos los datos precalculados, cambia la versión y queda registrado
+		self.path_table = None
+		self.hierarchy = None
+		self.landmarks = None
+		self.edge_changes.append(key)
+		self.version += 1
+
+	def edges_changed_since(self, version):
+		"""Aristas (edge_key) cambiadas de coste o de conexión desde version, en orden (puede haber repetidas)."""
+		return self.edge_changes[version:]
+
+	def nearest_objects(self, start_node_id, objects_by_node, k=1, max_distance=float('inf')):
+		"""
+		Los k objetos más cercanos a start_node_id por distancia sobre el grafo, con un solo Dijkstra acotado.
+		objects_by_node es el índice node_id -> [objetos] (ver index_by_node).
+		Devuelve [(objeto, distancia, camino de nodos)] ordenado por distancia.
+		"""
+		if start_node_id not in self.nodes or not objects_by_node:
+			return []
+		results = []
+		for node_id, distance, path in nearest_targets(self.weighted_graph(), start_node_id, objects_by_node, k, max_distance):
+			for obj in objects_by_node[node_id]:
+				results.append((obj, distance, path))
+		return results[:k]
+
+	def label_components(self):
+		"""Etiqueta las componentes conexas del grafo con un BFS por componente."""
+		self.components = {}
+		self.component_sizes = {}
+		self._next_component = 0
+		for node_id in self.nodes:
+			if node_id not in self.components:
+				self._relabel(self._collect_component(node_id), self._new_component())
+
+	def _new_component(self):
+		label = self._next_component
+		self._next_component += 1
+		return label
+
+	def _collect_component(self, node_id):
+		# Nodos alcanzables desde node_id sin salir de su etiqueta actual
+		label = self.components.get(node_id)
+		queue = deque([node_id])
+		visited = {node_id}
+		while queue:
+			current_id = queue.popleft()
+			for neighbor_id in self.graph.get(current_id, []):
+				if neighbor_id not in visited and self.components.get(neighbor_id) == label:
+					visited.add(neighbor_id)
+					queue.append(neighbor_id)
+		return visited
+
+	def _relabel(self, node_ids, label):
+		for node_id in node_ids:
+			old_label = self.components.get(node_id)
+			if old_label == label:
+				continue
+			if old_label is not None:
+				self.component_sizes[old_label] -= 1
+				if self.component_sizes[old_label] == 0:
+					del self.component_sizes[old_label]
+			self.components[node_id] = label
+			self.component_sizes[label] = self.component_sizes.get(label, 0) + 1
+
+	def is_reachable(self, start_node_id, goal_node_id):
+		"""True si ambos nodos están en la misma componente conexa (O(1))."""
+		start_component = self.components.get(start_node_id)
+		return start_component is not None and start_component == self.components.get(goal_node_id)
+
+	def block_edge(self, id1, id2):
+		"""
+		Retira la arista id1-id2 del grafo (p. ej. por un obstáculo dinámico). Si con ello el grafo se parte,
+		sólo se reetiqueta el lado más pequeño: dos BFS alternados desde ambos extremos se detienen en cuanto
+		se encuentran o en cuanto uno de los lados se agota.
+		"""
+		if id2 not in self.graph.get(id1, []):
+			return False
+		self.graph[id1].remove(id2)
+		self.graph[id2].remove(id1)
+		key = edge_key(id1, id2)
+		self.blocked_edges.add(key)
+		self._invalidate_derived(key)
+
+		visited1 = {id1}
+		visited2 = {id2}
+		sides = ((deque([id1]), visited1, visited2), (deque([id2]), visited2, visited1))
+		while True:
+			for frontier, visited, other_visited in sides:
+				if not frontier:
+					# Este lado se agotó sin encontrar al otro: es una componente nueva
+					self._relabel(visited, self._new_component())
+					return True
+				current_id = frontier.popleft()
+				for neighbor_id in self.graph.get(current_id, []):
+					if neighbor_id in other_visited:
+						return True
+					if neighbor_id not in visited:
+						visited.add(neighbor_id)
+						frontier.append(neighbor_id)
+
+	def open_edges(self):
+		"""Aristas de edges que no están bloqueadas, para las búsquedas que parten de la lista de aristas."""
+		if not self.blocked_edges:
+			return self.edges
+		return [edge for edge in self.edges if edge_key(*edge) not in self.blocked_edges]
+
+	def unblock_edge(self, id1, id2):
+		"""Restaura una arista bloqueada; si une dos componentes, la más pequeña toma la etiqueta de la mayor."""
+		key = edge_key(id1, id2)
+		if key not in self.blocked_edges:
+			return False
+		self.blocked_edges.discard(key)
+		self.graph.setdefault(id1, []).append(id2)
+		self.graph.setdefault(id2, []).append(id1)
+		self._invalidate_derived(key)
+
+		label1 = self.components[id1]
+		label2 = self.components[id2]
+		if label1 != label2:
+			if self.component_sizes[label1] < self.component_sizes[label2]:
+				self._relabel(self._collect_component(id1), label2)
+			else:
+				self._relabel(self._collect_component(id2), label1)
+		return True
+
+	def build_hierarchy(self, cluster_size=256):
+		"""Agrupa los polígonos en regiones y precalcula el grafo abstracto de entradas (HPA*)."""
+		self.hierarchy = build_hierarchy(self, cluster_size)
+
+	def build_landmarks(self, count=8):
+		"""Elige count landmarks y guarda sus distancias exactas a todos los nodos (heurística ALT)."""
+		self.landmarks = build_landmarks(self, count)
+
+	def weighted_graph(self):
+		"""Adyacencia ponderada node_id -> [(vecino, coste)] con los costes actuales (compartida, no modificar)."""
+		if self._weighted_graph is None or self._weighted_graph[0] != self.version:
+			self._weighted_graph = (self.version, build_weighted_graph(self.nodes, self.graph, self.edge_costs))
+		return self._weighted_graph[1]
+
+	def farthest_safe_node(self, start_node_id, threat_node_id, min_safe_distance=0.0, threat_distance=None):
+		"""
+		Nodo alcanzable desde start_node_id lo más lejos posible (por el grafo) de threat_node_id y a
+		al menos min_safe_distance. Devuelve (node_id, camino de nodos) o (None, None).
+		threat_distance permite reutilizar distancias ya calculadas desde la amenaza (p. ej. un FlowField).
+		"""
+		if start_node_id not in self.nodes or threat_node_id not in self.nodes:
+			return None, None
+		return farthest_safe_node(self.weighted_graph(), start_node_id, threat_node_id, min_safe_distance, threat_distance)
+
+	def build_path_table(self, max_workers=None):
+		"""
+		Calcula la tabla de caminos mínimos entre todos los pares de nodos (distancia y siguiente salto)
+		ejecutando un Dijkstra desde cada nodo en un pool de procesos.
+		"""
+		weighted_graph = self.weighted_graph()
+		node_ids = list(self.nodes)
+		index = {node_id: i for i, node_id in enumerate(node_ids)}
+		distance = np.full((len(node_ids), len(node_ids)), np.inf)
+		next_hop = np.full((len(node_ids), len(node_ids)), -1, dtype=np.int32)
+		with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(weighted_graph,)) as pool:
+			for source, dist, hops in pool.map(_worker_next_hops, node_ids, chunksize=16):
+				row = index[source]
+				for target, d in dist.items():
+					distance[row, index[target]] = d
+					next_hop[row, index[target]] = index[hops[target]]
+		self.path_table = {'node_ids': node_ids, 'index': index, 'distance': distance, 'next_hop': next_hop}
+		print(f"Tabla de caminos calculada para {len(self.nodes)} nodos")
+
+	def distance(self, start_node_id, goal_node_id):
+		"""Distancia mínima sobre el grafo entre dos nodos (inf si no son alcanzables)."""
+		if self.path_table is None:
+			raise ValueError("Path table not built. Create the NavMesh with build_path_table=True.")
+		index = self.path_table['index']
+		if start_node_id not in index or goal_node_id not in index:
+			return float('inf')
+		return float(self.path_table['distance'][index[start_node_id], index[goal_node_id]])
+
+	def path(self, start_node_id, goal_node_id):
+		"""Camino mínimo (lista de node_ids) recorriendo la tabla de siguientes saltos, o None si no existe."""
+		if self.path_table is None:
+			raise ValueError("Path table not built. Create the NavMesh with build_path_table=True.")
+		index = self.path_table['index']
+		if start_node_id not in index or goal_node_id not in index:
+			return None
+		node_ids = self.path_table['node_ids']
+		next_hop = self.path_table['next_hop']
+		goal = index[goal_node_id]
+		current = index[start_node_id]
+		if next_hop[current, goal] < 0:
+			return None
+		path = [start_node_id]
+		while current != goal:
+			current = int(next_hop[current, goal])
+			path.append(node_ids[current])
+		return path
+
 	def draw_nav_mesh(self, surface, camera_offset=(0, 0), active_nodes=None, graph_color=(0, 0, 255), poly_color=(150, 150, 150), active_poly_color=(0,255,0)):
 		if active_nodes is None:
 			active_nodes = []
@@ -113,27 +761,183 @@ class NavMesh:
 			if pos:
 				pygame.draw.circle(surface, graph_color, (int(pos[0]), int(pos[1])), 2)
 
+	def build_spatial_index(self, cell_size=SPATIAL_CELL_SIZE):
+		"""
+		Indexa los polígonos en una rejilla uniforme: cada celda guarda los nodos cuyo polígono la toca,
+		en el mismo orden que nav_polygons. Localizar un punto pasa a ser una consulta de diccionario
+		más una o dos pruebas exactas de contains.
+		"""
+		cells = {}
+		for node_id, polygon in self.nav_polygons.items():
+			minx, miny, maxx, maxy = polygon.bounds
+			for cy in range(int(miny // cell_size), int(maxy // cell_size) + 1):
+				for cx in range(int(minx // cell_size), int(maxx // cell_size) + 1):
+					if polygon.intersects(box(cx * cell_size, cy * cell_size, (cx + 1) * cell_size, (cy + 1) * cell_size)):
+						cells.setdefault((cx, cy), []).append(node_id)
+		self.spatial_index = {'cell_size': cell_size, 'cells': cells}
+		print(f"Índice espacial: {len(cells)} celdas de {cell_size} px")
+
+	def _build_locator(self):
+		"""
+		Precalcula para locate_many los semiplanos a·p <= c (normales unitarias) de cada polígono convexo,
+		rellenando con filas siempre ciertas hasta el mayor número de lados, y la rejilla del índice espacial
+		como matriz densa de candidatos (-1 = hueco). Los polígonos no convexos se prueban con su anillo de vértices.
+		"""
+		node_ids = list(self.nav_polygons)
+		index = {node_id: i for i, node_id in enumerate(node_ids)}
+		rings = [np.asarray(self.nav_polygons.ring(node_id), dtype=np.float64) for node_id in node_ids]
+		max_sides = max(len(ring) for ring in rings)
+		planes = np.zeros((len(node_ids), max_sides, 3))
+		planes[:, :, 2] = 1.0
+		convex = np.ones(len(node_ids), dtype=bool)
+		for i, (node_id, ring) in enumerate(zip(node_ids, rings)):
+			if node_id in self.anchors:
+				convex[i] = False
+				continue
+			edges = np.roll(ring, -1, axis=0) - ring
+			lengths = np.hypot(edges[:, 0], edges[:, 1])
+			# Con el área con signo se orientan las normales hacia el interior
+			orientation = 1.0 if np.sum(ring[:, 0] * np.roll(ring[:, 1], -1) - np.roll(ring[:, 0], -1) * ring[:, 1]) > 0 else -1.0
+			valid = lengths > 1e-9
+			normals = orientation * np.stack((edges[:, 1], -edges[:, 0]), axis=1)[valid] / lengths[valid, None]
+			planes[i, :len(normals), :2] = normals
+			planes[i, :len(normals), 2] = np.sum(normals * ring[valid], axis=1)
+
+		cell_size = self.spatial_index['cell_size']
+		cells = self.spatial_index['cells']
+		grid_w = max(cx for cx, _ in cells) + 1
+		grid_h = max(cy for _, cy in cells) + 1
+		max_candidates = max(len(candidates) for candidates in cells.values())
+		grid = np.full((grid_h * grid_w, max_candidates), -1, dtype=np.int64)
+		for (cx, cy), candidates in cells.items():
+			if cx >= 0 and cy >= 0:
+				grid[cy * grid_w + cx, :len(candidates)] = [index[node_id] for node_id in candidates]
+
+		self._locator = {
+			'version': (cell_size, len(node_ids)),
+			# Copias en tuplas para las pruebas de un solo punto (contains_point), sin coste de NumPy
+			'bounds': {node_id: (*ring.min(axis=0).tolist(), *ring.max(axis=0).tolist()) for node_id, ring in zip(node_ids, rings)},
+			'rings': {node_id: ring for node_id, ring in zip(node_ids, rings)},
+			'half_planes': {
+				node_id: tuple(tuple(row) for row in planes[i].tolist()) if convex[i] else None
+				for i, node_id in enumerate(node_ids)
+			},
+			'node_ids': np.array(node_ids, dtype=np.int64),
+			'index': index,
+			'planes': planes,
+			'convex': convex,
+			'cell_size': cell_size,
+			'grid_w': grid_w,
+			'grid_h': grid_h,
+			'grid': grid,
+		}
+
+	def _ensure_locator(self):
+		if self._locator is None or self._locator['version'] != (self.spatial_index['cell_size'], len(self.nav_polygons)):
+			self._build_locator()
+
+	def contains_point(self, node_id, x, y, tolerance=1e-6):
+		"""Comprueba si (x, y) está en el polígono node_id: caja envolvente y semiplanos (anillo si no es convexo)."""
+		self._ensure_locator()
+		bounds = self._locator['bounds'].get(node_id)
+		if bounds is None:
+			return False
+		minx, miny, maxx, maxy = bounds
+		if x < minx - tolerance or x > maxx + tolerance or y < miny - tolerance or y > maxy + tolerance:
+			return False
+		half_planes = self._locator['half_planes'][node_id]
+		if half_planes is None:
+			return _point_in_ring(self._locator['rings'][node_id].tolist(), x, y)
+		for a, b, c in half_planes:
+			if a * x + b * y > c + tolerance:
+				return False
+		return True
+
+	def locate_many(self, positions, hints=None, tolerance=1e-6):
+		"""
+		Localiza a la vez un array (M, 2) de posiciones. hints es el nodo anterior de cada una (o None):
+		se prueba primero y después los candidatos de su celda del índice espacial, todo con NumPy.
+		Los polígonos convexos se comprueban con sus semiplanos y los no convexos con su anillo de vértices.
+		Devuelve la lista de node_ids (None si la posición no está en la malla).
+		"""
+		self._ensure_locator()
+		locator = self._locator
+		positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+		count = len(positions)
+		if count == 0:
+			return []
+		x = positions[:, 0]
+		y = positions[:, 1]
+
+		result = np.full(count, -1, dtype=np.int64)
+
+		# Primero el nodo anterior de cada posición (caso habitual: el agente no ha cambiado de polígono)
+		if hints is not None:
+			hinted = np.array([locator['index'].get(hint, -1) for hint in hints], dtype=np.int64)
+			inside = self._inside(hinted[:, None], x, y, tolerance)[:, 0]
+			result[inside] = hinted[inside]
+
+		# El resto prueba los polígonos de su celda del índice espacial
+		pending = np.nonzero(result < 0)[0]
+		if len(pending):
+			px = x[pending]
+			py = y[pending]
+			cx = np.floor(px / locator['cell_size']).astype(np.int64)
+			cy = np.floor(py / locator['cell_size']).astype(np.int64)
+			inside_grid = (cx >= 0) & (cy >= 0) & (cx < locator['grid_w']) & (cy < locator['grid_h'])
+			candidates = np.full((len(pending), locator['grid'].shape[1]), -1, dtype=np.int64)
+			candidates[inside_grid] = locator['grid'][cy[inside_grid] * locator['grid_w'] + cx[inside_grid]]
+			inside = self._inside(candidates, px, py, tolerance)
+			found = inside.any(axis=1)
+			chosen = candidates[np.arange(len(pending)), np.argmax(inside, axis=1)]
+			result[pending[found]] = chosen[found]
+
+		node_ids = locator['node_ids']
+		return [int(node_ids[i]) if i >= 0 else None for i in result]
+
+	def _inside(self, candidates, x, y, tolerance):
+		"""Matriz booleana: si (x[i], y[i]) está dentro del polígono candidates[i, j] (-1 = hueco)."""
+		locator = self._locator
+		valid = candidates >= 0
+		safe = np.where(valid, candidates, 0)
+		# Prueba de semiplanos: dentro si a·p <= c (+ tolerancia) para todos los lados
+		planes = locator['planes'][safe]
+		inside = np.all(planes[..., 0] * x[:, None, None] + planes[..., 1] * y[:, None, None] <= planes[..., 2] + tolerance, axis=2)
+		inside &= valid
+
+		# Polígonos no convexos: prueba par-impar con su anillo, sólo para los candidatos afectados
+		concave = valid & ~locator['convex'][safe]
+		if concave.any():
+			rows, cols = np.nonzero(concave)
+			polygons = candidates[rows, cols]
+			for polygon_index in np.unique(polygons):
+				mask = polygons == polygon_index
+				ring = locator['rings'][int(locator['node_ids'][polygon_index])]
+				inside[rows[mask], cols[mask]] = _points_in_ring(ring, x[rows[mask]], y[rows[mask]])
+		return inside
+
 	def find_node_at_position(self, position, start_node_id=None):
-		character_point = Point(position[0], position[1])
+		x, y = position[0], position[1]
 
+		# Caso habitual: el personaje sigue en su polígono o ha pasado a uno vecino
 		if start_node_id is not None and start_node_id in self.nav_polygons:
-			if self.nav_polygons[start_node_id].contains(character_point):
+			if self.contains_point(start_node_id, x, y):
 				return start_node_id
+			for neighbor_id in self.graph.get(start_node_id, []):
+				if self.contains_point(neighbor_id, x, y):
+					return neighbor_id
 
-			queue = deque([start_node_id])
-			visited = {start_node_id}
+		# Consulta en frío: sólo se prueban los polígonos de la celda de la rejilla
+		if self.spatial_index is not None:
+			cell_size = self.spatial_index['cell_size']
+			cell = (int(x // cell_size), int(y // cell_size))
+			for node_id in self.spatial_index['cells'].get(cell, ()):
+				if self.contains_point(node_id, x, y):
+					return node_id
+			return None
 
-			while queue:
-				current_id = queue.popleft()
-				for neighbor_id in self.graph.get(current_id, []):
-					if neighbor_id not in visited:
-						visited.add(neighbor_id)
-						if self.nav_polygons[neighbor_id].contains(character_point):
-							return neighbor_id
-						queue.append(neighbor_id)
-		
-		for node_id, polygon in self.nav_polygons.items():
-			if polygon.contains(character_point):
+		for node_id in self.nav_polygons:
+			if self.contains_point(node_id, x, y):
 				return node_id
 		
-		return None
\ No newline at end of file
+		return None
@@ -1,7 +1,15 @@
 from typing import Dict, Any, Optional
 from imports.pathfinding.a_star import a_star_search
+from imports.pathfinding.d_star_lite import DStarLite
+from imports.pathfinding.path_corridor import PathCorridor
+from imports.nav_mesh import index_by_node
 import math
 import time
+from pygame.math import Vector2
+
+# Búsquedas pendientes en la cola por presupuesto a partir de las cuales las que pueden esperar
+# (prioridad > 0) se mandan al pool de procesos en lugar de alargar la cola
+PATH_QUEUE_OVERFLOW = 2
 
 def _set_algorithm_from_params(npc, params: Optional[Dict[str, Any]]):
     """Helper: configurar algoritmo en el NPC si params lo indican."""
@@ -15,6 +23,71 @@ def _set_algorithm_from_params(npc, params: Optional[Dict[str, Any]]):
         alg_params = params.get('algorithm_params', {})
         npc.set_algorithm(**alg_params)
 
+def _find_path(world, start_node, goal_node, quality='default'):
+    """
+    Helper: calcular la ruta de nodos. Las búsquedas 'default' (óptimas) salen de la tabla de caminos
+    de la NavMesh si está precalculada; las demás calidades (ver QUALITY_PROFILES) y las búsquedas sin
+    tabla van al PathPlanner del mundo y, como último recurso, a A* directo.
+    """
+    nav_mesh = getattr(world, 'nav_mesh', None)
+    if nav_mesh is not None and not nav_mesh.is_reachable(start_node, goal_node):
+        return None
+    if quality == 'default' and nav_mesh is not None and getattr(nav_mesh, 'path_table', None) is not None:
+        return nav_mesh.path(start_node, goal_node)
+    planner = getattr(world, 'path_planner', None)
+    if planner is not None:
+        return planner.find_path(start_node, goal_node, quality)
+    return a_star_search(start_node, goal_node, world.nav_mesh.nodes, world.nav_mesh.open_edges())
+
+def _request_path(world, npc, start_node, goal_node, explicit_target, goal_pos, priority=0, quality='default'):
+    """
+    Helper: pedir la ruta de nodos sin bloquear el frame. Las búsquedas 'default' con tabla de caminos
+    se responden al instante; el resto se encola con su prioridad y calidad en la cola por presupuesto
+    del mundo, salvo las que pueden esperar cuando la cola ya está cargada (PATH_QUEUE_OVERFLOW), que van
+    al pool de procesos. El NPC avanza con DynamicSeek hacia goal_pos hasta que llega el resultado.
+    Devuelve False si ya se sabe en este frame que no hay camino.
+    """
+    nav_mesh = world.nav_mesh
+    if not nav_mesh.is_reachable(start_node, goal_node):
+        return False
+    explicit_target.kinematic.position = Vector2(goal_pos)
+    queue = getattr(world, 'path_queue', None)
+    pool = getattr(world, 'path_pool', None)
+    if (quality == 'default' and nav_mesh.path_table is not None) or (queue is None and pool is None):
+        path_nodes = _find_path(world, start_node, goal_node, quality)
+        if not path_nodes:
+            return False
+        npc.follow_path_from_nodes(path_nodes, nav_mesh.nodes, explicit_target=explicit_target, nav_mesh=nav_mesh)
+        return True
+    # El resultado de la cola llega en su tick() por callback; el del pool se consulta en cada frame
+    overflow = queue is not None and pool is not None and priority > 0 and len(queue) >= PATH_QUEUE_OVERFLOW
+    if queue is not None and not overflow:
+        ticket = queue.request(start_node, goal_node, npc.receive_path, priority=priority, profile=quality)
+    else:
+        ticket = pool.request(start_node, goal_node, quality)
+    npc.request_path(ticket, nav_mesh.nodes, explicit_target, nav_mesh=nav_mesh)
+    return True
+
+def _follow_nearest_object(world, npc, objects, include, explicit_target):
+    """
+    Helper: elegir el objeto más cercano por distancia sobre la NavMesh (no en línea recta) con un único
+    Dijkstra acotado desde el nodo del NPC, y seguir el camino mínimo que devuelve esa misma búsqueda sea cual
+    sea path_quality: a la cola sólo van las búsquedas de los fallbacks, que no tienen este resultado.
+    Devuelve la posición del objeto elegido o None si no hay NavMesh, nodo actual u objeto alcanzable.
+    """
+    nav_mesh = getattr(world, 'nav_mesh', None)
+    start_node = getattr(npc, 'current_node_id', None)
+    if nav_mesh is None or start_node is None:
+        return None
+    nearest = nav_mesh.nearest_objects(start_node, index_by_node(objects, include), k=1)
+    if not nearest:
+        return None
+    obj, _, path_nodes = nearest[0]
+    target_pos = obj.initial_pos
+    explicit_target.kinematic.position = Vector2(target_pos)
+    npc.follow_path_from_nodes(path_nodes, nav_mesh.nodes, explicit_target=explicit_target, nav_mesh=nav_mesh)
+    return target_pos
+
 # --- Acciones específicas para la Tejedora (TEJER / LANZAR_RED / ALERTAR) ---
 
 def action_enter_search_jars(context, params: Dict[str, Any]):
@@ -35,6 +108,11 @@ def action_enter_search_jars(context, params: Dict[str, Any]):
     protected_jars = getattr(world, 'protected_jars', set())
     if not jar_positions:
         return
+    # Con NavMesh: el tarro más cercano por el grafo y su camino salen de un mismo Dijkstra
+    target_pos = _follow_nearest_object(world, npc, jar_positions, lambda j: not j.on_web, params['explicit_target'])
+    if target_pos is not None:
+        npc.hsm_goal = target_pos
+        return
     protected_jars = {j for j in jar_positions if j.on_web}
     # Encontrar tarro más cercano que no esté protegido
     min_dist = float('inf')
@@ -62,11 +140,9 @@ def action_enter_search_jars(context, params: Dict[str, Any]):
             except Exception as e:
                 target_node = None
             # Si hay nodos, usar follow_path_from_nodes 
-            if target_node is not None:
-                path_nodes = a_star_search(npc.current_node_id, target_node, world.nav_mesh.nodes, world.nav_mesh.edges)
-                target = params['explicit_target']
-                target.kinematic.position = target_pos
-                npc.follow_path_from_nodes(path_nodes, world.nav_mesh.nodes, explicit_target=target)
+            quality = params.get('path_quality', 'default')
+            priority = params.get('path_priority', 0)
+            if target_node is not None and _request_path(world, npc, npc.current_node_id, target_node, params['explicit_target'], target_pos, priority=priority, quality=quality):
                 return
         # Fallback: usar set_algorithm con target explícito
         npc.algorithm_name = 'FollowPath'
@@ -82,7 +158,7 @@ def action_update_search_jars(context, dt: float, params: Dict[str, Any]):
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0, 0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
 
@@ -130,7 +206,7 @@ def action_update_protect(context, dt: float, params: Dict[str, Any]):
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0, 0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
 
@@ -176,7 +252,7 @@ def action_update_throw_net(context, dt: float, params: Dict[str, Any]):
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0, 0)
     npc.update_with_algorithm(dt, uses_rotation=True, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
     if hasattr(npc, 'perform_throw_net'):
@@ -249,7 +325,45 @@ def action_exit_alert(context, params: Dict[str, Any]):
 def action_enter_cazar(context, params):
     """Entrar en CAZAR: configurar algoritmo de búsqueda/persecución."""
     npc = context.npc
+    world = context.world
     npc.current_animation = 'walk'
+    nav_mesh = getattr(world, 'nav_mesh', None) if world else None
+    player = getattr(world, 'player', None) if world else None
+    chase_mode = params.get('chase_mode')
+    flow_field = getattr(world, 'flow_field', None) if world else None
+    if chase_mode == 'flow_field' and flow_field is not None and player is not None:
+        # Campo de flujo compartido: todas las cazadoras consultan el mismo Dijkstra desde el nodo del jugador
+        alg_params = params.get('algorithm_params', {})
+        npc.algorithm_name = 'FlowFieldFollow'
+        npc.set_algorithm(
+            flow_field=flow_field,
+            target=player,
+            max_acceleration=alg_params.get('max_acceleration', 150),
+            max_speed=alg_params.get('max_speed', 100),
+            target_radius=alg_params.get('target_radius', 5),
+            slow_radius=alg_params.get('slow_radius', 100)
+        )
+        return
+    if chase_mode in ('replanner', 'corridor') and nav_mesh is not None and player is not None:
+        # Persecución con D* Lite o con un corredor de polígonos: el replanificador se conserva entre
+        # entradas a CAZAR para reparar el camino anterior en lugar de repetirlo desde cero
+        replanner_class = DStarLite if chase_mode == 'replanner' else PathCorridor
+        replanner = getattr(npc, 'replanner', None)
+        if not isinstance(replanner, replanner_class) or replanner.nav_mesh is not nav_mesh:
+            if replanner_class is PathCorridor:
+                npc.replanner = PathCorridor(nav_mesh, planner=getattr(world, 'path_planner', None))
+            else:
+                npc.replanner = DStarLite(nav_mesh)
+        npc.algorithm_name = 'FollowPath'
+        npc.set_algorithm(
+            path=None,
+            explicit_target=params['explicit_target'],
+            path_offset=1.0,
+            replanner=npc.replanner,
+            goal=player,
+            nav_mesh=nav_mesh
+        )
+        return
     _set_algorithm_from_params(npc, params)
 
 def action_update_cazar(context, dt, params):
@@ -257,7 +371,7 @@ def action_update_cazar(context, dt, params):
     npc = context.npc
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0,0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
@@ -404,6 +518,13 @@ def action_enter_flee_with_jar(context, params):
     target_pos = None
     if webs:
         print("webs:", webs)
+        # Con NavMesh: la red libre más cercana por el grafo y su camino salen de un mismo Dijkstra
+        target_pos = _follow_nearest_object(
+            world, npc, webs, lambda w: not getattr(w, 'has_pot', getattr(w, 'on_web', False)), params['explicit_target']
+        )
+        if target_pos is not None:
+            npc.hsm_goal = target_pos
+            return
         min_d = float('inf')
         for w in webs:
             has_pot = getattr(w, 'has_pot', None)
@@ -446,11 +567,8 @@ def action_enter_flee_with_jar(context, params):
                     start_node = None
                 target_node = nav_mesh.find_node_at_position(target_pos)
                 if start_node is not None and target_node is not None:
-                    # calcular ruta A* (devuelve lista de node ids)
-                    path_nodes = a_star_search(start_node, target_node, nav_mesh.nodes, nav_mesh.edges)
-                    if path_nodes:
-                        # llamar follow_path_from_nodes con nodos calculados
-                        npc.follow_path_from_nodes(path_nodes, nav_mesh.nodes, explicit_target=params['explicit_target'])
+                    # pedir la ruta (inmediata con tabla de caminos o asíncrona con el pool)
+                    if _request_path(world, npc, start_node, target_node, params['explicit_target'], target_pos, priority=params.get('path_priority', 0), quality=params.get('path_quality', 'default')):
                         # guardar meta HSM para condiciones posteriores
                         npc.hsm_goal = target_pos
                         return
@@ -469,7 +587,7 @@ def action_update_flee_with_jar(context, dt, params):
     npc = context.npc
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0,0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
@@ -507,7 +625,7 @@ def action_update_flee(context, dt, params):
     npc = context.npc
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0,0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
@@ -563,7 +681,7 @@ def action_update_protect_egg(context, dt, params):
     npc = context.npc
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0,0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
@@ -583,62 +701,30 @@ def action_enter_search_safe_zone(context, params):
     world = context.world
     npc.current_animation = 'walk'
     min_distance = float(params.get('min_safe_distance', 200.0)) if params else 200.0
-    top_candidates = int(params.get('top_candidates', 8)) if params else 8
     
-    # 2) Intentar elegir nodo de nav_mesh más lejano del jugador y alcanzable por A*
+    # Elegir el nodo alcanzable más lejano del jugador (por el grafo) con dos barridos de Dijkstra:
+    # uno desde el jugador y otro desde el NPC, que además deja construido el camino
     nav_mesh = getattr(world, 'nav_mesh', None)
     player = getattr(world, 'player', None)
     if nav_mesh and nav_mesh.nodes and player:
         try:
-            # obtener posición del jugador
-            if hasattr(player, 'kinematic') and hasattr(player.kinematic, 'position'):
-                ppos = (player.kinematic.position.x, player.kinematic.position.y)
-            elif hasattr(world, 'player_position'):
-                ppos = tuple(world.player_position)
-            else:
-                ppos = None
-
-            if ppos is not None:
-                # construir lista de (node_id, node_pos, dist_to_player)
-                nodes = [(nid, tuple(pos), (pos[0]-ppos[0])**2 + (pos[1]-ppos[1])**2)
-                         for nid, pos in nav_mesh.nodes.items()]
-
-                # ordenar por distancia al jugador descendente (más lejos primero)
-                nodes.sort(key=lambda t: t[2], reverse=True)
+            start_node = getattr(npc, 'current_node_id', None)
+            if start_node is None:
+                start_node = nav_mesh.find_node_at_position((npc.kinematic.position.x, npc.kinematic.position.y))
+            player_node = getattr(player, 'current_node_id', None)
+            if player_node is None:
+                player_node = nav_mesh.find_node_at_position((player.kinematic.position.x, player.kinematic.position.y))
+            if start_node is None or player_node is None:
+                return
 
-                # encontrar nodo inicial del NPC (o calcular uno cercano)
-                try:
-                    start_node = getattr(npc, 'current_node_id', None)
-                    if start_node is None:
-                        start_node = nav_mesh.find_node_at_position((npc.kinematic.position.x, npc.kinematic.position.y))
-                except Exception:
-                    start_node = None
+            # Si el campo de flujo ya está centrado en el jugador, sus distancias ahorran el primer barrido
+            flow_field = getattr(world, 'flow_field', None)
+            threat_distance = flow_field.distances_from(player_node) if flow_field is not None else None
 
-                # probar los primeros candidatos y verificar A* alcance
-                attempts = 0
-                for nid, npos, _ in nodes:
-                    if attempts >= top_candidates:
-                        break
-                    attempts += 1
-                    # opcional: evitar nodos demasiado cercanos al jugador
-                    if math.hypot(npos[0] - ppos[0], npos[1] - ppos[1]) < min_distance:
-                        continue
-                    # si no tenemos start_node, intentar usar A* desde el nodo mas cercano al NPC
-                    try:
-                        if start_node is None:
-                            # encontrar nodo cercano al NPC y asignarlo
-                            start_node = nav_mesh.find_node_at_position((npc.kinematic.position.x, npc.kinematic.position.y))
-                            if start_node is None:
-                                continue
-                        # intentar A*
-                        path_nodes = a_star_search(start_node, nid, nav_mesh.nodes, nav_mesh.edges)
-                        if path_nodes:
-                            npc.follow_path_from_nodes(path_nodes, nav_mesh.nodes, explicit_target=params['explicit_target'])
-                            npc.hsm_goal = nid
-                            return
-                    except Exception:
-                        # ignorar candidatos con fallo en A*
-                        continue
+            safe_node, path_nodes = nav_mesh.farthest_safe_node(start_node, player_node, min_distance, threat_distance)
+            if path_nodes:
+                npc.follow_path_from_nodes(path_nodes, nav_mesh.nodes, explicit_target=params['explicit_target'], nav_mesh=nav_mesh)
+                npc.hsm_goal = safe_node
         except Exception:
             pass
 
@@ -647,7 +733,7 @@ def action_update_search_safe_zone(context, dt, params):
     npc = context.npc
     world = context.world
     bounds = (world.map.width_pixels, world.map.height_pixels) if world and hasattr(world, 'map') else None
-    obstacles = getattr(world.map, 'obstacles', None) if world and hasattr(world, 'map') else None
+    obstacles = getattr(world.map, 'obstacle_index', None) if world and hasattr(world, 'map') else None
     nav_mesh = getattr(world, 'nav_mesh', None) if world else None
     margin = (npc.sprite_size[0] // 2, npc.sprite_size[1] // 2) if hasattr(npc, 'sprite_size') else (0,0)
     npc.update_with_algorithm(dt, uses_rotation=False, bounds=bounds, margin=margin, obstacles=obstacles, nav_mesh=nav_mesh)
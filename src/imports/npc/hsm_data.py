@@ -310,6 +310,10 @@ def build_tejedora_hsm(context: Context) -> HSM:
 		},
         params={
 			'explicit_target': Player("Target", 0, 0, 0),
+			# Calidad de la búsqueda de caminos: 'default' (óptima), 'fast' o 'rough' (ver QUALITY_PROFILES)
+			'path_quality': 'fast',
+			# Prioridad en la cola de caminos (menor valor = más urgente): buscar tarros puede esperar
+			'path_priority': 1,
 			'condition_checks': {
 				'reached_goal': "encuentra_tarro",
 			}
@@ -410,6 +414,9 @@ def build_cazadora_hsm(context: Context) -> HSM:
 		},
 		params={
 			'explicit_target': Player("Target", 0, 0, 0),
+			'path_quality': 'fast',
+			# Huir con el tarro es lo más urgente de la cola de caminos
+			'path_priority': 0,
 			'algorithm_name': 'FollowPath',
             'algorithm_params': {},
 			'condition_checks': {
@@ -439,6 +446,10 @@ def build_cazadora_hsm(context: Context) -> HSM:
 			'recibe_dano_critico': 'HUIR'
 		},
 		params={
+			# 'flow_field' (campo compartido), 'replanner' (D* Lite propio), 'corridor' (corredor de polígonos)
+			# o ausente (DynamicArrive directo)
+			'chase_mode': 'flow_field',
+			'explicit_target': Player("Target", 0, 0, 0),
 			'algorithm_name': 'DynamicArrive',
 			'algorithm_params': {
 				'target': getattr(context.world, 'player', Player("Target", 0,0,0)),
@@ -10,6 +10,7 @@ from imports.map.path import AStarPath
 from imports.moves.path_following import FollowPath
 from imports.npc.hsm_data import Context as HSMContext
 from imports.objects.game_obj import SpiderProjectile
+from imports.pathfinding.node_tracker import NodeTracker
 
 # Directorio base para cargar recursos
 BASE_DIR = Path(__file__).resolve().parents[3]   # cuatro niveles arriba
@@ -68,6 +69,11 @@ class NPC:
 		# Rellenar la superficie de la sombra con un color negro semi-transparente
 		self.shadow_surface.fill((0, 0, 0, 100), special_flags=BLEND_RGBA_MULT)
 		self.current_node_id = None
+		self.batch_locate = False	# True si el bucle del juego actualiza current_node_id en lote (NavMesh.locate_many)
+		self.node_tracker = None	# Seguimiento incremental del nodo actual (recorrido por portales)
+		self.route = None			# Ruta jerárquica en curso (se refina tramo a tramo)
+		self.replanner = None		# Replanificador incremental (D* Lite) para perseguir al jugador
+		self.pending_path = None	# Búsqueda pedida al pool que aún no ha terminado
 		self.hsm = None
 		self.hsm_goal = None
 		self._alert_started_at =  0.0
@@ -143,8 +149,20 @@ class NPC:
 		if hasattr(self, 'hsm') and self.hsm:
 			self.hsm.update(dt)
 	
-	def follow_path_from_nodes(self, path_nodes, nav_mesh_nodes, explicit_target):
-		path_points = [Vector2(nav_mesh_nodes[node_id]) for node_id in path_nodes]
+	def follow_path_from_nodes(self, path_nodes, nav_mesh_nodes, explicit_target, route=None, nav_mesh=None):
+		self.route = route
+		if nav_mesh is not None and len(path_nodes) >= 2:
+			# Suavizado por portales (funnel): sólo las esquinas necesarias en lugar de todos los centroides.
+			# El margen separa los puntos de giro de las esquinas para reducir colisiones.
+			corners = nav_mesh.smooth_path(
+				self.kinematic.position,
+				nav_mesh_nodes[path_nodes[-1]],
+				path_nodes,
+				margin=self.sprite_size[0] / 4
+			)
+			path_points = [Vector2(point) for point in corners]
+		else:
+			path_points = [Vector2(nav_mesh_nodes[node_id]) for node_id in path_nodes]
 
 		if len(path_points) < 2:
 			self.set_algorithm()
@@ -158,6 +176,66 @@ class NPC:
 			explicit_target=explicit_target,
 			path_offset=1.0
 		)
+
+	def request_path(self, ticket, nav_mesh_nodes, explicit_target, nav_mesh=None, max_acceleration=100):
+		# Mientras se calcula el camino, el NPC avanza directo hacia el objetivo con DynamicSeek.
+		# ticket es el Future del pool (se consulta cada frame) o la PathRequest de la cola (llega por receive_path)
+		self.route = None
+		self.algorithm_name = "DynamicSeek"
+		self.set_algorithm(target=explicit_target, max_acceleration=max_acceleration)
+		self.pending_path = (ticket, nav_mesh_nodes, explicit_target, nav_mesh)
+
+	def _resolve_pending_path(self):
+		# Cuando el Future del pool termina, se entrega su resultado como si llegara por callback
+		future = self.pending_path[0]
+		if not hasattr(future, 'done') or not future.done():
+			return
+		if future.cancelled() or future.exception() is not None:
+			self.pending_path = None
+			return
+		self.receive_path(future.result(), future)
+
+	def receive_path(self, path_nodes, ticket=None):
+		# Sustituye el DynamicSeek provisional por el camino calculado, si el NPC todavía lo espera
+		if self.pending_path is None or (ticket is not None and self.pending_path[0] is not ticket):
+			return
+		_, nav_mesh_nodes, explicit_target, nav_mesh = self.pending_path
+		self.pending_path = None
+		if not path_nodes:
+			return
+		# El NPC ya se movió: el camino se retoma desde el nodo en el que está ahora
+		if self.current_node_id in path_nodes:
+			path_nodes = path_nodes[path_nodes.index(self.current_node_id):]
+		# Ya en el nodo de la meta: el DynamicSeek provisional lleva directo al objetivo
+		if len(path_nodes) < 2:
+			return
+		self.follow_path_from_nodes(path_nodes, nav_mesh_nodes, explicit_target, nav_mesh=nav_mesh)
+
+	def follow_route(self, route, nav_mesh_nodes, explicit_target, nav_mesh=None):
+		# Sigue una HierarchicalRoute: sólo se refina el tramo que el NPC está a punto de recorrer
+		if len(route.nodes) == 1:
+			route.next_segment()
+		self._route_nodes = nav_mesh_nodes
+		self._route_target = explicit_target
+		self._route_nav_mesh = nav_mesh
+		self.follow_path_from_nodes(route.nodes, nav_mesh_nodes, explicit_target, route=route, nav_mesh=nav_mesh)
+
+	def _advance_route(self):
+		# Al entrar en el último tramo refinado, refinar el siguiente y extender el camino
+		route = self.route
+		if route is None or self.algorithm_name != "FollowPath":
+			return
+		if route.is_complete:
+			self.route = None
+			return
+		last_segment = route.nodes[route.segment_start:]
+		if self.current_node_id not in last_segment:
+			return
+		if route.next_segment() is None:
+			self.route = None
+			return
+		start_index = route.nodes.index(self.current_node_id)
+		self.follow_path_from_nodes(route.nodes[start_index:], self._route_nodes, self._route_target, route=route, nav_mesh=self._route_nav_mesh)
 		
 	def update_animation(self, dt):
 		# Actualiza el temporizador de la animación
@@ -184,6 +262,10 @@ class NPC:
 		self.algorithm_class = alg
 		self.algorithm_params = params
 		self.algorithm_instance = None
+		# Un algoritmo nuevo descarta el camino que se estuviera esperando
+		if self.pending_path is not None:
+			self.pending_path[0].cancel()
+			self.pending_path = None
 		return True
 	
 	def _ensure_algorithm_instance(self):
@@ -200,6 +282,8 @@ class NPC:
 
 	def update_with_algorithm(self, dt, uses_rotation=False, bounds=None, margin=(0, 0), obstacles=None, nav_mesh=None):
 		# Actualiza la posición y orientación del NPC usando el algoritmo de movimiento
+		if self.pending_path is not None:
+			self._resolve_pending_path()
 		alg = self._ensure_algorithm_instance()
 		if alg is None:
 			return
@@ -215,7 +299,12 @@ class NPC:
 			self.kinematic.orientation += steering.rotation * dt
 		
 		if nav_mesh:
-			self.current_node_id = nav_mesh.find_node_at_position(self.kinematic.position, self.current_node_id)
+			if not self.batch_locate:
+				if self.node_tracker is None or self.node_tracker.nav_mesh is not nav_mesh:
+					self.node_tracker = NodeTracker(nav_mesh, self.current_node_id, self.kinematic.position)
+				self.current_node_id = self.node_tracker.update(self.kinematic.position, self.current_node_id)
+			if self.route is not None:
+				self._advance_route()
 		
 		if bounds:
 			# Determinar los límites mínimos y máximos para X e Y.
@@ -0,0 +1,177 @@
+import heapq
+import math
+
+# Tolerancia (px) al comparar claves: g + h acumula redondeo y un empate exacto puede quedar un bit por encima
+KEY_EPSILON = 1e-6
+
+def _key_before(a, b):
+	"""a < b con tolerancia. Ante un empate dudoso devuelve True: expandir un nodo de más nunca rompe la búsqueda."""
+	if abs(a[0] - b[0]) > KEY_EPSILON:
+		return a[0] < b[0]
+	return a[1] < b[1] + KEY_EPSILON
+
+class DStarLite:
+	"""
+	Búsqueda incremental D* Lite sobre la NavMesh para perseguir una meta que se mueve.
+	La búsqueda está enraizada en la meta (g = coste hasta la meta) y conserva su estado entre llamadas:
+	- si el agente cambia de nodo sólo se ajusta el modificador de claves km;
+	- si la meta cambia de nodo o cambian los costes de la malla, sólo se reparan los nodos afectados.
+	Mantiene la misma interfaz que usa FollowPath para los replanificadores: advance() y path_nodes().
+	"""
+	def __init__(self, nav_mesh):
+		self.nav_mesh = nav_mesh
+		self.start = None
+		self.goal = None
+		self.last_expanded = 0
+		self.total_expanded = 0
+		self._reset()
+
+	def _reset(self):
+		self.g = {}
+		self.rhs = {}
+		self.open_set = []
+		self.open_keys = {}		# node_id -> clave vigente en open_set (las demás entradas del heap están obsoletas)
+		self.km = 0.0
+		self._last_start = None
+		self._mesh_version = None
+
+	# ---------- Utilidades ----------
+	def _heuristic(self, a, b):
+		x1, y1 = self.nav_mesh.nodes[a]
+		x2, y2 = self.nav_mesh.nodes[b]
+		return math.hypot(x2 - x1, y2 - y1)
+
+	def _cost(self, a, b):
+		return self.nav_mesh.edge_cost(a, b)
+
+	def _calculate_key(self, node_id):
+		best = min(self.g.get(node_id, math.inf), self.rhs.get(node_id, math.inf))
+		return (best + self._heuristic(self.start, node_id) + self.km, best)
+
+	def _push(self, node_id):
+		key = self._calculate_key(node_id)
+		self.open_keys[node_id] = key
+		heapq.heappush(self.open_set, (key, node_id))
+
+	def _top(self):
+		# Descarta entradas obsoletas del heap y devuelve (clave, nodo) de la cima
+		while self.open_set:
+			key, node_id = self.open_set[0]
+			if self.open_keys.get(node_id) == key:
+				return key, node_id
+			heapq.heappop(self.open_set)
+		return (math.inf, math.inf), None
+
+	def _update_vertex(self, node_id):
+		if node_id != self.goal:
+			best = math.inf
+			for neighbor_id in self.nav_mesh.graph.get(node_id, []):
+				candidate = self._cost(node_id, neighbor_id) + self.g.get(neighbor_id, math.inf)
+				if candidate < best:
+					best = candidate
+			self.rhs[node_id] = best
+		self.open_keys.pop(node_id, None)
+		if self.g.get(node_id, math.inf) != self.rhs.get(node_id, math.inf):
+			self._push(node_id)
+
+	def _compute_shortest_path(self):
+		expanded = 0
+		while True:
+			top_key, node_id = self._top()
+			start_key = self._calculate_key(self.start)
+			start_g = self.g.get(self.start, math.inf)
+			start_rhs = self.rhs.get(self.start, math.inf)
+			if node_id is None or (not _key_before(top_key, start_key) and start_rhs == start_g):
+				break
+			expanded += 1
+			new_key = self._calculate_key(node_id)
+			if top_key < new_key:
+				self._push(node_id)
+				continue
+			heapq.heappop(self.open_set)
+			del self.open_keys[node_id]
+			if self.g.get(node_id, math.inf) > self.rhs.get(node_id, math.inf):
+				self.g[node_id] = self.rhs[node_id]
+				for neighbor_id in self.nav_mesh.graph.get(node_id, []):
+					self._update_vertex(neighbor_id)
+			else:
+				self.g[node_id] = math.inf
+				self._update_vertex(node_id)
+				for neighbor_id in self.nav_mesh.graph.get(node_id, []):
+					self._update_vertex(neighbor_id)
+		self.last_expanded += expanded
+		self.total_expanded += expanded
+
+	def _repair_changed_edges(self):
+		# Sólo se vuelven a evaluar los extremos de las aristas que cambiaron (coste o conexión) desde la última llamada
+		changed = set()
+		for key in self.nav_mesh.edges_changed_since(self._mesh_version):
+			changed.update(key)
+		self._mesh_version = self.nav_mesh.version
+		for node_id in changed:
+			if node_id in self.nav_mesh.nodes:
+				self._update_vertex(node_id)
+
+	# ---------- API pública ----------
+	def advance(self, start_node_id, goal_node_id):
+		"""
+		Actualiza la posición del agente y la meta y repara la búsqueda.
+		Devuelve True si existe camino desde start hasta goal.
+		"""
+		self.last_expanded = 0
+		if not self.nav_mesh.is_reachable(start_node_id, goal_node_id):
+			return False
+
+		if self.goal is None:
+			# Primera llamada: búsqueda inicial completa
+			self.start = start_node_id
+			self.goal = goal_node_id
+			self._last_start = start_node_id
+			self._mesh_version = self.nav_mesh.version
+			self.rhs[goal_node_id] = 0.0
+			self._push(goal_node_id)
+		else:
+			if start_node_id != self.start:
+				# El agente se movió: las claves se corrigen con km en lugar de reordenar el heap
+				self.km += self._heuristic(self._last_start, start_node_id)
+				self._last_start = start_node_id
+				self.start = start_node_id
+			if goal_node_id != self.goal:
+				# La meta se movió: equivale a cambiar el coste de la arista virtual hacia la meta
+				old_goal = self.goal
+				self.goal = goal_node_id
+				self.rhs[goal_node_id] = 0.0
+				self._update_vertex(goal_node_id)
+				self._update_vertex(old_goal)
+			if self._mesh_version != self.nav_mesh.version:
+				self._repair_changed_edges()
+
+		self._compute_shortest_path()
+		return self.g.get(self.start, math.inf) < math.inf
+
+	def next_waypoint(self, node_id=None):
+		"""Siguiente nodo hacia la meta desde node_id (por defecto, el nodo actual del agente)."""
+		node_id = self.start if node_id is None else node_id
+		if node_id is None or node_id == self.goal:
+			return node_id
+		best = None
+		best_cost = math.inf
+		for neighbor_id in self.nav_mesh.graph.get(node_id, []):
+			candidate = self._cost(node_id, neighbor_id) + self.g.get(neighbor_id, math.inf)
+			if candidate < best_cost:
+				best_cost = candidate
+				best = neighbor_id
+		return best
+
+	def path_nodes(self, max_length=None):
+		"""Camino actual de nodos desde el agente hasta la meta (None si no hay camino)."""
+		if self.start is None or self.g.get(self.start, math.inf) == math.inf:
+			return None
+		path = [self.start]
+		limit = max_length or len(self.nav_mesh.nodes)
+		while path[-1] != self.goal and len(path) <= limit:
+			next_id = self.next_waypoint(path[-1])
+			if next_id is None:
+				return None
+			path.append(next_id)
+		return path
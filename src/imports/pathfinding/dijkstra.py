@@ -0,0 +1,131 @@
+import heapq
+import math
+
+# Coste mínimo de una arista: hay polígonos solapados con el mismo centroide y los algoritmos
+# incrementales (D* Lite) necesitan costes estrictamente positivos
+MIN_EDGE_COST = 1.0
+
+# Grafo ponderado compartido por los procesos del pool (se asigna en el inicializador)
+_worker_graph = None
+
+def build_weighted_graph(nodes, graph, edge_costs=None):
+	"""
+	Construye la adyacencia ponderada node_id -> [(vecino, coste)] usando la distancia entre centroides.
+	edge_costs permite sobrescribir el coste de aristas concretas (clave: tupla ordenada de ids).
+	"""
+	edge_costs = edge_costs or {}
+	weighted = {}
+	for node_id, neighbors in graph.items():
+		x1, y1 = nodes[node_id]
+		adjacent = []
+		for neighbor_id in neighbors:
+			cost = edge_costs.get(edge_key(node_id, neighbor_id))
+			if cost is None:
+				cost = max(math.hypot(nodes[neighbor_id][0] - x1, nodes[neighbor_id][1] - y1), MIN_EDGE_COST)
+			adjacent.append((neighbor_id, cost))
+		weighted[node_id] = adjacent
+	return weighted
+
+def edge_key(id1, id2):
+	"""Clave canónica de una arista no dirigida."""
+	return (id1, id2) if id1 <= id2 else (id2, id1)
+
+def dijkstra(weighted_graph, source):
+	"""Dijkstra desde source. Devuelve (distancias, predecesores) para los nodos alcanzables."""
+	dist = {source: 0.0}
+	came_from = {source: None}
+	open_set = [(0.0, source)]
+	inf = math.inf
+
+	while open_set:
+		d, current = heapq.heappop(open_set)
+		# Entrada obsoleta: el nodo ya salió del heap con una distancia menor
+		if d > dist[current]:
+			continue
+		for neighbor, cost in weighted_graph[current]:
+			nd = d + cost
+			if nd < dist.get(neighbor, inf):
+				dist[neighbor] = nd
+				came_from[neighbor] = current
+				heapq.heappush(open_set, (nd, neighbor))
+	return dist, came_from
+
+def dijkstra_next_hops(weighted_graph, source):
+	"""
+	Dijkstra desde source que, además de la distancia, devuelve para cada destino el primer
+	nodo del camino más corto (next hop) saliendo de source.
+	"""
+	dist, came_from = dijkstra(weighted_graph, source)
+	next_hop = {source: source}
+	# Recorrer en orden de distancia garantiza que el predecesor ya tiene su next hop resuelto
+	for node_id in sorted(dist, key=dist.get):
+		parent = came_from[node_id]
+		if parent is None:
+			continue
+		next_hop[node_id] = node_id if parent == source else next_hop[parent]
+	return dist, next_hop
+
+def farthest_safe_node(weighted_graph, start, threat, min_safe_distance=0.0, threat_distance=None):
+	"""
+	Nodo alcanzable desde start que maximiza la distancia sobre el grafo hasta threat, descartando los que
+	quedan a menos de min_safe_distance. Sólo necesita dos barridos: un Dijkstra desde threat (se puede pasar
+	ya calculado en threat_distance) y otro desde start, que además da el camino.
+	Los empates se resuelven a favor del nodo más cercano a start. Devuelve (node_id, camino) o (None, None).
+	"""
+	if threat_distance is None:
+		threat_distance, _ = dijkstra(weighted_graph, threat)
+	dist, came_from = dijkstra(weighted_graph, start)
+
+	best = None
+	best_key = None
+	for node_id, d in dist.items():
+		safety = threat_distance.get(node_id, math.inf)
+		if safety < min_safe_distance:
+			continue
+		key = (safety, -d)
+		if best_key is None or key > best_key:
+			best_key = key
+			best = node_id
+	if best is None:
+		return None, None
+
+	path = [best]
+	while came_from[path[-1]] is not None:
+		path.append(came_from[path[-1]])
+	return best, path[::-1]
+
+def nearest_targets(weighted_graph, source, targets, k=1, max_distance=math.inf):
+	"""
+	Dijkstra acotado desde source que se detiene al cerrar k nodos de targets (o al superar max_distance).
+	Devuelve una lista [(node_id, distancia, camino desde source)] ordenada por distancia sobre el grafo.
+	"""
+	dist = {source: 0.0}
+	came_from = {source: None}
+	open_set = [(0.0, source)]
+	found = []
+	while open_set and len(found) < k:
+		d, current = heapq.heappop(open_set)
+		if d > dist[current]:
+			continue
+		if d > max_distance:
+			break
+		if current in targets:
+			path = [current]
+			while came_from[path[-1]] is not None:
+				path.append(came_from[path[-1]])
+			found.append((current, d, tuple(reversed(path))))
+		for neighbor, cost in weighted_graph[current]:
+			nd = d + cost
+			if nd < dist.get(neighbor, math.inf):
+				dist[neighbor] = nd
+				came_from[neighbor] = current
+				heapq.heappush(open_set, (nd, neighbor))
+	return found
+
+def _init_worker(weighted_graph):
+	global _worker_graph
+	_worker_graph = weighted_graph
+
+def _worker_next_hops(source):
+	dist, next_hop = dijkstra_next_hops(_worker_graph, source)
+	return source, dist, next_hop
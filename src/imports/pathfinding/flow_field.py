@@ -0,0 +1,57 @@
+from imports.pathfinding.dijkstra import dijkstra, edge_key
+
+class FlowField:
+	"""
+	Campo de flujo hacia un nodo objetivo (normalmente el del jugador) sobre la NavMesh.
+	Un Dijkstra desde el objetivo (el grafo es no dirigido, así que equivale al Dijkstra inverso)
+	da a cada nodo su siguiente nodo hacia el objetivo y el punto de paso (centro del portal) para llegar a él.
+	Sólo se recalcula cuando el objetivo cambia de nodo o cambia la malla, y cualquier número de NPCs
+	lo consulta en O(1) por frame.
+	"""
+	def __init__(self, nav_mesh):
+		self.nav_mesh = nav_mesh
+		self.target_node_id = None
+		self.distance = {}			# node_id -> coste del camino mínimo hasta el objetivo
+		self.next_node = {}			# node_id -> siguiente nodo hacia el objetivo (None en el objetivo)
+		self.waypoints = {}			# node_id -> centro del portal hacia next_node
+		self.recomputes = 0
+		self._mesh_version = None
+		self._weighted_graph = None
+
+	def update(self, target_node_id):
+		"""Recalcula el campo si el objetivo cambió de nodo o si la malla cambió. Devuelve True si recalculó."""
+		if target_node_id is None or target_node_id not in self.nav_mesh.nodes:
+			return False
+		if target_node_id == self.target_node_id and self._mesh_version == self.nav_mesh.version:
+			return False
+		if self._mesh_version != self.nav_mesh.version:
+			self._mesh_version = self.nav_mesh.version
+			self._weighted_graph = self.nav_mesh.weighted_graph()
+
+		self.target_node_id = target_node_id
+		self.distance, self.next_node = dijkstra(self._weighted_graph, target_node_id)
+		self.waypoints = {}
+		for node_id, next_id in self.next_node.items():
+			if next_id is None:
+				continue
+			portal = self.nav_mesh.portals.get(edge_key(node_id, next_id))
+			if portal is None:
+				self.waypoints[node_id] = self.nav_mesh.nodes[next_id]
+			else:
+				(x1, y1), (x2, y2) = portal
+				self.waypoints[node_id] = ((x1 + x2) / 2, (y1 + y2) / 2)
+		self.recomputes += 1
+		return True
+
+	def next_waypoint(self, node_id):
+		"""Punto hacia el que debe moverse un agente en node_id (None en el objetivo o si no es alcanzable)."""
+		return self.waypoints.get(node_id)
+
+	def is_reachable(self, node_id):
+		return node_id in self.distance
+
+	def distances_from(self, node_id):
+		"""Distancias del campo si está centrado en node_id y al día con la malla; None en otro caso."""
+		if node_id != self.target_node_id or self._mesh_version != self.nav_mesh.version:
+			return None
+		return self.distance
@@ -0,0 +1,108 @@
+import math
+
+# Tolerancia (px²) del doble del área: por debajo, los tres puntos se consideran alineados
+AREA_EPSILON = 1e-6
+
+def _triarea2(a, b, c):
+	# Doble del área con signo del triángulo (a, b, c); el signo indica de qué lado de a->b queda c
+	return (c[0] - a[0]) * (b[1] - a[1]) - (b[0] - a[0]) * (c[1] - a[1])
+
+def _side(a, b, c):
+	# Signo de _triarea2 con la misma tolerancia en todas las pruebas: 1, -1 o 0 si están alineados
+	area = _triarea2(a, b, c)
+	if area > AREA_EPSILON:
+		return 1
+	if area < -AREA_EPSILON:
+		return -1
+	return 0
+
+def _same_point(a, b, eps=1e-6):
+	return abs(a[0] - b[0]) < eps and abs(a[1] - b[1]) < eps
+
+def _shrink_portal(p, q, margin):
+	# Acerca los extremos del portal hacia su centro para que el personaje no roce las esquinas
+	length = math.hypot(q[0] - p[0], q[1] - p[1])
+	if margin <= 0 or length == 0:
+		return p, q
+	t = min(margin / length, 0.5)
+	return (
+		(p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t),
+		(q[0] + (p[0] - q[0]) * t, q[1] + (p[1] - q[1]) * t),
+	)
+
+def build_portals(path_nodes, nodes, portals, margin=0.0):
+	"""
+	Devuelve la lista de portales (izquierda, derecha) que atraviesa el camino de nodos,
+	orientados según la dirección de avance desde el centroide de cada polígono (o, si ese centroide
+	queda alineado con el portal, desde el del polígono siguiente, que está al otro lado).
+	"""
+	oriented = []
+	for current_id, next_id in zip(path_nodes, path_nodes[1:]):
+		portal = portals.get((current_id, next_id)) or portals.get((next_id, current_id))
+		if portal is None:
+			return None
+		p, q = _shrink_portal(portal[0], portal[1], margin)
+		side = _side(nodes[current_id], p, q) or -_side(nodes[next_id], p, q)
+		if side > 0:
+			oriented.append((p, q))
+		else:
+			oriented.append((q, p))
+	return oriented
+
+def string_pull(start, goal, path_nodes, nodes, portals, margin=0.0):
+	"""
+	Algoritmo del embudo (string pulling): convierte un camino de nodos en el conjunto mínimo
+	de esquinas entre start y goal que permanece dentro de los portales compartidos.
+	Devuelve la lista de puntos (tuplas) o None si falta algún portal.
+	"""
+	start = (start[0], start[1])
+	goal = (goal[0], goal[1])
+	oriented = build_portals(path_nodes, nodes, portals, margin)
+	if oriented is None:
+		return None
+	funnel = [(start, start)] + oriented + [(goal, goal)]
+
+	points = [start]
+	apex = portal_left = portal_right = start
+	apex_index = left_index = right_index = 0
+
+	i = 1
+	while i < len(funnel):
+		left, right = funnel[i]
+
+		# Actualizar el lado derecho del embudo
+		if _side(apex, portal_right, right) <= 0:
+			if _same_point(apex, portal_right) or _side(apex, portal_left, right) > 0:
+				portal_right = right
+				right_index = i
+			else:
+				# El lado derecho cruza el izquierdo: la esquina izquierda pasa a ser el nuevo ápice
+				if not _same_point(points[-1], portal_left):
+					points.append(portal_left)
+				apex = portal_left
+				apex_index = left_index
+				portal_left = portal_right = apex
+				left_index = right_index = apex_index
+				i = apex_index + 1
+				continue
+
+		# Actualizar el lado izquierdo del embudo
+		if _side(apex, portal_left, left) >= 0:
+			if _same_point(apex, portal_left) or _side(apex, portal_right, left) < 0:
+				portal_left = left
+				left_index = i
+			else:
+				# El lado izquierdo cruza el derecho: la esquina derecha pasa a ser el nuevo ápice
+				if not _same_point(points[-1], portal_right):
+					points.append(portal_right)
+				apex = portal_right
+				apex_index = right_index
+				portal_left = portal_right = apex
+				left_index = right_index = apex_index
+				i = apex_index + 1
+				continue
+		i += 1
+
+	if not _same_point(points[-1], goal):
+		points.append(goal)
+	return points
@@ -0,0 +1,227 @@
+import heapq
+import math
+
+# Centinelas para los nodos virtuales de inicio y meta de la búsqueda abstracta
+_START = object()
+_GOAL = object()
+
+def clusters_of(nodes, cluster_size):
+	"""Región (celda de cluster_size píxeles) de cada nodo según su centroide."""
+	return {
+		node_id: (int(pos[0] // cluster_size), int(pos[1] // cluster_size))
+		for node_id, pos in nodes.items()
+	}
+
+def build_hierarchy(nav_mesh, cluster_size):
+	"""
+	Agrupa los polígonos de la NavMesh en regiones cuadradas de cluster_size píxeles (según su centroide)
+	y construye el grafo abstracto: los nodos son las entradas (polígonos con una arista hacia otra región)
+	y las aristas son los portales entre regiones más las distancias precalculadas dentro de cada región.
+	"""
+	cluster_of = clusters_of(nav_mesh.nodes, cluster_size)
+	abstract_graph = {}
+	entrances = {}
+
+	# Aristas entre regiones (portales)
+	for id1, id2 in nav_mesh.edges:
+		# Se ignoran las aristas bloqueadas (ya no están en graph)
+		if cluster_of[id1] == cluster_of[id2] or id2 not in nav_mesh.graph.get(id1, []):
+			continue
+		cost = nav_mesh.edge_cost(id1, id2)
+		abstract_graph.setdefault(id1, []).append((id2, cost))
+		abstract_graph.setdefault(id2, []).append((id1, cost))
+		entrances.setdefault(cluster_of[id1], set()).add(id1)
+		entrances.setdefault(cluster_of[id2], set()).add(id2)
+
+	# Distancias intra-región entre entradas de la misma región
+	intra_edges = 0
+	for cluster, cluster_entrances in entrances.items():
+		for entrance in cluster_entrances:
+			dist, _ = cluster_dijkstra(nav_mesh, cluster_of, entrance)
+			for other in cluster_entrances:
+				if other != entrance and other in dist:
+					abstract_graph[entrance].append((other, dist[other]))
+					intra_edges += 1
+
+	print(f"Jerarquía construida: {len(set(cluster_of.values()))} regiones, {len(abstract_graph)} entradas, {intra_edges} aristas intra-región")
+	return {
+		'cluster_size': cluster_size,
+		'version': nav_mesh.version,
+		'cluster_of': cluster_of,
+		'entrances': {cluster: sorted(nodes) for cluster, nodes in entrances.items()},
+		'abstract_graph': abstract_graph,
+	}
+
+def cluster_dijkstra(nav_mesh, cluster_of, source, goal=None):
+	"""Dijkstra restringido a la región de source. Si se indica goal, termina al alcanzarlo."""
+	cluster = cluster_of[source]
+	dist = {source: 0.0}
+	came_from = {source: None}
+	open_set = [(0.0, source)]
+	closed = set()
+	while open_set:
+		d, current = heapq.heappop(open_set)
+		if current in closed:
+			continue
+		closed.add(current)
+		if current == goal:
+			break
+		for neighbor_id in nav_mesh.graph.get(current, []):
+			if cluster_of[neighbor_id] != cluster or neighbor_id in closed:
+				continue
+			nd = d + nav_mesh.edge_cost(current, neighbor_id)
+			if nd < dist.get(neighbor_id, math.inf):
+				dist[neighbor_id] = nd
+				came_from[neighbor_id] = current
+				heapq.heappush(open_set, (nd, neighbor_id))
+	return dist, came_from
+
+
+class HierarchicalRoute:
+	"""
+	Ruta abstracta (inicio, entradas..., meta) que se refina a nodos concretos tramo a tramo,
+	sólo cuando el NPC está a punto de recorrer el siguiente tramo.
+	"""
+	def __init__(self, planner, abstract_path):
+		self.planner = planner
+		self.abstract_path = abstract_path
+		self.nodes = [abstract_path[0]]		# nodos concretos refinados hasta ahora
+		self.segment_start = 0				# índice en nodes donde empieza el último tramo refinado
+		self._next_hop = 0
+
+	@property
+	def is_complete(self):
+		return self._next_hop >= len(self.abstract_path) - 1
+
+	def next_segment(self):
+		"""Refina el siguiente tramo de la ruta abstracta y lo añade a nodes. Devuelve el tramo o None."""
+		if self.is_complete:
+			return None
+		u = self.abstract_path[self._next_hop]
+		v = self.abstract_path[self._next_hop + 1]
+		self._next_hop += 1
+		segment = self.planner.refine(u, v)
+		if segment is None:
+			return None
+		self.segment_start = len(self.nodes) - 1
+		self.nodes.extend(segment[1:])
+		return segment
+
+	def full_path(self):
+		"""Refina todos los tramos pendientes y devuelve el camino concreto completo."""
+		while not self.is_complete:
+			if self.next_segment() is None:
+				return None
+		return tuple(self.nodes)
+
+
+class HierarchicalPlanner:
+	"""
+	Planificador jerárquico (estilo HPA*): busca primero sobre el grafo abstracto de regiones y
+	refina después cada tramo con búsquedas restringidas a una sola región.
+	Ofrece la misma interfaz find_path que PathPlanner para poder comparar ambos modos.
+	"""
+	def __init__(self, nav_mesh, cluster_size=256):
+		self.nav_mesh = nav_mesh
+		self.cluster_size = cluster_size
+		self.last_expanded = 0
+		self._ensure_hierarchy()
+
+	def _ensure_hierarchy(self):
+		hierarchy = self.nav_mesh.hierarchy
+		if hierarchy is None or hierarchy['cluster_size'] != self.cluster_size or hierarchy['version'] != self.nav_mesh.version:
+			self.nav_mesh.build_hierarchy(self.cluster_size)
+		return self.nav_mesh.hierarchy
+
+	def plan(self, start_node_id, goal_node_id):
+		"""Devuelve una HierarchicalRoute sin refinar, o None si no hay camino."""
+		self.last_expanded = 0
+		if not self.nav_mesh.is_reachable(start_node_id, goal_node_id):
+			return None
+		hierarchy = self._ensure_hierarchy()
+		cluster_of = hierarchy['cluster_of']
+		abstract_graph = hierarchy['abstract_graph']
+		nodes = self.nav_mesh.nodes
+
+		# Conectar inicio y meta a las entradas de sus regiones
+		start_dist, _ = cluster_dijkstra(self.nav_mesh, cluster_of, start_node_id)
+		goal_dist, _ = cluster_dijkstra(self.nav_mesh, cluster_of, goal_node_id)
+		self.last_expanded += len(start_dist) + len(goal_dist)
+		start_links = [(e, start_dist[e]) for e in hierarchy['entrances'].get(cluster_of[start_node_id], []) if e in start_dist]
+		goal_links = {e: goal_dist[e] for e in hierarchy['entrances'].get(cluster_of[goal_node_id], []) if e in goal_dist}
+
+		goal_x, goal_y = nodes[goal_node_id]
+		def heuristic(node_id):
+			x, y = nodes[node_id]
+			return math.hypot(goal_x - x, goal_y - y)
+
+		g_score = {_START: 0.0}
+		came_from = {}
+		closed = set()
+		open_set = []
+		counter = 0
+		# Camino directo dentro de la misma región
+		if goal_node_id in start_dist:
+			g_score[_GOAL] = start_dist[goal_node_id]
+			came_from[_GOAL] = _START
+			heapq.heappush(open_set, (g_score[_GOAL], counter, _GOAL))
+		for entrance, cost in start_links:
+			counter += 1
+			if cost < g_score.get(entrance, math.inf):
+				g_score[entrance] = cost
+				came_from[entrance] = _START
+				heapq.heappush(open_set, (cost + heuristic(entrance), counter, entrance))
+
+		while open_set:
+			_, _, current = heapq.heappop(open_set)
+			if current in closed:
+				continue
+			closed.add(current)
+			self.last_expanded += 1
+			if current is _GOAL:
+				abstract_path = [goal_node_id]
+				node = came_from[_GOAL]
+				while node is not _START:
+					if node != abstract_path[-1]:
+						abstract_path.append(node)
+					node = came_from[node]
+				if abstract_path[-1] != start_node_id:
+					abstract_path.append(start_node_id)
+				return HierarchicalRoute(self, abstract_path[::-1])
+
+			current_g = g_score[current]
+			neighbors = list(abstract_graph.get(current, []))
+			if current in goal_links:
+				neighbors.append((_GOAL, goal_links[current]))
+			for neighbor, cost in neighbors:
+				if neighbor in closed:
+					continue
+				tentative_g_score = current_g + cost
+				if tentative_g_score < g_score.get(neighbor, math.inf):
+					g_score[neighbor] = tentative_g_score
+					came_from[neighbor] = current
+					counter += 1
+					h = 0.0 if neighbor is _GOAL else heuristic(neighbor)
+					heapq.heappush(open_set, (tentative_g_score + h, counter, neighbor))
+		return None
+
+	def refine(self, u, v):
+		"""Convierte un salto abstracto u -> v en la secuencia de nodos concretos que lo recorre."""
+		cluster_of = self.nav_mesh.hierarchy['cluster_of']
+		if cluster_of[u] != cluster_of[v]:
+			return [u, v]
+		dist, came_from = cluster_dijkstra(self.nav_mesh, cluster_of, u, goal=v)
+		self.last_expanded += len(dist)
+		if v not in came_from:
+			return None
+		segment = [v]
+		while came_from[segment[-1]] is not None:
+			segment.append(came_from[segment[-1]])
+		return segment[::-1]
+
+	def find_path(self, start_node_id, goal_node_id):
+		"""Búsqueda jerárquica completamente refinada (misma salida que PathPlanner.find_path)."""
+		route = self.plan(start_node_id, goal_node_id)
+		if route is None:
+			return None
+		return route.full_path()
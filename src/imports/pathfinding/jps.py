@@ -0,0 +1,267 @@
+import heapq
+import math
+import random
+import time
+from shapely.geometry import LineString, Polygon, box
+from imports.pathfinding.path_planner import PathPlanner
+
+SQRT2 = math.sqrt(2.0)
+
+class GridPlanner:
+	"""
+	Planificador alternativo sobre una rejilla de celdas transitables obtenida rasterizando Map.obstacles
+	una sola vez. Las consultas se resuelven con Jump Point Search (8 direcciones, sin cortar esquinas),
+	que sólo expande los puntos de salto en lugar de todas las celdas del camino.
+	Ofrece la misma interfaz que PathPlanner: locate() (como NavMesh.find_node_at_position), find_path()
+	y las estadísticas de expansiones; los nodos son celdas (cx, cy) y cell_center() da su posición.
+	"""
+	def __init__(self, game_map, cell_size=8, clearance=0):
+		self.cell_size = cell_size
+		self.clearance = clearance
+		self.width = math.ceil(game_map.width_pixels / cell_size)
+		self.height = math.ceil(game_map.height_pixels / cell_size)
+		# Rejilla con un borde de celdas bloqueadas: los saltos se detienen en él sin comprobar límites
+		self.stride = self.width + 2
+		self.walkable = bytearray([0]) * (self.stride * (self.height + 2))
+		for cy in range(self.height):
+			row = (cy + 1) * self.stride + 1
+			self.walkable[row:row + self.width] = bytearray([1]) * self.width
+		self._rasterize(game_map.obstacles)
+
+		# Estadísticas de la última búsqueda
+		self.last_expanded = 0
+		self.last_partial = False
+		self.total_expanded = 0
+		self.searches = 0
+
+	def _rasterize(self, obstacles):
+		"""Marca como bloqueada toda celda cuyo interior solapa un obstáculo (ampliado en clearance)."""
+		clearance = self.clearance
+		for kind, shape in obstacles:
+			if kind == 'edges':
+				# Cada arista bloquea las celdas cuyo interior atraviesa (no las que sólo toca por el borde)
+				for segment in shape:
+					geometry = LineString(segment)
+					if clearance > 0:
+						geometry = geometry.buffer(clearance)
+					self._block(*geometry.bounds, lambda cell, geometry=geometry: geometry.intersects(cell) and not geometry.touches(cell))
+				continue
+			if kind == 'rect':
+				self._block(shape.left - clearance, shape.top - clearance, shape.right + clearance, shape.bottom + clearance)
+				continue
+			geometry = Polygon(shape)
+			if clearance > 0:
+				geometry = geometry.buffer(clearance)
+			self._block(*geometry.bounds, lambda cell: geometry.intersection(cell).area > 0)
+
+	def _block(self, x0, y0, x1, y1, overlaps=None):
+		# Bloquea las celdas de la caja (x0, y0, x1, y1) que cumplen overlaps (todas si es None)
+		size = self.cell_size
+		for cy in range(max(0, int(y0 // size)), min(self.height, math.ceil(y1 / size))):
+			for cx in range(max(0, int(x0 // size)), min(self.width, math.ceil(x1 / size))):
+				if overlaps is not None and not overlaps(box(cx * size, cy * size, (cx + 1) * size, (cy + 1) * size)):
+					continue
+				self.walkable[(cy + 1) * self.stride + cx + 1] = 0
+
+	def is_walkable(self, cx, cy):
+		return self.walkable[(cy + 1) * self.stride + cx + 1] == 1
+
+	def locate(self, position):
+		"""Celda transitable que contiene position o None."""
+		cx = int(position[0] // self.cell_size)
+		cy = int(position[1] // self.cell_size)
+		if 0 <= cx < self.width and 0 <= cy < self.height and self.is_walkable(cx, cy):
+			return (cx, cy)
+		return None
+
+	def cell_center(self, cell):
+		return ((cell[0] + 0.5) * self.cell_size, (cell[1] + 0.5) * self.cell_size)
+
+	def path_points(self, path):
+		"""Posiciones (centros de celda) de los puntos de salto de un camino."""
+		return [self.cell_center(cell) for cell in path]
+
+	def path_length(self, path):
+		return sum(_octile(a, b) for a, b in zip(path, path[1:])) * self.cell_size
+
+	# ---------- Jump Point Search ----------
+	def _jump(self, x, y, dx, dy, goal):
+		"""Avanza desde (x, y) en la dirección (dx, dy) hasta el siguiente punto de salto o None."""
+		walkable = self.walkable
+		stride = self.stride
+		while True:
+			index = (y + 1) * stride + x + 1
+			if not walkable[index]:
+				return None
+			if x == goal[0] and y == goal[1]:
+				return (x, y)
+			if dx and dy:
+				# En diagonal hay punto de salto si alguno de los barridos rectos encuentra uno
+				if self._jump(x + dx, y, dx, 0, goal) or self._jump(x, y + dy, 0, dy, goal):
+					return (x, y)
+				# Sin cortar esquinas: las dos celdas ortogonales deben estar libres
+				if not (walkable[index + dx] and walkable[index + dy * stride] and walkable[index + dx + dy * stride]):
+					return None
+			elif dx:
+				# Vecinos forzados: una pared a la espalda que se abre a un lado
+				if (walkable[index - stride] and not walkable[index - stride - dx]) or (walkable[index + stride] and not walkable[index + stride - dx]):
+					return (x, y)
+			else:
+				if (walkable[index - 1] and not walkable[index - 1 - dy * stride]) or (walkable[index + 1] and not walkable[index + 1 - dy * stride]):
+					return (x, y)
+			x += dx
+			y += dy
+
+	def _neighbors(self, x, y, parent):
+		"""Direcciones que hay que explorar desde (x, y) según la dirección de llegada (poda de JPS)."""
+		walkable = self.walkable
+		index = (y + 1) * self.stride + x + 1
+		stride = self.stride
+
+		def free(ox, oy):
+			return walkable[index + ox + oy * stride]
+
+		if parent is None:
+			directions = []
+			for ox in (-1, 0, 1):
+				for oy in (-1, 0, 1):
+					if (ox or oy) and free(ox, oy) and (not (ox and oy) or (free(ox, 0) and free(0, oy))):
+						directions.append((ox, oy))
+			return directions
+
+		dx = (x > parent[0]) - (x < parent[0])
+		dy = (y > parent[1]) - (y < parent[1])
+		directions = []
+		if dx and dy:
+			if free(0, dy):
+				directions.append((0, dy))
+			if free(dx, 0):
+				directions.append((dx, 0))
+			if free(0, dy) and free(dx, 0) and free(dx, dy):
+				directions.append((dx, dy))
+		elif dx:
+			up, down = free(0, -1), free(0, 1)
+			if free(dx, 0):
+				directions.append((dx, 0))
+				if up and free(dx, -1):
+					directions.append((dx, -1))
+				if down and free(dx, 1):
+					directions.append((dx, 1))
+			if up:
+				directions.append((0, -1))
+			if down:
+				directions.append((0, 1))
+		else:
+			left, right = free(-1, 0), free(1, 0)
+			if free(0, dy):
+				directions.append((0, dy))
+				if left and free(-1, dy):
+					directions.append((-1, dy))
+				if right and free(1, dy):
+					directions.append((1, dy))
+			if left:
+				directions.append((-1, 0))
+			if right:
+				directions.append((1, 0))
+		return directions
+
+	def find_path(self, start_cell, goal_cell, profile='default'):
+		"""
+		Devuelve la tupla de puntos de salto desde start_cell hasta goal_cell (ambos incluidos) o None.
+		Entre dos puntos consecutivos el camino es recto u octogonal, así que basta con seguirlos en orden.
+		profile se acepta por compatibilidad con PathPlanner (JPS siempre devuelve el camino óptimo).
+		"""
+		self.last_expanded = 0
+		if start_cell is None or goal_cell is None or not self.is_walkable(*start_cell) or not self.is_walkable(*goal_cell):
+			return None
+		self.searches += 1
+		goal = tuple(goal_cell)
+		start = tuple(start_cell)
+		g_score = {start: 0.0}
+		came_from = {start: None}
+		closed = set()
+		open_set = [(_octile(start, goal), start)]
+		expanded = 0
+
+		while open_set:
+			_, current = heapq.heappop(open_set)
+			if current in closed:
+				continue
+			closed.add(current)
+			expanded += 1
+			if current == goal:
+				self.last_expanded = expanded
+				self.total_expanded += expanded
+				path = [current]
+				while came_from[path[-1]] is not None:
+					path.append(came_from[path[-1]])
+				return tuple(reversed(path))
+
+			x, y = current
+			for dx, dy in self._neighbors(x, y, came_from[current]):
+				jump_point = self._jump(x + dx, y + dy, dx, dy, goal)
+				if jump_point is None or jump_point in closed:
+					continue
+				tentative_g_score = g_score[current] + _octile(current, jump_point)
+				if tentative_g_score < g_score.get(jump_point, math.inf):
+					g_score[jump_point] = tentative_g_score
+					came_from[jump_point] = current
+					heapq.heappush(open_set, (tentative_g_score + _octile(jump_point, goal), jump_point))
+
+		self.last_expanded = expanded
+		self.total_expanded += expanded
+		return None
+
+def _octile(a, b):
+	dx = abs(a[0] - b[0])
+	dy = abs(a[1] - b[1])
+	return max(dx, dy) + (SQRT2 - 1.0) * min(dx, dy)
+
+def compare_planners(nav_mesh, grid_planner, samples=200, seed=0):
+	"""
+	Resuelve los mismos pares aleatorios de posiciones con la NavMesh (A* + funnel) y con la rejilla (JPS)
+	y devuelve, para cada uno, el tiempo total, las expansiones y la longitud media de los caminos.
+	"""
+	node_ids = list(nav_mesh.nodes)
+	rng = random.Random(seed)
+	pairs = []
+	while len(pairs) < samples:
+		start_pos = nav_mesh.nodes[rng.choice(node_ids)]
+		goal_pos = nav_mesh.nodes[rng.choice(node_ids)]
+		if grid_planner.locate(start_pos) is not None and grid_planner.locate(goal_pos) is not None:
+			pairs.append((start_pos, goal_pos))
+
+	report = {'samples': samples}
+	path_planner = PathPlanner(nav_mesh, cache_size=0, heuristic='alt')
+	started = time.perf_counter()
+	length = 0.0
+	found = 0
+	for start_pos, goal_pos in pairs:
+		path_nodes = path_planner.find_path(nav_mesh.find_node_at_position(start_pos), nav_mesh.find_node_at_position(goal_pos))
+		if path_nodes:
+			corners = nav_mesh.smooth_path(start_pos, goal_pos, path_nodes)
+			length += sum(math.dist(a, b) for a, b in zip(corners, corners[1:]))
+			found += 1
+	report['nav_mesh'] = {
+		'ms': (time.perf_counter() - started) * 1000.0,
+		'expanded': path_planner.total_expanded,
+		'found': found,
+		'mean_length': length / found if found else 0.0,
+	}
+
+	expanded = grid_planner.total_expanded
+	started = time.perf_counter()
+	length = 0.0
+	found = 0
+	for start_pos, goal_pos in pairs:
+		path = grid_planner.find_path(grid_planner.locate(start_pos), grid_planner.locate(goal_pos))
+		if path:
+			length += grid_planner.path_length(path)
+			found += 1
+	report['grid'] = {
+		'ms': (time.perf_counter() - started) * 1000.0,
+		'expanded': grid_planner.total_expanded - expanded,
+		'found': found,
+		'mean_length': length / found if found else 0.0,
+	}
+	return report
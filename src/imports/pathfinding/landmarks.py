@@ -0,0 +1,62 @@
+import math
+import random
+import time
+from imports.pathfinding.dijkstra import dijkstra
+from imports.pathfinding.path_planner import PathPlanner
+
+def select_landmarks(weighted_graph, count, seed_node):
+	"""
+	Selección de landmarks por el punto más lejano: el primero es el nodo más alejado de seed_node
+	y cada siguiente es el que maximiza su distancia mínima a los ya elegidos.
+	Devuelve (lista de landmarks, lista de distancias desde cada uno).
+	"""
+	dist, _ = dijkstra(weighted_graph, seed_node)
+	candidate = max(dist, key=dist.get)
+	landmarks = []
+	distances = []
+	closest = {node_id: math.inf for node_id in dist}
+	while len(landmarks) < count:
+		landmarks.append(candidate)
+		landmark_dist, _ = dijkstra(weighted_graph, candidate)
+		distances.append(landmark_dist)
+		for node_id in closest:
+			closest[node_id] = min(closest[node_id], landmark_dist.get(node_id, math.inf))
+		candidate = max(closest, key=closest.get)
+		if closest[candidate] == 0:
+			break
+	return landmarks, distances
+
+def build_landmarks(nav_mesh, count=8):
+	"""Elige count landmarks y precalcula las distancias exactas sobre el grafo desde cada uno (heurística ALT)."""
+	weighted_graph = nav_mesh.weighted_graph()
+	seed_node = min(nav_mesh.nodes)
+	landmarks, distances = select_landmarks(weighted_graph, count, seed_node)
+	print(f"Landmarks ALT calculados: {landmarks}")
+	return {
+		'count': count,
+		'version': nav_mesh.version,
+		'nodes': landmarks,
+		'distance': distances,
+	}
+
+def compare_heuristics(nav_mesh, samples=200, seed=0):
+	"""
+	Compara la heurística euclídea con ALT resolviendo los mismos pares aleatorios con ambas
+	y devuelve los nodos expandidos y el tiempo de cada una.
+	"""
+	node_ids = list(nav_mesh.nodes)
+	rng = random.Random(seed)
+	pairs = [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(samples)]
+	report = {'samples': samples}
+	for heuristic in ('euclidean', 'alt'):
+		planner = PathPlanner(nav_mesh, cache_size=0, heuristic=heuristic)
+		started = time.perf_counter()
+		for start_node_id, goal_node_id in pairs:
+			planner.find_path(start_node_id, goal_node_id)
+		report[heuristic] = {
+			'expanded': planner.total_expanded,
+			'ms': (time.perf_counter() - started) * 1000.0,
+		}
+	euclidean = report['euclidean']['expanded']
+	report['saved'] = 1.0 - report['alt']['expanded'] / euclidean if euclidean else 0.0
+	return report
@@ -0,0 +1,89 @@
+from imports.pathfinding.dijkstra import edge_key
+
+def _cross(ax, ay, bx, by, cx, cy):
+	# Doble del área con signo del triángulo (a, b, c)
+	return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def _segments_cross(p, q, a, b):
+	"""Comprueba si el segmento p->q corta (o toca) el segmento a-b."""
+	d1 = _cross(a[0], a[1], b[0], b[1], p[0], p[1])
+	d2 = _cross(a[0], a[1], b[0], b[1], q[0], q[1])
+	if (d1 > 0 and d2 > 0) or (d1 < 0 and d2 < 0):
+		return False
+	d3 = _cross(p[0], p[1], q[0], q[1], a[0], a[1])
+	d4 = _cross(p[0], p[1], q[0], q[1], b[0], b[1])
+	return not ((d3 > 0 and d4 > 0) or (d3 < 0 and d4 < 0))
+
+class NodeTracker:
+	"""
+	Seguimiento incremental del nodo de la NavMesh en el que está un agente.
+	En cada update() se comprueba primero el polígono guardado (caja envolvente y semiplanos); si el agente
+	salió de él, se camina de polígono en polígono cruzando los portales que corta el desplazamiento
+	(como mucho max_steps saltos) y sólo si el recorrido falla se recurre al índice espacial.
+	"""
+	def __init__(self, nav_mesh, node_id=None, position=None, max_steps=8):
+		self.nav_mesh = nav_mesh
+		self.node_id = node_id
+		self.position = (position[0], position[1]) if position is not None else None
+		self.max_steps = max_steps
+
+		# Estadísticas
+		self.same_node = 0
+		self.walks = 0
+		self.fallbacks = 0
+
+	def reset(self, node_id, position):
+		self.node_id = node_id
+		self.position = (position[0], position[1])
+
+	def track(self, position, hint=None):
+		"""
+		Devuelve el nodo que contiene position usando sólo el polígono actual y el recorrido por portales,
+		o None si ninguno de los dos lo encuentra (el llamador decide cómo localizarlo).
+		hint sustituye al nodo guardado si el propietario lo cambió desde fuera (por ejemplo al aparecer).
+		"""
+		nav_mesh = self.nav_mesh
+		x, y = position[0], position[1]
+		if hint is not None and hint != self.node_id:
+			self.node_id = hint
+			self.position = nav_mesh.nodes.get(hint)
+		current = self.node_id
+		if current is None or current not in nav_mesh.nodes:
+			return None
+		if nav_mesh.contains_point(current, x, y):
+			self.same_node += 1
+			self.position = (x, y)
+			return current
+
+		# Recorrido por la malla: se cruza el portal que corta el segmento desde la última posición conocida
+		start = self.position if self.position is not None else nav_mesh.nodes[current]
+		target = (x, y)
+		previous = None
+		graph = nav_mesh.graph
+		portals = nav_mesh.portals
+		for _ in range(self.max_steps):
+			following = None
+			for neighbor_id in graph.get(current, ()):
+				if neighbor_id == previous:
+					continue
+				portal = portals.get(edge_key(current, neighbor_id))
+				if portal is not None and _segments_cross(start, target, portal[0], portal[1]):
+					following = neighbor_id
+					break
+			if following is None:
+				return None
+			previous, current = current, following
+			if nav_mesh.contains_point(current, x, y):
+				self.walks += 1
+				self.reset(current, target)
+				return current
+		return None
+
+	def update(self, position, hint=None):
+		"""Nodo que contiene position; si el recorrido falla se localiza con el índice espacial de la NavMesh."""
+		node_id = self.track(position, hint)
+		if node_id is None:
+			self.fallbacks += 1
+			node_id = self.nav_mesh.find_node_at_position(position)
+			self.reset(node_id, position)
+		return node_id
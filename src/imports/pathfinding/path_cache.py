@@ -0,0 +1,84 @@
+from collections import OrderedDict
+
+class PathCache:
+	"""
+	Caché LRU acotada de caminos (tuplas inmutables de node_ids) indexada por (inicio, meta, perfil de coste).
+	Se vacía automáticamente cuando cambia NavMesh.version (aristas o costes modificados).
+	"""
+	def __init__(self, nav_mesh, capacity=256):
+		self.nav_mesh = nav_mesh
+		self.capacity = capacity
+		self._entries = OrderedDict()	# (start, goal, profile) -> tupla de node_ids
+		self._by_goal = {}				# (goal, profile) -> conjunto de claves con esa meta
+		self._version = nav_mesh.version
+
+		# Contadores
+		self.hits = 0
+		self.subpath_hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	def _check_version(self):
+		if self._version != self.nav_mesh.version:
+			self.clear()
+			self._version = self.nav_mesh.version
+			self.invalidations += 1
+
+	def clear(self):
+		self._entries.clear()
+		self._by_goal.clear()
+
+	def get(self, start_node_id, goal_node_id, profile='default'):
+		"""Devuelve el camino cacheado o None. Reutiliza sufijos de rutas que ya pasan por el nodo de inicio."""
+		self._check_version()
+		key = (start_node_id, goal_node_id, profile)
+		path = self._entries.get(key)
+		if path is not None:
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return path
+
+		# Un sufijo de un camino mínimo también es mínimo: reutilizar rutas hacia la misma meta
+		for other_key in self._by_goal.get((goal_node_id, profile), ()):
+			other_path = self._entries[other_key]
+			if start_node_id in other_path:
+				path = other_path[other_path.index(start_node_id):]
+				self._entries.move_to_end(other_key)
+				self.put(start_node_id, goal_node_id, path, profile)
+				self.hits += 1
+				self.subpath_hits += 1
+				return path
+
+		self.misses += 1
+		return None
+
+	def put(self, start_node_id, goal_node_id, path, profile='default'):
+		"""Guarda el camino como tupla inmutable y la devuelve."""
+		self._check_version()
+		path = tuple(path)
+		key = (start_node_id, goal_node_id, profile)
+		self._entries[key] = path
+		self._entries.move_to_end(key)
+		self._by_goal.setdefault((goal_node_id, profile), set()).add(key)
+
+		while len(self._entries) > self.capacity:
+			old_key, _ = self._entries.popitem(last=False)
+			goal_keys = self._by_goal.get((old_key[1], old_key[2]))
+			if goal_keys is not None:
+				goal_keys.discard(old_key)
+				if not goal_keys:
+					del self._by_goal[(old_key[1], old_key[2])]
+			self.evictions += 1
+		return path
+
+	def stats(self):
+		return {
+			'size': len(self._entries),
+			'capacity': self.capacity,
+			'hits': self.hits,
+			'subpath_hits': self.subpath_hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'invalidations': self.invalidations,
+		}
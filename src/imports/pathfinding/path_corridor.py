@@ -0,0 +1,97 @@
+from imports.pathfinding.a_star import a_star_search
+
+class PathCorridor:
+	"""
+	Corredor de polígonos (secuencia de nodos de la NavMesh) entre un agente y una meta que se mueven.
+	Cuando el agente o la meta pasan a un polígono vecino sólo se retocan los extremos del corredor:
+	- si el nodo nuevo ya está en el corredor se recorta hasta él;
+	- si es adyacente a algún nodo del corredor se añade tras el más cercano al otro extremo,
+	  descartando el tramo intermedio (así no se acumulan bucles al perseguir una meta errática).
+	Sólo se repite la búsqueda completa cuando el corredor se rompe (salto a un nodo no adyacente,
+	arista bloqueada) o tras max_patches retoques, para no acumular rodeos.
+	Mantiene la misma interfaz que usa FollowPath para los replanificadores: advance() y path_nodes().
+	"""
+	def __init__(self, nav_mesh, planner=None, max_patches=32):
+		self.nav_mesh = nav_mesh
+		self.planner = planner
+		self.max_patches = max_patches
+		self.nodes = []
+		self._mesh_version = None
+		self._patches = 0
+
+		# Estadísticas
+		self.replans = 0
+		self.patched = 0
+
+	def _replan(self, start_node_id, goal_node_id):
+		self.replans += 1
+		self._patches = 0
+		self._mesh_version = self.nav_mesh.version
+		if self.planner is not None:
+			path = self.planner.find_path(start_node_id, goal_node_id)
+		else:
+			path = a_star_search(start_node_id, goal_node_id, self.nav_mesh.nodes, self.nav_mesh.open_edges())
+		self.nodes = list(path) if path else []
+		return bool(self.nodes)
+
+	def _is_intact(self):
+		# Tras un cambio de la malla basta con comprobar que siguen existiendo las aristas del corredor
+		graph = self.nav_mesh.graph
+		return all(b in graph.get(a, ()) for a, b in zip(self.nodes, self.nodes[1:]))
+
+	def advance(self, start_node_id, goal_node_id):
+		"""Ajusta el corredor a los nodos actuales del agente y de la meta. Devuelve False si no hay camino."""
+		if start_node_id is None or goal_node_id is None:
+			return False
+		if not self.nav_mesh.is_reachable(start_node_id, goal_node_id):
+			self.nodes = []
+			return False
+		if not self.nodes or self._patches >= self.max_patches:
+			return self._replan(start_node_id, goal_node_id)
+		if self._mesh_version != self.nav_mesh.version:
+			self._mesh_version = self.nav_mesh.version
+			if not self._is_intact():
+				return self._replan(start_node_id, goal_node_id)
+
+		nodes = self.nodes
+		graph = self.nav_mesh.graph
+		patched = False
+
+		# Extremo del agente: se engancha al nodo adyacente más cercano a la meta
+		if nodes[0] != start_node_id:
+			if start_node_id in nodes:
+				del nodes[:nodes.index(start_node_id)]
+			else:
+				neighbors = graph.get(start_node_id, ())
+				for i in range(len(nodes) - 1, -1, -1):
+					if nodes[i] in neighbors:
+						nodes[:i] = [start_node_id]
+						break
+				else:
+					return self._replan(start_node_id, goal_node_id)
+			patched = True
+
+		# Extremo de la meta: se engancha al nodo adyacente más cercano al agente
+		if nodes[-1] != goal_node_id:
+			if goal_node_id in nodes:
+				del nodes[nodes.index(goal_node_id) + 1:]
+			else:
+				neighbors = graph.get(goal_node_id, ())
+				for i, node_id in enumerate(nodes):
+					if node_id in neighbors:
+						nodes[i + 1:] = [goal_node_id]
+						break
+				else:
+					return self._replan(start_node_id, goal_node_id)
+			patched = True
+
+		if patched:
+			self._patches += 1
+			self.patched += 1
+		return True
+
+	def path_nodes(self, max_length=None):
+		"""Secuencia de nodos del corredor desde el agente hasta la meta."""
+		if max_length is not None:
+			return tuple(self.nodes[:max_length])
+		return tuple(self.nodes)
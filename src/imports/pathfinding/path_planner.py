@@ -0,0 +1,213 @@
+import heapq
+import math
+from imports.pathfinding.path_cache import PathCache
+
+# Niveles de calidad de búsqueda: epsilon pondera la heurística (A* ponderado, coste <= epsilon * óptimo)
+# y max_expansions limita el trabajo por petición (al agotarse se devuelve un camino parcial)
+QUALITY_PROFILES = {
+	'default': {'epsilon': 1.0, 'max_expansions': None},
+	'fast': {'epsilon': 1.5, 'max_expansions': 256},
+	'rough': {'epsilon': 2.5, 'max_expansions': 64},
+}
+
+class PathPlanner:
+	"""
+	Motor de A* persistente construido una sola vez a partir de una NavMesh.
+	Precalcula los pesos de las aristas y reutiliza sus buffers de búsqueda entre consultas
+	mediante contadores de generación, de modo que ninguna consulta reserva estructuras del tamaño del grafo.
+	Los caminos encontrados se guardan en una caché LRU (cache_size=0 la desactiva).
+	heuristic='alt' usa los landmarks de la NavMesh (desigualdad triangular) si están calculados
+	y al día; en otro caso se usa la distancia euclídea entre centroides.
+	"""
+	def __init__(self, nav_mesh, cache_size=256, heuristic='euclidean'):
+		self.nav_mesh = nav_mesh
+		self.cache = PathCache(nav_mesh, cache_size) if cache_size > 0 else None
+		self.heuristic = heuristic
+		self.landmark_rows = None	# índice denso -> tupla de distancias a cada landmark (None sin ALT)
+		self._mesh_version = None
+		self.node_ids = []			# índice denso -> node_id
+		self.index = {}				# node_id -> índice denso
+		self.positions = []			# índice denso -> (x, y) del centroide
+		self.neighbors = []			# índice denso -> tupla de (índice vecino, coste)
+
+		# Buffers de búsqueda; una entrada sólo es válida si su generación coincide con la actual
+		self._g_score = []
+		self._came_from = []
+		self._generation_seen = []
+		self._generation_closed = []
+		self._generation = 0
+
+		# Estadísticas de la última búsqueda
+		self.last_expanded = 0
+		self.last_partial = False	# True si la última búsqueda agotó max_expansions
+		self.total_expanded = 0
+		self.searches = 0
+
+		self.rebuild()
+
+	def rebuild(self):
+		"""Precalcula índices densos y pesos de aristas a partir de NavMesh.nodes y NavMesh.graph."""
+		nodes = self.nav_mesh.nodes
+		self._mesh_version = self.nav_mesh.version
+		self.node_ids = list(nodes.keys())
+		self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+		self.positions = [nodes[node_id] for node_id in self.node_ids]
+
+		self.neighbors = []
+		for node_id in self.node_ids:
+			adjacent = []
+			for neighbor_id in self.nav_mesh.graph.get(node_id, []):
+				adjacent.append((self.index[neighbor_id], self.nav_mesh.edge_cost(node_id, neighbor_id)))
+			self.neighbors.append(tuple(adjacent))
+
+		landmarks = self.nav_mesh.landmarks
+		self.landmark_rows = None
+		if self.heuristic == 'alt' and landmarks is not None and landmarks['version'] == self.nav_mesh.version:
+			self.landmark_rows = [
+				tuple(distance.get(node_id, math.inf) for distance in landmarks['distance'])
+				for node_id in self.node_ids
+			]
+
+		size = len(self.node_ids)
+		self._g_score = [math.inf] * size
+		self._came_from = [-1] * size
+		self._generation_seen = [0] * size
+		self._generation_closed = [0] * size
+		self._generation = 0
+
+	def _next_generation(self):
+		self._generation += 1
+		return self._generation
+
+	def heuristic_to(self, goal, start=None, active_landmarks=3):
+		"""
+		Devuelve h(índice) hacia el índice denso goal: euclídea o, con ALT, el máximo entre ambas cotas.
+		Con ALT sólo se usan los active_landmarks que mejor acotan la distancia desde start.
+		"""
+		positions = self.positions
+		goal_x, goal_y = positions[goal]
+		hypot = math.hypot
+		if self.landmark_rows is None:
+			def heuristic(index):
+				x, y = positions[index]
+				return hypot(goal_x - x, goal_y - y)
+			return heuristic
+
+		# |d(L, goal) - d(L, n)| es una cota inferior de d(n, goal) para cada landmark L alcanzable desde goal
+		rows = self.landmark_rows
+		goal_row = [(i, d) for i, d in enumerate(rows[goal]) if d < math.inf]
+		if start is not None and len(goal_row) > active_landmarks:
+			start_row = rows[start]
+			goal_row.sort(key=lambda item: abs(item[1] - start_row[item[0]]), reverse=True)
+			goal_row = goal_row[:active_landmarks]
+		def heuristic(index):
+			x, y = positions[index]
+			best = hypot(goal_x - x, goal_y - y)
+			row = rows[index]
+			for i, d in goal_row:
+				bound = d - row[i]
+				if bound < 0:
+					bound = -bound
+				if bound > best:
+					best = bound
+			return best
+		return heuristic
+
+	def find_path(self, start_node_id, goal_node_id, profile='default'):
+		"""
+		Devuelve la tupla de node_ids desde start hasta goal (ambos incluidos) o None si no hay camino.
+		profile elige el nivel de calidad de QUALITY_PROFILES; si la búsqueda agota su límite de expansiones
+		devuelve el camino parcial hasta el nodo más prometedor (last_partial queda a True).
+		Los resultados se comparten desde la caché, por lo que no deben modificarse.
+		El número de nodos expandidos queda registrado en last_expanded (0 si se respondió desde la caché).
+		"""
+		self.last_expanded = 0
+		self.last_partial = False
+		# Metas en otra componente conexa: se descartan sin explorar la componente de inicio
+		if not self.nav_mesh.is_reachable(start_node_id, goal_node_id):
+			return None
+		if self._mesh_version != self.nav_mesh.version:
+			self.rebuild()
+		if self.cache is not None:
+			# Un camino óptimo ya calculado sirve para cualquier nivel de calidad
+			path = self.cache.get(start_node_id, goal_node_id, profile)
+			if path is None and profile != 'default':
+				path = self.cache.get(start_node_id, goal_node_id)
+			if path is not None:
+				return path
+		quality = QUALITY_PROFILES.get(profile, QUALITY_PROFILES['default'])
+		path = self._search(start_node_id, goal_node_id, quality['epsilon'], quality['max_expansions'])
+		if path is not None and self.cache is not None and not self.last_partial:
+			path = self.cache.put(start_node_id, goal_node_id, path, profile)
+		return path
+
+	def _search(self, start_node_id, goal_node_id, epsilon=1.0, max_expansions=None):
+		start = self.index.get(start_node_id)
+		goal = self.index.get(goal_node_id)
+		if start is None or goal is None:
+			return None
+
+		self.searches += 1
+		generation = self._next_generation()
+		g_score = self._g_score
+		came_from = self._came_from
+		seen = self._generation_seen
+		closed = self._generation_closed
+		neighbors = self.neighbors
+		heuristic = self.heuristic_to(goal, start)
+
+		g_score[start] = 0.0
+		came_from[start] = -1
+		seen[start] = generation
+		open_set = [(epsilon * heuristic(start), start)]
+		expanded = 0
+		# Nodo cerrado más cercano a la meta según la heurística (destino del camino parcial)
+		best_node = start
+		best_h = math.inf
+
+		while open_set:
+			_, current = heapq.heappop(open_set)
+			# Entradas obsoletas del heap (el nodo ya se cerró con un coste menor)
+			if closed[current] == generation:
+				continue
+			closed[current] = generation
+			expanded += 1
+
+			if current == goal:
+				self.last_expanded = expanded
+				self.total_expanded += expanded
+				return self._reconstruct(current)
+
+			if max_expansions is not None:
+				h = heuristic(current)
+				if h < best_h:
+					best_h = h
+					best_node = current
+				if expanded >= max_expansions:
+					self.last_expanded = expanded
+					self.total_expanded += expanded
+					self.last_partial = True
+					return self._reconstruct(best_node)
+
+			current_g = g_score[current]
+			for neighbor, cost in neighbors[current]:
+				if closed[neighbor] == generation:
+					continue
+				tentative_g_score = current_g + cost
+				if seen[neighbor] != generation or tentative_g_score < g_score[neighbor]:
+					seen[neighbor] = generation
+					g_score[neighbor] = tentative_g_score
+					came_from[neighbor] = current
+					heapq.heappush(open_set, (tentative_g_score + epsilon * heuristic(neighbor), neighbor))
+
+		self.last_expanded = expanded
+		self.total_expanded += expanded
+		return None
+
+	def _reconstruct(self, current):
+		path = []
+		came_from = self._came_from
+		while current != -1:
+			path.append(self.node_ids[current])
+			current = came_from[current]
+		return tuple(reversed(path))
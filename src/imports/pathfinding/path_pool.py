@@ -0,0 +1,166 @@
+import math
+from concurrent.futures import Future, ProcessPoolExecutor, InvalidStateError
+from imports.pathfinding.dijkstra import edge_key, MIN_EDGE_COST
+from imports.pathfinding.path_planner import PathPlanner
+
+# Planificador de cada proceso del pool (se construye una sola vez en el inicializador)
+_worker_planner = None
+
+class MeshSnapshot:
+	"""
+	Copia de sólo lectura del grafo de la NavMesh (centroides, adyacencia, costes sobrescritos, landmarks
+	y componentes conexas) sin los polígonos de Shapely, para enviarla una única vez a los procesos del pool.
+	"""
+	def __init__(self, nav_mesh):
+		self.nodes = dict(nav_mesh.nodes)
+		self.graph = {node_id: list(neighbors) for node_id, neighbors in nav_mesh.graph.items()}
+		self.edge_costs = dict(nav_mesh.edge_costs)
+		self.version = nav_mesh.version
+		# PathPlanner los lee al reconstruirse (heurística ALT)
+		self.landmarks = nav_mesh.landmarks
+		# Etiquetas de componentes conexas para rechazar metas inalcanzables (ver NavMesh.label_components)
+		self.components = dict(nav_mesh.components)
+
+	def is_reachable(self, start_node_id, goal_node_id):
+		start_component = self.components.get(start_node_id)
+		return start_component is not None and start_component == self.components.get(goal_node_id)
+
+	def edge_cost(self, id1, id2):
+		cost = self.edge_costs.get(edge_key(id1, id2))
+		if cost is not None:
+			return cost
+		x1, y1 = self.nodes[id1]
+		x2, y2 = self.nodes[id2]
+		# Misma fórmula que NavMesh.edge_cost: los empates se resuelven igual que en el hilo principal
+		return max(((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5, MIN_EDGE_COST)
+
+def _init_path_worker(snapshot, heuristic='euclidean'):
+	global _worker_planner
+	_worker_planner = PathPlanner(snapshot, cache_size=0, heuristic=heuristic)
+
+def _worker_find_paths(requests):
+	return [_worker_planner.find_path(start_node_id, goal_node_id, profile) for start_node_id, goal_node_id, profile in requests]
+
+
+class PathWorkerPool:
+	"""
+	Pool de procesos para resolver muchas búsquedas de caminos sin bloquear el bucle del juego.
+	Cada proceso guarda su propia copia del grafo y un PathPlanner; las peticiones se reparten en lotes
+	y cada una devuelve un Future que se resuelve con la tupla de node_ids (o None si no hay camino).
+	Las peticiones que ya están en la caché del planner del hilo principal se resuelven al instante.
+	"""
+	def __init__(self, nav_mesh, planner=None, max_workers=2):
+		self.nav_mesh = nav_mesh
+		self.planner = planner
+		self.max_workers = max_workers
+		self._executor = None
+		self._mesh_version = None
+		self._queued = []			# peticiones ((start, goal, profile), future) acumuladas hasta el próximo flush()
+
+		# Estadísticas
+		self.submitted = 0
+		self.cache_hits = 0
+		self.batches = 0
+
+	def _ensure_executor(self):
+		# Si la malla cambió, los procesos tienen un grafo obsoleto: se reemplaza el pool completo
+		if self._executor is not None and self._mesh_version != self.nav_mesh.version:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+		if self._executor is None:
+			self._mesh_version = self.nav_mesh.version
+			self._executor = ProcessPoolExecutor(
+				max_workers=self.max_workers,
+				initializer=_init_path_worker,
+				initargs=(MeshSnapshot(self.nav_mesh), self.planner.heuristic if self.planner is not None else 'euclidean')
+			)
+		return self._executor
+
+	def submit_many(self, requests):
+		"""
+		Lanza las búsquedas [(start, goal), ...] o [(start, goal, profile), ...] y devuelve una lista
+		de Futures en el mismo orden. Las peticiones repetidas dentro del lote se calculan una sola vez.
+		"""
+		futures = [Future() for _ in requests]
+		self._dispatch(requests, futures)
+		return futures
+
+	def _dispatch(self, requests, futures):
+		pending = {}
+		for future, request in zip(futures, requests):
+			start_node_id, goal_node_id = request[0], request[1]
+			profile = request[2] if len(request) > 2 else 'default'
+			self.submitted += 1
+			if not self.nav_mesh.is_reachable(start_node_id, goal_node_id):
+				future.set_result(None)
+				continue
+			cache = self.planner.cache if self.planner is not None else None
+			if cache is not None:
+				path = cache.get(start_node_id, goal_node_id, profile)
+				if path is None and profile != 'default':
+					path = cache.get(start_node_id, goal_node_id)
+				if path is not None:
+					self.cache_hits += 1
+					future.set_result(path)
+					continue
+			pending.setdefault((start_node_id, goal_node_id, profile), []).append(future)
+		if not pending:
+			return
+
+		executor = self._ensure_executor()
+		pairs = list(pending)
+		chunk_size = max(1, math.ceil(len(pairs) / self.max_workers))
+		for i in range(0, len(pairs), chunk_size):
+			chunk = pairs[i:i + chunk_size]
+			self.batches += 1
+			batch = executor.submit(_worker_find_paths, chunk)
+			batch.add_done_callback(lambda done, chunk=chunk: self._resolve(done, chunk, pending))
+
+	def _resolve(self, batch, chunk, pending):
+		# Se ejecuta en el hilo de gestión del pool: sólo reparte resultados a los Futures
+		try:
+			results = batch.result()
+		except Exception as e:
+			for pair in chunk:
+				for future in pending[pair]:
+					_settle(future, exception=e)
+			return
+		for pair, path in zip(chunk, results):
+			for future in pending[pair]:
+				_settle(future, result=path)
+
+	def submit(self, start_node_id, goal_node_id, profile='default'):
+		"""Lanza una sola búsqueda y devuelve su Future."""
+		return self.submit_many([(start_node_id, goal_node_id, profile)])[0]
+
+	def request(self, start_node_id, goal_node_id, profile='default'):
+		"""
+		Encola una búsqueda y devuelve su Future sin lanzarla todavía: todas las peticiones
+		hechas durante el mismo frame se envían juntas en el siguiente flush().
+		"""
+		future = Future()
+		self._queued.append(((start_node_id, goal_node_id, profile), future))
+		return future
+
+	def flush(self):
+		"""Envía como un único lote las peticiones encoladas con request()."""
+		if not self._queued:
+			return
+		queued = self._queued
+		self._queued = []
+		self._dispatch([request for request, _ in queued], [future for _, future in queued])
+
+	def shutdown(self):
+		if self._executor is not None:
+			self._executor.shutdown(wait=False, cancel_futures=True)
+			self._executor = None
+
+def _settle(future, result=None, exception=None):
+	# El NPC puede cancelar el Future mientras el pool calcula: en ese caso el resultado se descarta
+	try:
+		if exception is not None:
+			future.set_exception(exception)
+		else:
+			future.set_result(result)
+	except InvalidStateError:
+		pass
@@ -0,0 +1,215 @@
+import heapq
+import math
+import time
+from imports.pathfinding.path_planner import QUALITY_PROFILES
+
+class PathSearch:
+	"""
+	Búsqueda A* reanudable sobre los índices densos de un PathPlanner.
+	Guarda su propio estado (open set, g y predecesores), así que puede pausarse al agotar
+	el presupuesto del frame y continuar en el siguiente sin repetir trabajo.
+	Admite los mismos epsilon y max_expansions que PathPlanner (camino parcial al agotar el límite).
+	"""
+	def __init__(self, planner, start_node_id, goal_node_id, epsilon=1.0, max_expansions=None):
+		self.planner = planner
+		self.epsilon = epsilon
+		self.max_expansions = max_expansions
+		self.start = planner.index.get(start_node_id)
+		self.goal = planner.index.get(goal_node_id)
+		self.finished = False
+		self.path = None
+		self.partial = False
+		self.expanded = 0
+		self.g_score = {}
+		self.came_from = {}
+		self.closed = set()
+		self.open_set = []
+		if self.start is None or self.goal is None:
+			self.finished = True
+			return
+		self.heuristic = planner.heuristic_to(self.goal, self.start)
+		self.g_score[self.start] = 0.0
+		self.came_from[self.start] = -1
+		self.open_set.append((epsilon * self.heuristic(self.start), self.start))
+		self.best_node = self.start
+		self.best_h = math.inf
+
+	def step(self, deadline, check_every=16):
+		"""Expande nodos hasta terminar o hasta superar deadline (perf_counter). Devuelve True si terminó."""
+		if self.finished:
+			return True
+		neighbors = self.planner.neighbors
+		heuristic = self.heuristic
+		epsilon = self.epsilon
+		max_expansions = self.max_expansions
+		g_score = self.g_score
+		came_from = self.came_from
+		closed = self.closed
+		open_set = self.open_set
+		steps = 0
+
+		while open_set:
+			# Sólo se consulta el reloj cada check_every expansiones
+			steps += 1
+			if steps % check_every == 0 and time.perf_counter() >= deadline:
+				return False
+			_, current = heapq.heappop(open_set)
+			if current in closed:
+				continue
+			closed.add(current)
+			self.expanded += 1
+
+			if current == self.goal:
+				self._finish(current)
+				return True
+
+			if max_expansions is not None:
+				h = heuristic(current)
+				if h < self.best_h:
+					self.best_h = h
+					self.best_node = current
+				if self.expanded >= max_expansions:
+					self.partial = True
+					self._finish(self.best_node)
+					return True
+
+			current_g = g_score[current]
+			for neighbor, cost in neighbors[current]:
+				if neighbor in closed:
+					continue
+				tentative_g_score = current_g + cost
+				if tentative_g_score < g_score.get(neighbor, math.inf):
+					g_score[neighbor] = tentative_g_score
+					came_from[neighbor] = current
+					heapq.heappush(open_set, (tentative_g_score + epsilon * heuristic(neighbor), neighbor))
+
+		self.finished = True
+		return True
+
+	def _finish(self, current):
+		path = []
+		while current != -1:
+			path.append(self.planner.node_ids[current])
+			current = self.came_from[current]
+		self.path = tuple(reversed(path))
+		self.finished = True
+
+
+class PathRequest:
+	"""Petición encolada en PathRequestQueue. callback(path_nodes, request) recibe el camino o None."""
+	def __init__(self, start_node_id, goal_node_id, callback, priority, profile='default'):
+		self.start_node_id = start_node_id
+		self.goal_node_id = goal_node_id
+		self.profile = profile
+		self.callback = callback
+		self.priority = priority
+		self.requested_at = time.perf_counter()
+		self.search = None
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+
+class PathRequestQueue:
+	"""
+	Cola central de búsquedas de caminos que el bucle del juego avanza una vez por frame (tick)
+	sin superar budget_ms milisegundos. Las peticiones se atienden por prioridad (menor valor = más urgente)
+	y en orden de llegada; una búsqueda que no termina dentro del presupuesto continúa en el siguiente frame.
+	"""
+	def __init__(self, planner, budget_ms=2.0):
+		self.planner = planner
+		self.nav_mesh = planner.nav_mesh
+		self.budget_ms = budget_ms
+		self._heap = []
+		self._counter = 0
+		self._mesh_version = self.nav_mesh.version
+
+		# Estadísticas
+		self.completed = 0
+		self.cache_hits = 0
+		self.total_time_to_result = 0.0
+		self.max_time_to_result = 0.0
+		self.last_tick_ms = 0.0
+		self.max_depth = 0
+
+	def request(self, start_node_id, goal_node_id, callback, priority=0, profile='default'):
+		"""Encola una búsqueda con el nivel de calidad profile y devuelve la PathRequest (permite cancelarla)."""
+		request = PathRequest(start_node_id, goal_node_id, callback, priority, profile)
+		self._counter += 1
+		heapq.heappush(self._heap, (priority, self._counter, request))
+		self.max_depth = max(self.max_depth, len(self._heap))
+		return request
+
+	def tick(self):
+		"""Avanza las búsquedas pendientes durante como mucho budget_ms milisegundos."""
+		tick_start = time.perf_counter()
+		deadline = tick_start + self.budget_ms / 1000.0
+		if self._mesh_version != self.nav_mesh.version:
+			# La malla cambió: los pesos precalculados y las búsquedas a medias ya no son válidos
+			self._mesh_version = self.nav_mesh.version
+			self.planner.rebuild()
+			for _, _, request in self._heap:
+				request.search = None
+
+		cache = self.planner.cache
+		while self._heap and time.perf_counter() < deadline:
+			_, _, request = self._heap[0]
+			if request.cancelled:
+				heapq.heappop(self._heap)
+				continue
+			if request.search is None:
+				if not self.nav_mesh.is_reachable(request.start_node_id, request.goal_node_id):
+					heapq.heappop(self._heap)
+					self._deliver(request, None)
+					continue
+				path = None
+				if cache is not None:
+					path = cache.get(request.start_node_id, request.goal_node_id, request.profile)
+					if path is None and request.profile != 'default':
+						path = cache.get(request.start_node_id, request.goal_node_id)
+				if path is not None:
+					heapq.heappop(self._heap)
+					self.cache_hits += 1
+					self._deliver(request, path)
+					continue
+				quality = QUALITY_PROFILES.get(request.profile, QUALITY_PROFILES['default'])
+				request.search = PathSearch(
+					self.planner,
+					request.start_node_id,
+					request.goal_node_id,
+					quality['epsilon'],
+					quality['max_expansions']
+				)
+			if not request.search.step(deadline):
+				break
+			heapq.heappop(self._heap)
+			path = request.search.path
+			self.planner.total_expanded += request.search.expanded
+			if path is not None and cache is not None and not request.search.partial:
+				path = cache.put(request.start_node_id, request.goal_node_id, path, request.profile)
+			self._deliver(request, path)
+		self.last_tick_ms = (time.perf_counter() - tick_start) * 1000.0
+
+	def _deliver(self, request, path):
+		elapsed = time.perf_counter() - request.requested_at
+		self.completed += 1
+		self.total_time_to_result += elapsed
+		self.max_time_to_result = max(self.max_time_to_result, elapsed)
+		request.callback(path, request)
+
+	def __len__(self):
+		return len(self._heap)
+
+	def stats(self):
+		mean = self.total_time_to_result / self.completed if self.completed else 0.0
+		return {
+			'depth': len(self._heap),
+			'max_depth': self.max_depth,
+			'completed': self.completed,
+			'cache_hits': self.cache_hits,
+			'mean_time_to_result_ms': mean * 1000.0,
+			'max_time_to_result_ms': self.max_time_to_result * 1000.0,
+			'last_tick_ms': self.last_tick_ms,
+			'budget_ms': self.budget_ms,
+		}
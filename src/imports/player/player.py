@@ -7,6 +7,7 @@ from pygame.image import load
 from pygame.time import get_ticks
 from pygame import K_LEFT, K_RIGHT, K_UP, K_DOWN
 from pathlib import Path
+from imports.pathfinding.node_tracker import NodeTracker
 
 # Definir la ruta base para cargar imágenes
 BASE_DIR = Path(__file__).resolve().parents[3]   # cuatro niveles arriba
@@ -45,6 +46,8 @@ class Player:
 		# Rellenar la superficie de la sombra con un color negro semi-transparente
 		self.shadow_surface.fill((0, 0, 0, 100), special_flags=BLEND_RGBA_MULT)
 		self.current_node_id = None
+		self.batch_locate = False	# True si el bucle del juego actualiza current_node_id en lote (NavMesh.locate_many)
+		self.node_tracker = None	# Seguimiento incremental del nodo actual (recorrido por portales)
 
 		self.honey_collected = 0
 		self.is_powered_up = False
@@ -124,8 +127,10 @@ class Player:
 		
 		self.kinematic.update(steering, dt, self.rect, obstacles, self.original_speed)
 
-		if nav_mesh:
-			self.current_node_id = nav_mesh.find_node_at_position(self.kinematic.position, self.current_node_id)
+		if nav_mesh and not self.batch_locate:
+			if self.node_tracker is None or self.node_tracker.nav_mesh is not nav_mesh:
+				self.node_tracker = NodeTracker(nav_mesh, self.current_node_id, self.kinematic.position)
+			self.current_node_id = self.node_tracker.update(self.kinematic.position, self.current_node_id)
 
 		# Limitar movimiento a los bordes de la pantalla
 		if bounds:
@@ -91,6 +91,14 @@ class Renderer:
                 screen_points = [(p[0] - self.camera.left, p[1] - self.camera.top) for p in shape_data]
                 # Dibuja el contorno del polígono en la pantalla.
                 pygame.draw.polygon(self.screen, (255, 0, 0), screen_points, 1)
+            elif shape_type == 'edges':
+                # Si es una lista de aristas, dibuja cada segmento.
+                for p, q in shape_data:
+                    pygame.draw.line(
+                        self.screen, (255, 0, 0),
+                        (p[0] - self.camera.left, p[1] - self.camera.top),
+                        (q[0] - self.camera.left, q[1] - self.camera.top)
+                    )
 
     def _draw_objects(self, honey_pots, power_ups, spider_webs, seed_projectiles, spider_projectiles):
         if spider_webs:
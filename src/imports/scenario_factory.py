@@ -218,7 +218,7 @@ class ScenarioFactory:
                     enemies[-1].set_algorithm(max_acceleration=80, wander_target=Player("WanderTarget", 0, 0, 0), explicit_target=Player("Target", 0, 0, 0))
             case "PrioritySteering":
                 # Obstacles are now loaded from the map
-                obstacles = self.game_map.obstacles
+                obstacles = self.game_map.obstacle_index
 
                 enemies.append(NPC(
                     "LWYG+Pursue",
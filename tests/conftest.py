@@ -0,0 +1,35 @@
+import contextlib
+import io
+import os
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+# Sin ventana: pygame se usa sólo por pygame.Rect y Vector2
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+MAP_TMX = ROOT / "assets" / "mapa" / "mapa.tmx"
+
+@pytest.fixture(scope="session")
+def tmx_data():
+	import pytmx
+	return pytmx.TiledMap(str(MAP_TMX))
+
+def build_nav_mesh(tmx_data, **options):
+	"""NavMesh construida desde el TMX; sin cache_path no lee ni escribe la caché del juego."""
+	from imports.nav_mesh import NavMesh
+	options.setdefault('cache_path', None)
+	with contextlib.redirect_stdout(io.StringIO()):
+		return NavMesh(tmx_data, **options)
+
+@pytest.fixture(scope="session")
+def nav_mesh(tmx_data):
+	"""NavMesh del mapa del juego con landmarks, compartida y de sólo lectura (sin tabla de caminos)."""
+	return build_nav_mesh(tmx_data, landmark_count=16)
+
+@pytest.fixture
+def own_nav_mesh(tmx_data):
+	"""NavMesh propia del test, para los que bloquean aristas o cambian costes."""
+	return build_nav_mesh(tmx_data, landmark_count=16)
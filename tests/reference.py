@@ -0,0 +1,96 @@
+"""Soluciones de referencia por fuerza bruta con las que se comparan las pruebas."""
+import heapq
+import math
+import pygame
+from shapely.geometry import LineString
+
+def dijkstra_distances(graph, cost, source):
+	"""Distancias mínimas desde source sobre graph (node_id -> vecinos) con el coste cost(id1, id2)."""
+	distance = {source: 0.0}
+	open_set = [(0.0, source)]
+	while open_set:
+		d, current = heapq.heappop(open_set)
+		if d > distance[current]:
+			continue
+		for neighbor in graph[current]:
+			nd = d + cost(current, neighbor)
+			if nd < distance.get(neighbor, math.inf):
+				distance[neighbor] = nd
+				heapq.heappush(open_set, (nd, neighbor))
+	return distance
+
+def walk_cost(graph, cost, path_nodes):
+	"""Coste de path_nodes, comprobando que cada paso es una arista de graph."""
+	for a, b in zip(path_nodes, path_nodes[1:]):
+		assert b in graph[a], (a, b)
+	return sum(cost(a, b) for a, b in zip(path_nodes, path_nodes[1:]))
+
+def nested_loop_obstacles(tmx_data):
+	"""Cargador de colisionadores original: recorre todo el mapa por cada objeto de cada tile con colisionador."""
+	walls_layer = None
+	for i, layer in enumerate(tmx_data.layers):
+		if getattr(layer, 'name', None) == "estructuras":
+			walls_layer = i
+	obstacles = []
+	for tile_id_local, obj_group in tmx_data.get_tile_colliders():
+		if obj_group is None:
+			continue
+		for obj in obj_group:
+			for y in range(tmx_data.height):
+				for x in range(tmx_data.width):
+					if tmx_data.get_tile_gid(x, y, walls_layer) != tile_id_local:
+						continue
+					tile_base_x = x * tmx_data.tilewidth
+					tile_base_y = y * tmx_data.tileheight
+					if hasattr(obj, 'points'):
+						obstacles.append(('poly', [(int(tile_base_x + p[0]), int(tile_base_y + p[1])) for p in obj.points]))
+					else:
+						obstacles.append(('rect', pygame.Rect(
+							int(tile_base_x + obj.x), int(tile_base_y + obj.y), int(obj.width), int(obj.height)
+						)))
+	return obstacles
+
+def _linear_shapes(obstacles):
+	# Recorrido lineal de Map.obstacles; cada arista de una lista 'edges' cuenta como ('segment', arista)
+	for kind, shape in obstacles:
+		if kind == 'edges':
+			for segment in shape:
+				yield 'segment', segment
+		else:
+			yield kind, shape
+
+def linear_overlaps(obstacles, rect):
+	"""Formas de obstacles que colisionan con rect, en su orden, comprobándolas todas."""
+	hits = []
+	for kind, shape in _linear_shapes(obstacles):
+		if kind == 'rect':
+			hit = rect.colliderect(shape)
+		else:
+			points = list(shape)
+			edges = [points] if kind == 'segment' else list(zip(points, points[1:] + points[:1]))
+			hit = any(rect.clipline(p, q) for p, q in edges)
+		if hit:
+			hits.append((kind, shape))
+	return hits
+
+def linear_segment_hits(obstacles, a, b):
+	"""[(distancia a a, kind, shape)] de las formas que corta el segmento a->b, ordenadas por distancia."""
+	hits = []
+	ray = LineString([a, b])
+	for order, (kind, shape) in enumerate(_linear_shapes(obstacles)):
+		if kind == 'rect':
+			clipped = shape.clipline(a, b)
+			if not clipped:
+				continue
+			distance = min(math.dist(a, p) for p in clipped)
+		else:
+			points = list(shape)
+			edges = [points] if kind == 'segment' else list(zip(points, points[1:] + points[:1]))
+			crossings = [ray.intersection(LineString([p, q])) for p, q in edges]
+			distances = [math.dist(a, (point.x, point.y)) for point in crossings if point.geom_type == 'Point']
+			if not distances:
+				continue
+			distance = min(distances)
+		hits.append((distance, order, kind, shape))
+	hits.sort(key=lambda hit: hit[:2])
+	return [(distance, kind, shape) for distance, _, kind, shape in hits]
@@ -0,0 +1,49 @@
+import contextlib
+import io
+import pygame
+import pytest
+from conftest import MAP_TMX, build_nav_mesh
+from reference import dijkstra_distances
+from imports import bake
+from imports.map.mapa import load_obstacles, merge_obstacles
+from imports.map.obstacle_index import OBSTACLE_CELL_SIZE, ObstacleIndex
+
+@pytest.fixture
+def baked(tmp_path, monkeypatch):
+	monkeypatch.setattr(bake, "BAKE_DIR", tmp_path)
+	with contextlib.redirect_stdout(io.StringIO()):
+		assert bake.bake(MAP_TMX)
+		# Mismo TMX y mismas opciones: el artefacto ya está al día
+		assert not bake.bake(MAP_TMX)
+		return bake.load_artifact(MAP_TMX)
+
+def test_bake_round_trip(baked, tmx_data):
+	obstacles = merge_obstacles(load_obstacles(tmx_data))
+	assert baked['obstacles'] == obstacles
+	assert baked['obstacle_grid'] == ObstacleIndex(obstacles, OBSTACLE_CELL_SIZE).grid
+	assert baked['map']['width_pixels'] == tmx_data.width * tmx_data.tilewidth
+
+	nav_mesh = build_nav_mesh(tmx_data, baked=baked['nav_mesh'], **bake.NAV_MESH_OPTIONS)
+	computed = build_nav_mesh(tmx_data)
+	assert nav_mesh.nodes == computed.nodes
+	assert sorted(nav_mesh.edges) == sorted(computed.edges)
+	assert nav_mesh.portals == computed.portals
+	assert nav_mesh.landmarks['count'] == bake.NAV_MESH_OPTIONS['landmark_count']
+	for start in list(computed.nodes)[::50]:
+		distance = dijkstra_distances(computed.graph, computed.edge_cost, start)
+		for goal, expected in distance.items():
+			assert nav_mesh.distance(start, goal) == pytest.approx(expected, abs=1e-6)
+
+def test_stale_artifact_is_ignored(baked, monkeypatch):
+	monkeypatch.setattr(bake, "NAV_MESH_OPTIONS", dict(bake.NAV_MESH_OPTIONS, landmark_count=4))
+	with contextlib.redirect_stdout(io.StringIO()):
+		assert bake.load_artifact(MAP_TMX) is None
+
+def test_obstacle_arrays_keep_fractional_vertices():
+	obstacles = [
+		('rect', pygame.Rect(16, 32, 48, 8)),
+		('poly', [(10.5, 20.25), (30.75, 20.0), (20.0, 40.125)]),
+		('edges', [((0.5, 0.0), (64.0, 0.5)), ((64.0, 0.5), (64.25, 32.0))]),
+	]
+	grid = ObstacleIndex(obstacles, OBSTACLE_CELL_SIZE).grid
+	assert bake._obstacles_from_arrays(bake._obstacle_arrays(obstacles, grid)) == obstacles
@@ -0,0 +1,71 @@
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.d_star_lite import DStarLite
+from imports.pathfinding.dijkstra import edge_key
+
+def _check(nav_mesh, replanner, reachable, start, goal):
+	"""g[start] y el camino del replanificador frente a un Dijkstra nuevo sobre la malla actual."""
+	distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, goal)
+	assert reachable == (start in distance)
+	if not reachable:
+		return
+	assert replanner.g[start] == pytest.approx(distance[start], abs=1e-6)
+	path_nodes = replanner.path_nodes()
+	assert path_nodes[0] == start and path_nodes[-1] == goal
+	assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(distance[start], abs=1e-6)
+
+@pytest.mark.parametrize("seed", list(range(10)))
+def test_advance_matches_dijkstra(own_nav_mesh, seed):
+	nav_mesh = own_nav_mesh
+	rng = random.Random(seed)
+	node_ids = list(nav_mesh.nodes)
+	start, goal = rng.choice(node_ids), rng.choice(node_ids)
+	replanner = DStarLite(nav_mesh)
+	_check(nav_mesh, replanner, replanner.advance(start, goal), start, goal)
+	blocked = []
+	for _ in range(80):
+		action = rng.choice(['move', 'move', 'goal', 'cost', 'block'])
+		path_nodes = replanner.path_nodes() if replanner.g.get(replanner.start, float('inf')) < float('inf') else None
+		if action == 'move':
+			# El agente avanza unos nodos por su camino, o salta a un vecino si no tiene camino
+			if path_nodes and len(path_nodes) > 1:
+				start = path_nodes[min(rng.randint(1, 3), len(path_nodes) - 1)]
+			elif nav_mesh.graph[start]:
+				start = rng.choice(nav_mesh.graph[start])
+		elif action == 'goal':
+			# La meta se mueve a un vecino o salta a cualquier nodo
+			if rng.random() < 0.5 and nav_mesh.graph[goal]:
+				goal = rng.choice(nav_mesh.graph[goal])
+			else:
+				goal = rng.choice(node_ids)
+		elif action == 'cost':
+			# Coste nuevo (o restaurado) en una arista del camino actual o en cualquiera; nunca por debajo
+			# de la distancia entre centroides, que es la heurística
+			if path_nodes and len(path_nodes) > 1:
+				i = rng.randrange(len(path_nodes) - 1)
+				id1, id2 = path_nodes[i], path_nodes[i + 1]
+			else:
+				id1, id2 = rng.choice(nav_mesh.edges)
+			cost = None if rng.random() < 0.3 else nav_mesh.edge_cost(id1, id2) * rng.uniform(1.0, 8.0)
+			nav_mesh.set_edge_cost(id1, id2, cost)
+		elif blocked and rng.random() < 0.3:
+			nav_mesh.unblock_edge(*blocked.pop(rng.randrange(len(blocked))))
+		elif path_nodes and len(path_nodes) > 1:
+			i = rng.randrange(len(path_nodes) - 1)
+			assert nav_mesh.block_edge(path_nodes[i], path_nodes[i + 1])
+			blocked.append((path_nodes[i], path_nodes[i + 1]))
+		_check(nav_mesh, replanner, replanner.advance(start, goal), start, goal)
+
+def test_edges_changed_since(own_nav_mesh):
+	nav_mesh = own_nav_mesh
+	id1, id2 = nav_mesh.edges[0]
+	id3, id4 = nav_mesh.edges[1]
+	version = nav_mesh.version
+	nav_mesh.set_edge_cost(id1, id2, 50.0)
+	nav_mesh.block_edge(id3, id4)
+	nav_mesh.unblock_edge(id3, id4)
+	assert nav_mesh.version == version + 3
+	assert nav_mesh.edges_changed_since(version) == [edge_key(id1, id2), edge_key(id3, id4), edge_key(id3, id4)]
+	assert nav_mesh.edges_changed_since(version + 2) == [edge_key(id3, id4)]
+	assert nav_mesh.edges_changed_since(nav_mesh.version) == []
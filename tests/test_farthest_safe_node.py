@@ -0,0 +1,55 @@
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.dijkstra import farthest_safe_node
+from imports.pathfinding.flow_field import FlowField
+
+def _expected(nav_mesh, start, threat, min_safe_distance):
+	"""Por fuerza bruta: la mayor distancia a la amenaza entre los nodos alcanzables que la respetan."""
+	safety = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, threat)
+	distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+	candidates = [node_id for node_id in distance if safety.get(node_id, float('inf')) >= min_safe_distance]
+	if not candidates:
+		return None, safety, distance
+	return max(safety.get(node_id, float('inf')) for node_id in candidates), safety, distance
+
+@pytest.mark.parametrize("reuse_flow_field", [False, True])
+@pytest.mark.parametrize("min_safe_distance", [0.0, 300.0, 1e9])
+def test_farthest_safe_node_matches_brute_force(nav_mesh, reuse_flow_field, min_safe_distance):
+	rng = random.Random(10)
+	node_ids = list(nav_mesh.nodes)
+	field = FlowField(nav_mesh)
+	for _ in range(15):
+		start, threat = rng.choice(node_ids), rng.choice(node_ids)
+		threat_distance = None
+		if reuse_flow_field:
+			field.update(threat)
+			threat_distance = field.distances_from(threat)
+			assert threat_distance is not None
+		safe_node, path_nodes = nav_mesh.farthest_safe_node(start, threat, min_safe_distance, threat_distance)
+		best_safety, safety, distance = _expected(nav_mesh, start, threat, min_safe_distance)
+		if best_safety is None:
+			assert safe_node is None and path_nodes is None
+			continue
+		assert safety.get(safe_node, float('inf')) == pytest.approx(best_safety, abs=1e-6)
+		# Entre los igual de seguros, el más cercano al NPC
+		ties = [node_id for node_id in distance if abs(safety.get(node_id, float('inf')) - best_safety) <= 1e-9]
+		assert distance[safe_node] == pytest.approx(min(distance[node_id] for node_id in ties), abs=1e-6)
+		assert path_nodes[0] == start and path_nodes[-1] == safe_node
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(distance[safe_node], abs=1e-6)
+
+def test_ties_go_towards_start():
+	# p y q están igual de lejos de la amenaza t; desde n, q está más cerca
+	weighted_graph = {
+		't': [('m', 1.0)],
+		'm': [('t', 1.0), ('p', 1.0), ('n', 0.5)],
+		'p': [('m', 1.0)],
+		'n': [('m', 0.5), ('q', 0.5)],
+		'q': [('n', 0.5)],
+	}
+	assert farthest_safe_node(weighted_graph, 'n', 't') == ('q', ['n', 'q'])
+	assert farthest_safe_node(weighted_graph, 'p', 't') == ('p', ['p'])
+	# Las mismas distancias a la amenaza, ya calculadas
+	threat_distance = {'t': 0.0, 'm': 1.0, 'p': 2.0, 'n': 1.5, 'q': 2.0}
+	assert farthest_safe_node(weighted_graph, 'n', 't', threat_distance=threat_distance) == ('q', ['n', 'q'])
+	assert farthest_safe_node(weighted_graph, 'n', 't', min_safe_distance=2.5) == (None, None)
@@ -0,0 +1,58 @@
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.flow_field import FlowField
+
+def _check_field(nav_mesh, field, target):
+	"""Seguir next_node desde cualquier nodo lleva al objetivo por un camino de coste mínimo."""
+	distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, target)
+	assert set(field.distance) == set(distance)
+	for node_id in nav_mesh.nodes:
+		if node_id not in distance:
+			assert not field.is_reachable(node_id) and field.next_waypoint(node_id) is None
+			continue
+		path_nodes = [node_id]
+		while field.next_node[path_nodes[-1]] is not None:
+			path_nodes.append(field.next_node[path_nodes[-1]])
+			assert len(path_nodes) <= len(nav_mesh.nodes)
+		assert path_nodes[-1] == target
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(distance[node_id], abs=1e-6)
+		assert field.distance[node_id] == pytest.approx(distance[node_id], abs=1e-6)
+
+def test_following_next_node_is_optimal(nav_mesh):
+	field = FlowField(nav_mesh)
+	for target in random.Random(8).sample(list(nav_mesh.nodes), 5):
+		assert field.update(target)
+		_check_field(nav_mesh, field, target)
+
+def test_update_recomputes_only_on_change(own_nav_mesh):
+	nav_mesh = own_nav_mesh
+	field = FlowField(nav_mesh)
+	target, other = random.Random(9).sample(list(nav_mesh.nodes), 2)
+	assert field.update(target)
+	assert not field.update(target)
+	assert not field.update(None)
+	assert field.recomputes == 1
+	assert field.distances_from(target) is field.distance
+	assert field.distances_from(other) is None
+
+	# El objetivo cambia de nodo
+	assert field.update(other)
+	assert not field.update(other)
+	assert field.recomputes == 2
+
+	# La malla cambia en el camino de target a other: mismo objetivo, pero el campo ya no vale
+	path_nodes = [target]
+	while field.next_node[path_nodes[-1]] is not None:
+		path_nodes.append(field.next_node[path_nodes[-1]])
+	nav_mesh.set_edge_cost(path_nodes[0], path_nodes[1], nav_mesh.edge_cost(path_nodes[0], path_nodes[1]) * 5.0)
+	assert field.distances_from(other) is None
+	assert field.update(other)
+	assert not field.update(other)
+	assert field.recomputes == 3
+	_check_field(nav_mesh, field, other)
+
+	nav_mesh.block_edge(path_nodes[-2], path_nodes[-1])
+	assert field.update(other)
+	assert field.recomputes == 4
+	_check_field(nav_mesh, field, other)
@@ -0,0 +1,43 @@
+import random
+import pytest
+from shapely.geometry import LineString, Point
+from shapely.ops import unary_union
+from imports.pathfinding.funnel import build_portals, string_pull
+from imports.pathfinding.path_planner import PathPlanner
+
+def _random_point(polygon, rng):
+	minx, miny, maxx, maxy = polygon.bounds
+	while True:
+		point = (rng.uniform(minx, maxx), rng.uniform(miny, maxy))
+		if polygon.contains(Point(point)):
+			return point
+
+def test_straight_corridor_is_a_single_segment():
+	# Portales alineados con el camino: todas las pruebas de lado dan área cero
+	nodes = {1: (5, 5), 2: (15, 5), 3: (25, 5)}
+	portals = {(1, 2): ((10, 0), (10, 10)), (2, 3): ((20, 0), (20, 10))}
+	assert string_pull((1, 5), (29, 5), [1, 2, 3], nodes, portals) == [(1, 5), (29, 5)]
+
+def test_portal_aligned_with_centroid_is_oriented_from_next_node():
+	# El centroide de 1 queda sobre la recta del portal: la orientación sale del centroide de 2
+	nodes = {1: (0, 0), 2: (10, 10)}
+	portals = {(1, 2): ((10, 0), (20, 0))}
+	assert build_portals([1, 2], nodes, portals) == build_portals([1, 2], {1: (10, -10), 2: (10, 10)}, portals)
+
+@pytest.mark.parametrize("margin", [0.0, 6.0])
+def test_smoothed_paths_stay_inside_corridor(nav_mesh, margin):
+	planner = PathPlanner(nav_mesh, cache_size=0)
+	node_ids = list(nav_mesh.nodes)
+	rng = random.Random(7)
+	for _ in range(400):
+		start_node, goal_node = rng.choice(node_ids), rng.choice(node_ids)
+		path_nodes = planner.find_path(start_node, goal_node)
+		if path_nodes is None:
+			continue
+		start = _random_point(nav_mesh.nav_polygons[start_node], rng)
+		goal = _random_point(nav_mesh.nav_polygons[goal_node], rng)
+		points = nav_mesh.smooth_path(start, goal, path_nodes, margin)
+		corridor = unary_union([nav_mesh.nav_polygons[node_id] for node_id in path_nodes]).buffer(1e-3)
+		assert points[0] == start and points[-1] == goal
+		for a, b in zip(points, points[1:]):
+			assert corridor.covers(LineString([a, b])), (path_nodes, a, b)
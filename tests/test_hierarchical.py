@@ -0,0 +1,53 @@
+import random
+import pytest
+from conftest import build_nav_mesh
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.hierarchical import HierarchicalPlanner, clusters_of
+
+CLUSTER_SIZES = [64, 128, 256, 512]
+
+@pytest.fixture(scope="module")
+def hierarchy_nav_mesh(tmx_data):
+	# Propia: cada tamaño de región reconstruye la jerarquía de la malla
+	return build_nav_mesh(tmx_data)
+
+def _pairs(nav_mesh, cluster_size, seed):
+	"""Pares al azar con inicio y meta en la misma región, en regiones vecinas y en cualquier región."""
+	cluster_of = clusters_of(nav_mesh.nodes, cluster_size)
+	by_cluster = {}
+	for node_id, cluster in cluster_of.items():
+		by_cluster.setdefault(cluster, []).append(node_id)
+	rng = random.Random(seed)
+	node_ids = list(nav_mesh.nodes)
+	same, adjacent = [], []
+	for start in rng.sample(node_ids, 60):
+		cx, cy = cluster_of[start]
+		same.append((start, rng.choice(by_cluster[(cx, cy)])))
+		neighbors = [by_cluster[c] for c in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)) if c in by_cluster]
+		if neighbors:
+			adjacent.append((start, rng.choice(rng.choice(neighbors))))
+	anywhere = [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(60)]
+	assert any(start != goal for start, goal in same) and adjacent
+	return same + adjacent + anywhere
+
+@pytest.mark.parametrize("cluster_size", CLUSTER_SIZES)
+def test_refined_routes_are_optimal(hierarchy_nav_mesh, cluster_size):
+	# El grafo abstracto guarda las distancias exactas dentro de cada región y todas las aristas entre
+	# regiones: el tramo de un camino dentro de una región va de entrada a entrada (o desde el inicio
+	# o hasta la meta), así que la cota es el propio óptimo (salvo redondeo).
+	nav_mesh = hierarchy_nav_mesh
+	planner = HierarchicalPlanner(nav_mesh, cluster_size)
+	for start, goal in _pairs(nav_mesh, cluster_size, seed=cluster_size):
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		route = planner.plan(start, goal)
+		if goal not in distance:
+			assert route is None
+			continue
+		# Refinado tramo a tramo, como lo recorre un NPC
+		while not route.is_complete:
+			segment = route.next_segment()
+			assert segment is not None
+			assert route.nodes[route.segment_start:] == segment
+		path_nodes = route.full_path()
+		assert path_nodes[0] == start and path_nodes[-1] == goal
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) <= distance[goal] + 1e-6
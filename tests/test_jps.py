@@ -0,0 +1,128 @@
+import heapq
+import math
+import random
+from types import SimpleNamespace
+import pygame
+import pytest
+from imports.map.mapa import load_obstacles, merge_obstacles
+from imports.pathfinding.jps import GridPlanner, SQRT2
+
+CELL = 8
+
+def _grid_planner(rows):
+	"""GridPlanner sobre una rejilla dibujada a mano: '#' bloqueada, '.' libre (una celda por carácter)."""
+	obstacles = [
+		('rect', pygame.Rect(cx * CELL, cy * CELL, CELL, CELL))
+		for cy, row in enumerate(rows) for cx, char in enumerate(row) if char == '#'
+	]
+	game_map = SimpleNamespace(width_pixels=len(rows[0]) * CELL, height_pixels=len(rows) * CELL, obstacles=obstacles)
+	return GridPlanner(game_map, cell_size=CELL)
+
+def _grid_a_star(planner, start, goal):
+	"""A* de 8 direcciones celda a celda, sin cortar esquinas: coste óptimo (en celdas) o None."""
+	def octile(cell):
+		dx, dy = abs(cell[0] - goal[0]), abs(cell[1] - goal[1])
+		return max(dx, dy) + (SQRT2 - 1.0) * min(dx, dy)
+
+	g_score = {start: 0.0}
+	open_set = [(octile(start), start)]
+	closed = set()
+	while open_set:
+		_, current = heapq.heappop(open_set)
+		if current in closed:
+			continue
+		if current == goal:
+			return g_score[current]
+		closed.add(current)
+		x, y = current
+		for dx in (-1, 0, 1):
+			for dy in (-1, 0, 1):
+				neighbor = (x + dx, y + dy)
+				if not (dx or dy) or not _free(planner, *neighbor):
+					continue
+				if dx and dy and not (_free(planner, x + dx, y) and _free(planner, x, y + dy)):
+					continue
+				tentative_g_score = g_score[current] + (SQRT2 if dx and dy else 1.0)
+				if tentative_g_score < g_score.get(neighbor, math.inf):
+					g_score[neighbor] = tentative_g_score
+					heapq.heappush(open_set, (tentative_g_score + octile(neighbor), neighbor))
+	return None
+
+def _free(planner, cx, cy):
+	return 0 <= cx < planner.width and 0 <= cy < planner.height and planner.is_walkable(cx, cy)
+
+def _walk_cost(planner, path):
+	"""Recorre el camino celda a celda entre puntos de salto (rectas u octogonales, sin cortar esquinas)."""
+	cost = 0.0
+	for (x0, y0), (x1, y1) in zip(path, path[1:]):
+		dx, dy = x1 - x0, y1 - y0
+		assert dx == 0 or dy == 0 or abs(dx) == abs(dy), ((x0, y0), (x1, y1))
+		sx, sy = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+		x, y = x0, y0
+		while (x, y) != (x1, y1):
+			if sx and sy:
+				assert _free(planner, x + sx, y) and _free(planner, x, y + sy)
+			x, y = x + sx, y + sy
+			assert _free(planner, x, y)
+			cost += SQRT2 if sx and sy else 1.0
+	return cost
+
+def _check_pairs(planner, pairs):
+	for start, goal in pairs:
+		expected = _grid_a_star(planner, start, goal)
+		path = planner.find_path(start, goal)
+		if expected is None:
+			assert path is None
+			continue
+		assert path[0] == start and path[-1] == goal
+		assert _walk_cost(planner, path) == pytest.approx(expected, abs=1e-9)
+		assert planner.path_length(path) == pytest.approx(expected * CELL, abs=1e-6)
+
+HAND_GRIDS = [
+	# Huecos diagonales: las celdas libres sólo se tocan por una esquina y no se puede pasar
+	[
+		"....#....",
+		"....#....",
+		"...#.....",
+		"..#......",
+		".#.......",
+	],
+	# Paredes en zigzag con pasos diagonales abiertos y cerrados
+	[
+		"..........",
+		".####.###.",
+		".#......#.",
+		".#.####.#.",
+		".#.#..#.#.",
+		".#.#.##.#.",
+		".#...#..#.",
+		".#####.##.",
+		"..........",
+	],
+	# Diagonal de obstáculos aislados: cada hueco entre dos de ellos es de esquina
+	[
+		"#.........",
+		".#........",
+		"..#.......",
+		"...#......",
+		"....#.....",
+		".....#....",
+	],
+]
+
+@pytest.mark.parametrize("rows", HAND_GRIDS)
+def test_jps_matches_grid_a_star_on_hand_grids(rows):
+	planner = _grid_planner(rows)
+	cells = [(cx, cy) for cy in range(planner.height) for cx in range(planner.width) if planner.is_walkable(cx, cy)]
+	_check_pairs(planner, [(start, goal) for start in cells for goal in cells])
+
+def test_jps_matches_grid_a_star_on_map(tmx_data):
+	game_map = SimpleNamespace(
+		width_pixels=tmx_data.width * tmx_data.tilewidth,
+		height_pixels=tmx_data.height * tmx_data.tileheight,
+		obstacles=merge_obstacles(load_obstacles(tmx_data)),
+	)
+	planner = GridPlanner(game_map)
+	cells = [(cx, cy) for cy in range(planner.height) for cx in range(planner.width) if planner.is_walkable(cx, cy)]
+	rng = random.Random(12)
+	_check_pairs(planner, [(rng.choice(cells), rng.choice(cells)) for _ in range(40)])
@@ -0,0 +1,103 @@
+import random
+import numpy as np
+import pygame
+import pytest
+import pytmx
+from shapely.geometry import box
+from shapely.ops import unary_union
+from reference import nested_loop_obstacles
+from imports.map.mapa import build_gid_index, load_obstacles, merge_rects
+
+def _assert_same_coverage(rects, merged):
+	original = unary_union([box(r.left, r.top, r.right, r.bottom) for r in rects if r.width > 0 and r.height > 0])
+	shapes = [box(r.left, r.top, r.right, r.bottom) for r in merged]
+	# Misma área cubierta y sin solapes entre los rectángulos resultantes
+	assert original.symmetric_difference(unary_union(shapes)).area == 0
+	assert sum(shape.area for shape in shapes) == original.area
+
+def test_merge_rects_random_tiles():
+	rng = random.Random(6)
+	for _ in range(50):
+		rects = []
+		for _ in range(rng.randrange(1, 80)):
+			x, y = rng.randrange(16) * 16, rng.randrange(16) * 16
+			# Colisionadores de tile enteros o de medio tile (mitad superior, inferior, izquierda o derecha)
+			left, top, width, height = rng.choice([(0, 0, 16, 16), (0, 0, 16, 8), (0, 8, 16, 8), (0, 0, 8, 16), (8, 0, 8, 16)])
+			rects.append(pygame.Rect(x + left, y + top, width, height))
+		# Duplicados
+		rects.append(rects[0].copy())
+		merged = merge_rects(rects)
+		_assert_same_coverage(rects, merged)
+		assert len(merged) <= len(rects)
+
+def test_merge_rects_map_colliders(tmx_data):
+	rects = [shape for kind, shape in load_obstacles(tmx_data) if kind == 'rect']
+	merged = merge_rects(rects)
+	_assert_same_coverage(rects, merged)
+	assert len(merged) < len(rects)
+
+def test_merge_rects_empty():
+	assert merge_rects([]) == []
+	assert merge_rects([pygame.Rect(0, 0, 0, 16)]) == []
+
+# Tileset con colisionadores rectangulares, poligonales (vértices con decimales) y varios por tile;
+# el tile 3 no tiene colisionador
+SYNTHETIC_TILESET = """
+ <tileset firstgid="1" name="prueba" tilewidth="16" tileheight="16" tilecount="5" columns="5">
+  <tile id="0"><objectgroup><object id="1" x="0" y="0" width="16" height="8"/></objectgroup></tile>
+  <tile id="1"><objectgroup>
+   <object id="2" x="2.5" y="1.5"><polygon points="0,0 10.5,0 5.25,7.75"/></object>
+   <object id="3" x="0" y="12" width="16" height="4"/>
+  </objectgroup></tile>
+  <tile id="3"><objectgroup><object id="4" x="4.5" y="4" width="7.5" height="8"/></objectgroup></tile>
+  <tile id="4"><objectgroup><object id="5" x="8" y="0"><polygon points="0,0 8,8 0,16"/></object></objectgroup></tile>
+ </tileset>
+"""
+
+def _synthetic_tmx(path, rng, width, height):
+	"""Mapa de Tiled con una capa de suelo y la capa "estructuras" rellena al azar (con huecos, gid 0)."""
+	def csv(gids):
+		return ",\n".join(",".join(str(gid) for gid in gids[y * width:(y + 1) * width]) for y in range(height))
+
+	walls = [rng.choice([0, 0, 1, 2, 3, 4, 5]) for _ in range(width * height)]
+	floor = [rng.choice([1, 4]) for _ in range(width * height)]
+	path.write_text(f"""<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.10" orientation="orthogonal" renderorder="right-down" width="{width}" height="{height}" tilewidth="16" tileheight="16" infinite="0" nextlayerid="3" nextobjectid="6">
+{SYNTHETIC_TILESET}
+ <layer id="1" name="suelo" width="{width}" height="{height}"><data encoding="csv">
+{csv(floor)}
+</data></layer>
+ <layer id="2" name="estructuras" width="{width}" height="{height}"><data encoding="csv">
+{csv(walls)}
+</data></layer>
+</map>
+""")
+	return pytmx.TiledMap(str(path))
+
+def test_load_obstacles_matches_nested_loop(tmx_data):
+	obstacles = load_obstacles(tmx_data)
+	assert obstacles
+	assert obstacles == nested_loop_obstacles(tmx_data)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_load_obstacles_matches_nested_loop_on_synthetic_map(tmp_path, seed):
+	rng = random.Random(seed)
+	tmx = _synthetic_tmx(tmp_path / "prueba.tmx", rng, rng.randrange(5, 30), rng.randrange(5, 30))
+	obstacles = load_obstacles(tmx)
+	assert {kind for kind, _ in obstacles} == {'rect', 'poly'}
+	assert obstacles == nested_loop_obstacles(tmx)
+
+def test_build_gid_index_matches_scan():
+	rng = np.random.default_rng(4)
+	for height, width in [(1, 1), (1, 7), (6, 1), (13, 9), (40, 55)]:
+		gids = rng.integers(0, 6, size=(height, width))
+		expected = {}
+		for y in range(height):
+			for x in range(width):
+				if gids[y, x]:
+					expected.setdefault(int(gids[y, x]), []).append((x, y))
+		index = build_gid_index(gids)
+		assert set(index) == set(expected)
+		for gid, (xs, ys) in index.items():
+			assert list(zip(xs.tolist(), ys.tolist())) == expected[gid]
+	assert build_gid_index(np.zeros((3, 4), dtype=np.int64)) == {}
@@ -0,0 +1,44 @@
+import numpy as np
+from conftest import build_nav_mesh
+from imports.mesh_cache import read_cache, write_cache
+from imports.pathfinding.dijkstra import edge_key
+
+def test_cache_round_trip(tmp_path):
+	arrays = {
+		'ids': np.arange(7, dtype=np.int64),
+		'points': np.linspace(0, 1, 10, dtype=np.float64).reshape(5, 2),
+		'flags': np.array([1, 0, 1], dtype=np.uint8),
+		'empty': np.zeros((0, 2), dtype=np.int32),
+	}
+	meta = {'version': 3, 'nodes': [1, 2, 3]}
+	path = tmp_path / "nav_mesh.cache"
+	write_cache(path, "clave", meta, arrays)
+	assert read_cache(path, "otra clave") is None
+	assert read_cache(tmp_path / "no_existe.cache", "clave") is None
+	cached_meta, cached_arrays = read_cache(path, "clave")
+	assert cached_meta == meta
+	assert cached_arrays.keys() == arrays.keys()
+	for name, array in arrays.items():
+		assert cached_arrays[name].dtype == array.dtype
+		assert np.array_equal(cached_arrays[name], array)
+
+def test_nav_mesh_cache_round_trip(tmp_path, nav_mesh):
+	path = tmp_path / "nav_mesh.cache"
+	nav_mesh.save_to_cache(path, "clave")
+	meta, arrays = read_cache(path, "clave")
+	node_ids = arrays['node_ids'].tolist()
+	assert node_ids == list(nav_mesh.nodes)
+	assert [tuple(c) for c in arrays['centroids'].tolist()] == [nav_mesh.nodes[node_id] for node_id in node_ids]
+	assert [tuple(edge) for edge in arrays['edges'].tolist()] == list(nav_mesh.edges)
+	assert [tuple(map(tuple, portal)) for portal in arrays['portals'].tolist()] == [tuple(map(tuple, nav_mesh.portals[edge_key(*edge)])) for edge in nav_mesh.edges]
+	assert meta['landmarks']['count'] == nav_mesh.landmarks['count']
+
+def test_nav_mesh_uses_its_cache_path(tmp_path, tmx_data):
+	path = tmp_path / "nav_mesh.cache"
+	built = build_nav_mesh(tmx_data, cache_path=path, landmark_count=4)
+	assert path.exists()
+	loaded = build_nav_mesh(tmx_data, cache_path=path, landmark_count=4)
+	assert loaded.nodes == built.nodes
+	assert loaded.edges == built.edges
+	assert loaded.portals == built.portals
+	assert loaded.landmarks['count'] == 4
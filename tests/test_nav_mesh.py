@@ -0,0 +1,122 @@
+import random
+import pytest
+from shapely import STRtree
+from shapely.geometry import Point
+from conftest import build_nav_mesh
+from reference import dijkstra_distances, walk_cost
+from imports import nav_mesh as nav_mesh_module
+from imports.nav_mesh import portal_from_intersection
+from imports.pathfinding.dijkstra import edge_key
+
+def _bfs_components(graph):
+	components = []
+	seen = set()
+	for node_id in graph:
+		if node_id in seen:
+			continue
+		component = {node_id}
+		frontier = [node_id]
+		while frontier:
+			for neighbor_id in graph[frontier.pop()]:
+				if neighbor_id not in component:
+					component.add(neighbor_id)
+					frontier.append(neighbor_id)
+		seen |= component
+		components.append(frozenset(component))
+	return set(components)
+
+def _labelled_components(nav_mesh):
+	groups = {}
+	for node_id, label in nav_mesh.components.items():
+		groups.setdefault(label, set()).add(node_id)
+	return {frozenset(group) for group in groups.values()}
+
+@pytest.fixture(scope="module")
+def table_nav_mesh(tmx_data):
+	return build_nav_mesh(tmx_data, build_path_table=True)
+
+def test_path_table_matches_dijkstra(table_nav_mesh):
+	nav_mesh = table_nav_mesh
+	for start in list(nav_mesh.nodes)[::25]:
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		for goal in nav_mesh.nodes:
+			path_nodes = nav_mesh.path(start, goal)
+			if goal not in distance:
+				assert path_nodes is None
+				continue
+			assert nav_mesh.distance(start, goal) == pytest.approx(distance[goal], abs=1e-6)
+			assert path_nodes[0] == start and path_nodes[-1] == goal
+			assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(distance[goal], abs=1e-6)
+
+def test_locate_many_matches_shapely(nav_mesh):
+	polygons = {node_id: nav_mesh.nav_polygons[node_id] for node_id in nav_mesh.nodes}
+	xs = [x for polygon in polygons.values() for x in polygon.bounds[0::2]]
+	ys = [y for polygon in polygons.values() for y in polygon.bounds[1::2]]
+	rng = random.Random(4)
+	positions = [(rng.uniform(min(xs) - 32, max(xs) + 32), rng.uniform(min(ys) - 32, max(ys) + 32)) for _ in range(3000)]
+	node_ids = list(nav_mesh.nodes)
+	tree = STRtree(list(polygons.values()))
+	for hints in (None, [rng.choice(node_ids) for _ in positions]):
+		for position, node_id in zip(positions, nav_mesh.locate_many(positions, hints)):
+			point = Point(position)
+			if node_id is None:
+				# Para un punto, intersects equivale a estar dentro o en el borde de algún polígono
+				assert len(tree.query(point, predicate='intersects')) == 0
+			else:
+				assert polygons[node_id].buffer(1e-6).covers(point)
+
+def test_components_follow_block_and_unblock(own_nav_mesh):
+	nav_mesh = own_nav_mesh
+	assert _labelled_components(nav_mesh) == _bfs_components(nav_mesh.graph)
+	rng = random.Random(5)
+	# Aislar nodos enteros parte el grafo; el resto de bloqueos son aristas sueltas al azar
+	blocked = []
+	for node_id in rng.sample(list(nav_mesh.nodes), 5):
+		for neighbor_id in list(nav_mesh.graph[node_id]):
+			assert nav_mesh.block_edge(node_id, neighbor_id)
+			blocked.append((node_id, neighbor_id))
+	for id1, id2 in rng.sample(nav_mesh.edges, 150):
+		if nav_mesh.block_edge(id1, id2):
+			blocked.append((id1, id2))
+		assert _labelled_components(nav_mesh) == _bfs_components(nav_mesh.graph)
+	assert len(_labelled_components(nav_mesh)) > 5
+	rng.shuffle(blocked)
+	for id1, id2 in blocked:
+		assert nav_mesh.unblock_edge(id1, id2)
+		assert _labelled_components(nav_mesh) == _bfs_components(nav_mesh.graph)
+	assert not nav_mesh.blocked_edges
+	assert {edge_key(id1, id2) for id1 in nav_mesh.graph for id2 in nav_mesh.graph[id1]} == {edge_key(*edge) for edge in nav_mesh.edges}
+
+def test_is_reachable_matches_components(own_nav_mesh):
+	nav_mesh = own_nav_mesh
+	node_id = next(iter(nav_mesh.nodes))
+	for neighbor_id in list(nav_mesh.graph[node_id]):
+		nav_mesh.block_edge(node_id, neighbor_id)
+	other_id = next(other_id for other_id in nav_mesh.nodes if other_id != node_id)
+	assert nav_mesh.is_reachable(node_id, node_id)
+	assert not nav_mesh.is_reachable(node_id, other_id)
+
+def _pairwise_edges(nav_mesh):
+	"""Aristas y portales comparando todos los pares de polígonos con intersects, sin índice espacial."""
+	polygon_ids = list(nav_mesh.nav_polygons.keys())
+	polygons = [nav_mesh.nav_polygons[node_id] for node_id in polygon_ids]
+	edges = []
+	portals = {}
+	for i in range(len(polygons)):
+		for j in range(i + 1, len(polygons)):
+			if not polygons[i].intersects(polygons[j]):
+				continue
+			intersection = polygons[i].intersection(polygons[j])
+			if intersection.length > 0:
+				edges.append((polygon_ids[i], polygon_ids[j]))
+				portals[edge_key(polygon_ids[i], polygon_ids[j])] = portal_from_intersection(intersection)
+	return edges, portals
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_build_edges_matches_pairwise(tmx_data, nav_mesh, monkeypatch, parallel):
+	# Con 0 cualquier número de pares candidatos va al pool de procesos; sin límite, nunca
+	monkeypatch.setattr(nav_mesh_module, "PARALLEL_PORTAL_PAIRS", 0 if parallel else float('inf'))
+	built = build_nav_mesh(tmx_data)
+	edges, portals = _pairwise_edges(nav_mesh)
+	assert built.edges == edges
+	assert built.portals == portals
@@ -0,0 +1,45 @@
+import random
+from types import SimpleNamespace
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.nav_mesh import index_by_node
+
+def _objects(nav_mesh, rng, count):
+	# Varios objetos comparten nodo: se eligen entre pocos nodos
+	node_ids = rng.sample(list(nav_mesh.nodes), count // 2)
+	return [SimpleNamespace(name=i, node_id=rng.choice(node_ids)) for i in range(count)]
+
+@pytest.mark.parametrize("k", [1, 3, 8])
+@pytest.mark.parametrize("max_distance", [float('inf'), 400.0])
+def test_nearest_objects_match_full_dijkstra(nav_mesh, k, max_distance):
+	rng = random.Random(11)
+	for _ in range(20):
+		objects = _objects(nav_mesh, rng, 12)
+		# Uno sin nodo y otro excluido por el filtro no cuentan nunca
+		objects.append(SimpleNamespace(name='sin nodo', node_id=None))
+		objects.append(SimpleNamespace(name='excluido', node_id=objects[0].node_id, hidden=True))
+		objects_by_node = index_by_node(objects, lambda obj: not getattr(obj, 'hidden', False))
+		start = rng.choice(list(nav_mesh.nodes))
+
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		expected = sorted(
+			distance[node_id]
+			for node_id, node_objects in objects_by_node.items() for _ in node_objects
+			if node_id in distance and distance[node_id] <= max_distance
+		)[:k]
+
+		nearest = nav_mesh.nearest_objects(start, objects_by_node, k, max_distance)
+		assert [d for _, d, _ in nearest] == pytest.approx(expected, abs=1e-6)
+		assert len({id(obj) for obj, _, _ in nearest}) == len(nearest)
+		for obj, d, path_nodes in nearest:
+			assert obj in objects_by_node[obj.node_id]
+			assert d == pytest.approx(distance[obj.node_id], abs=1e-6)
+			assert path_nodes[0] == start and path_nodes[-1] == obj.node_id
+			assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(d, abs=1e-6)
+
+def test_objects_on_start_node(nav_mesh):
+	start = next(iter(nav_mesh.nodes))
+	objects = [SimpleNamespace(name=i, node_id=start) for i in range(3)]
+	nearest = nav_mesh.nearest_objects(start, index_by_node(objects), k=2)
+	assert [(obj.name, d, path_nodes) for obj, d, path_nodes in nearest] == [(0, 0.0, (start,)), (1, 0.0, (start,))]
+	assert nav_mesh.nearest_objects(start, {}, k=2) == []
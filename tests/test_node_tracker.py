@@ -0,0 +1,76 @@
+import math
+import random
+import pytest
+from imports.pathfinding.node_tracker import NodeTracker
+from imports.pathfinding.path_planner import PathPlanner
+
+SMALL_STEP = 2.0
+# Más largo que varios polígonos: obliga a recorrer varios portales o a recurrir al índice espacial
+LARGE_STEP = 60.0
+
+def _containing(nav_mesh, position):
+	"""Todos los polígonos que contienen position (hay polígonos solapados y bordes compartidos)."""
+	cell_size = nav_mesh.spatial_index['cell_size']
+	cell = (int(position[0] // cell_size), int(position[1] // cell_size))
+	return {node_id for node_id in nav_mesh.spatial_index['cells'].get(cell, ()) if nav_mesh.contains_point(node_id, *position)}
+
+def _assert_agrees(nav_mesh, node_id, position):
+	"""node_id coincide con find_node_at_position, salvo donde varios polígonos contienen el punto."""
+	expected = nav_mesh.find_node_at_position(position)
+	containing = _containing(nav_mesh, position)
+	if expected is None or len(containing) == 1:
+		assert node_id == expected, position
+	else:
+		assert node_id in containing, position
+
+def _smoothed_walks(nav_mesh, count, seed):
+	planner = PathPlanner(nav_mesh, cache_size=0)
+	rng = random.Random(seed)
+	node_ids = list(nav_mesh.nodes)
+	walks = []
+	while len(walks) < count:
+		start, goal = rng.choice(node_ids), rng.choice(node_ids)
+		path_nodes = planner.find_path(start, goal)
+		if path_nodes and len(path_nodes) > 1:
+			walks.append((start, nav_mesh.smooth_path(nav_mesh.nodes[start], nav_mesh.nodes[goal], path_nodes)))
+	return walks
+
+def _positions(corners, step):
+	for a, b in zip(corners, corners[1:]):
+		count = max(1, math.ceil(math.dist(a, b) / step))
+		for i in range(1, count + 1):
+			yield (a[0] + (b[0] - a[0]) * i / count, a[1] + (b[1] - a[1]) * i / count)
+
+@pytest.mark.parametrize("step", [SMALL_STEP, LARGE_STEP])
+def test_update_agrees_with_find_node_at_position(nav_mesh, step):
+	walks = 0
+	fallbacks = 0
+	for start, corners in _smoothed_walks(nav_mesh, 20, seed=13):
+		tracker = NodeTracker(nav_mesh, start, nav_mesh.nodes[start])
+		for position in _positions(corners, step):
+			_assert_agrees(nav_mesh, tracker.update(position), position)
+		walks += tracker.walks
+		fallbacks += tracker.fallbacks
+	assert walks
+	if step == LARGE_STEP:
+		assert fallbacks
+
+@pytest.mark.parametrize("step", [SMALL_STEP, LARGE_STEP])
+def test_track_with_batch_fallback(nav_mesh, step):
+	# Como Game._locate_agents: track() y, si no encuentra el nodo, locate_many en lote
+	lost = 0
+	for start, corners in _smoothed_walks(nav_mesh, 20, seed=14):
+		tracker = NodeTracker(nav_mesh, start, nav_mesh.nodes[start])
+		node_id = start
+		for position in _positions(corners, step):
+			tracked = tracker.track(position, node_id)
+			if tracked is None:
+				lost += 1
+				tracked = nav_mesh.locate_many([position])[0]
+				tracker.reset(tracked, position)
+			else:
+				assert nav_mesh.contains_point(tracked, *position)
+			_assert_agrees(nav_mesh, tracked, position)
+			node_id = tracked
+	if step == LARGE_STEP:
+		assert lost
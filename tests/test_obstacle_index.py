@@ -0,0 +1,110 @@
+import math
+import random
+import pygame
+import pytest
+from reference import linear_overlaps, linear_segment_hits
+from imports.map.mapa import load_obstacles, merge_obstacles
+from imports.map.obstacle_index import OBSTACLE_CELL_SIZE, ObstacleIndex
+from imports.moves.kinematic import Kinematic
+
+def _key(kind, shape):
+	return kind, tuple(tuple(p) if isinstance(p, tuple) else p for p in shape)
+
+def _synthetic_obstacles(rng, cell_size):
+	"""Rects que cruzan los bordes de las celdas, triángulos sueltos y una lista 'edges' con aristas largas."""
+	obstacles = []
+	for _ in range(60):
+		# Centrado sobre una línea de la rejilla o con un borde justo encima de ella
+		border_x, border_y = rng.randrange(1, 8) * cell_size, rng.randrange(1, 8) * cell_size
+		width, height = rng.randrange(1, 2 * cell_size), rng.randrange(1, 2 * cell_size)
+		left = rng.choice([border_x - width // 2, border_x, border_x - width, rng.randrange(8 * cell_size)])
+		top = rng.choice([border_y - height // 2, border_y, border_y - height, rng.randrange(8 * cell_size)])
+		obstacles.append(('rect', pygame.Rect(left, top, width, height)))
+	for _ in range(15):
+		x, y = rng.randrange(8 * cell_size), rng.randrange(8 * cell_size)
+		obstacles.append(('poly', [(x, y), (x + rng.randrange(1, cell_size), y + rng.randrange(-cell_size, cell_size)), (x + rng.randrange(-cell_size, cell_size), y + rng.randrange(1, cell_size))]))
+	edges = []
+	for _ in range(30):
+		x, y = rng.randrange(8 * cell_size), rng.randrange(8 * cell_size)
+		length = rng.choice([cell_size // 4, cell_size, 5 * cell_size])
+		edges.append(((x, y), (x + rng.randrange(-length, length + 1), y + rng.randrange(-length, length + 1))))
+	obstacles.append(('edges', [(p, q) for p, q in edges if p != q]))
+	rng.shuffle(obstacles)
+	return obstacles
+
+def _random_rect(rng, cell_size, extent):
+	width, height = rng.randrange(1, 3 * cell_size), rng.randrange(1, 3 * cell_size)
+	if rng.random() < 0.5:
+		# Cruzando o tocando un borde de celda
+		border_x, border_y = rng.randrange(extent // cell_size + 1) * cell_size, rng.randrange(extent // cell_size + 1) * cell_size
+		return pygame.Rect(border_x - rng.randrange(width + 1), border_y - rng.randrange(height + 1), width, height)
+	return pygame.Rect(rng.randrange(-cell_size, extent), rng.randrange(-cell_size, extent), width, height)
+
+def _random_point(rng, cell_size, extent):
+	if rng.random() < 0.3:
+		# Sobre una línea de la rejilla
+		return float(rng.randrange(extent // cell_size + 1) * cell_size), rng.uniform(0, extent)
+	return rng.uniform(-cell_size, extent), rng.uniform(-cell_size, extent)
+
+def _check_rects(obstacles, index, rng, cell_size, extent, count):
+	kinematic = Kinematic(pygame.Vector2(), pygame.Vector2(), 0.0, 0.0)
+	hits = 0
+	for _ in range(count):
+		rect = _random_rect(rng, cell_size, extent)
+		expected = linear_overlaps(obstacles, rect)
+		assert [_key(*shape) for shape in index.overlaps(rect)] == [_key(*shape) for shape in expected]
+		first = expected[0] if expected else (None, None)
+		assert index.first_hit(rect) == first
+		# Kinematic con la lista: la misma forma (las aristas de 'edges' las devuelve como kind 'edges')
+		assert kinematic._get_colliding_obstacle(rect, obstacles)[1] == first[1]
+		hits += bool(expected)
+	assert hits
+
+def _check_segments(obstacles, index, rng, cell_size, extent, count):
+	hits = 0
+	for _ in range(count):
+		a, b = _random_point(rng, cell_size, extent), _random_point(rng, cell_size, extent)
+		if rng.random() < 0.1:
+			b = a
+		expected = linear_segment_hits(obstacles, a, b)
+		found = index.query_segment(a, b)
+		assert [math.dist(a, point) for point, _, _ in found] == pytest.approx([d for d, _, _ in expected], abs=1e-6)
+		# Con distancias empatadas el orden puede variar: se comparan como multiconjunto
+		assert sorted(_key(kind, shape) for _, kind, shape in found) == sorted(_key(kind, shape) for _, kind, shape in expected)
+		if expected and (len(expected) == 1 or expected[1][0] - expected[0][0] > 1e-6):
+			assert _key(*found[0][1:]) == _key(*expected[0][1:])
+		hits += bool(expected)
+	assert hits
+
+@pytest.fixture(scope="module")
+def map_obstacles(tmx_data):
+	extent = max(tmx_data.width * tmx_data.tilewidth, tmx_data.height * tmx_data.tileheight)
+	return merge_obstacles(load_obstacles(tmx_data)), extent
+
+def test_map_obstacles_have_edges(map_obstacles):
+	obstacles, _ = map_obstacles
+	assert {kind for kind, _ in obstacles} == {'rect', 'edges'}
+
+@pytest.mark.parametrize("cell_size", [16, OBSTACLE_CELL_SIZE, 100])
+def test_queries_match_linear_scan_on_map(map_obstacles, cell_size):
+	obstacles, extent = map_obstacles
+	index = ObstacleIndex(obstacles, cell_size)
+	rng = random.Random(cell_size)
+	_check_rects(obstacles, index, rng, cell_size, extent, 600)
+	_check_segments(obstacles, index, rng, cell_size, extent, 150)
+
+@pytest.mark.parametrize("cell_size", [16, OBSTACLE_CELL_SIZE])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_queries_match_linear_scan_on_synthetic_obstacles(cell_size, seed):
+	rng = random.Random(seed)
+	obstacles = _synthetic_obstacles(rng, cell_size)
+	index = ObstacleIndex(obstacles, cell_size)
+	assert len(index) == len(obstacles) - 1 + len(obstacles[[kind for kind, _ in obstacles].index('edges')][1])
+	_check_rects(obstacles, index, rng, cell_size, 8 * cell_size, 400)
+	_check_segments(obstacles, index, rng, cell_size, 8 * cell_size, 200)
+
+def test_empty_index():
+	index = ObstacleIndex([])
+	assert index.overlaps(pygame.Rect(0, 0, 10, 10)) == []
+	assert index.first_hit(pygame.Rect(0, 0, 10, 10)) == (None, None)
+	assert index.query_segment((0, 0), (100, 100)) == []
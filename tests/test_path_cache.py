@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from imports.pathfinding.path_cache import PathCache
+
+# Caminos de un grafo pequeño: 0-1-2-3-4 en línea y 5 colgando de 2
+LINE = (0, 1, 2, 3, 4)
+
+def _small_cache(capacity):
+	# PathCache sólo consulta la versión de la malla
+	return PathCache(SimpleNamespace(version=0), capacity)
+
+def test_lru_evicts_least_recently_used():
+	cache = _small_cache(2)
+	cache.put(0, 1, (0, 1))
+	cache.put(2, 3, (2, 3))
+	# La consulta renueva (0, 1): la más antigua pasa a ser (2, 3)
+	assert cache.get(0, 1) == (0, 1)
+	cache.put(3, 4, (3, 4))
+	assert cache.stats()['size'] == 2
+	assert cache.evictions == 1
+	assert cache.get(2, 3) is None
+	assert cache.get(0, 1) == (0, 1)
+	assert cache.get(3, 4) == (3, 4)
+	# Sin entradas de la meta desalojada que puedan dar un sufijo
+	assert (3, 'default') not in cache._by_goal
+
+def test_suffix_hit_starts_at_queried_start():
+	cache = _small_cache(8)
+	cache.put(0, 4, LINE)
+	assert cache.get(2, 4) == (2, 3, 4)
+	assert cache.subpath_hits == 1
+	# El sufijo queda guardado con su propia clave
+	assert cache.get(2, 4) == (2, 3, 4)
+	assert cache.subpath_hits == 1
+	assert cache.hits == 2
+	# 5 no está en ningún camino hacia 4 y otro perfil no comparte entradas
+	assert cache.get(5, 4) is None
+	assert cache.get(2, 4, 'fast') is None
+	assert cache.misses == 2
+
+def test_suffix_hit_respects_capacity():
+	cache = _small_cache(1)
+	cache.put(0, 4, LINE)
+	assert cache.get(3, 4) == (3, 4)
+	assert cache.stats()['size'] == 1
+	assert cache.get(0, 4) is None
+
+def test_set_edge_cost_clears_cache(own_nav_mesh):
+	node_id = next(iter(own_nav_mesh.nodes))
+	neighbor_id = own_nav_mesh.graph[node_id][0]
+	cache = PathCache(own_nav_mesh, 8)
+	cache.put(node_id, neighbor_id, (node_id, neighbor_id))
+	assert cache.get(node_id, neighbor_id) == (node_id, neighbor_id)
+
+	own_nav_mesh.set_edge_cost(node_id, neighbor_id, 1000.0)
+	assert cache.get(node_id, neighbor_id) is None
+	assert cache.invalidations == 1
+	assert cache.stats()['size'] == 0
+
+	cache.put(node_id, neighbor_id, (node_id, neighbor_id))
+	own_nav_mesh.set_edge_cost(node_id, neighbor_id)
+	assert cache.get(node_id, neighbor_id) is None
+	assert cache.invalidations == 2
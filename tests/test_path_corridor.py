@@ -0,0 +1,47 @@
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.path_corridor import PathCorridor
+from imports.pathfinding.path_planner import PathPlanner
+
+def _step(nav_mesh, rng, node_id, jump_chance):
+	"""Paso de la caminata: a un vecino o, a veces, un salto a cualquier nodo."""
+	if rng.random() < jump_chance or not nav_mesh.graph[node_id]:
+		return rng.choice(list(nav_mesh.nodes))
+	return rng.choice(nav_mesh.graph[node_id])
+
+def _check(nav_mesh, corridor, found, start, goal):
+	reachable = goal in dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+	assert found == reachable
+	if not reachable:
+		return
+	path_nodes = corridor.path_nodes()
+	assert path_nodes[0] == start and path_nodes[-1] == goal
+	# Contiguo sobre el grafo actual (sin aristas bloqueadas)
+	walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes)
+
+@pytest.mark.parametrize("use_planner", [True, False])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_random_walk_keeps_corridor_contiguous(own_nav_mesh, use_planner, seed):
+	nav_mesh = own_nav_mesh
+	rng = random.Random(seed)
+	corridor = PathCorridor(nav_mesh, planner=PathPlanner(nav_mesh, cache_size=0) if use_planner else None)
+	start, goal = rng.choice(list(nav_mesh.nodes)), rng.choice(list(nav_mesh.nodes))
+	_check(nav_mesh, corridor, corridor.advance(start, goal), start, goal)
+	blocked = 0
+	for i in range(150):
+		start = _step(nav_mesh, rng, start, 0.03)
+		goal = _step(nav_mesh, rng, goal, 0.05)
+		path_nodes = corridor.path_nodes()
+		if i % 25 == 24 and len(path_nodes) > 1:
+			# Bloquear una arista del corredor obliga a replanificar
+			middle = len(path_nodes) // 2
+			replans = corridor.replans
+			assert nav_mesh.block_edge(path_nodes[middle - 1], path_nodes[middle])
+			blocked += 1
+			found = corridor.advance(start, goal)
+			_check(nav_mesh, corridor, found, start, goal)
+			assert corridor.replans == replans + 1 or not found
+			continue
+		_check(nav_mesh, corridor, corridor.advance(start, goal), start, goal)
+	assert blocked and corridor.patched
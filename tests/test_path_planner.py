@@ -0,0 +1,45 @@
+import math
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.path_planner import PathPlanner, QUALITY_PROFILES
+
+def _random_pairs(nav_mesh, count, seed):
+	node_ids = list(nav_mesh.nodes)
+	rng = random.Random(seed)
+	return [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(count)]
+
+@pytest.mark.parametrize("heuristic", ['euclidean', 'alt'])
+def test_default_paths_are_optimal(nav_mesh, heuristic):
+	planner = PathPlanner(nav_mesh, cache_size=0, heuristic=heuristic)
+	for start, goal in _random_pairs(nav_mesh, 150, seed=1):
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		path_nodes = planner.find_path(start, goal)
+		if goal not in distance:
+			assert path_nodes is None
+			continue
+		assert path_nodes[0] == start and path_nodes[-1] == goal
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) == pytest.approx(distance[goal], abs=1e-6)
+
+@pytest.mark.parametrize("profile", ['fast', 'rough'])
+def test_weighted_paths_are_bounded(nav_mesh, profile):
+	planner = PathPlanner(nav_mesh, cache_size=0, heuristic='alt')
+	for start, goal in _random_pairs(nav_mesh, 100, seed=2):
+		path_nodes = planner.find_path(start, goal, profile)
+		if path_nodes is None or planner.last_partial:
+			continue
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, path_nodes) <= QUALITY_PROFILES[profile]['epsilon'] * distance[goal] + 1e-6
+
+def test_alt_heuristic_is_admissible(nav_mesh):
+	planner = PathPlanner(nav_mesh, cache_size=0, heuristic='alt')
+	assert planner.landmark_rows is not None
+	rng = random.Random(3)
+	for goal_id in rng.sample(planner.node_ids, 20):
+		# Grafo no dirigido: las distancias desde la meta son las distancias hasta ella
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, goal_id)
+		goal = planner.index[goal_id]
+		for start in (None, rng.randrange(len(planner.node_ids))):
+			heuristic = planner.heuristic_to(goal, start)
+			for node_id, i in planner.index.items():
+				assert heuristic(i) <= distance.get(node_id, math.inf) + 1e-6
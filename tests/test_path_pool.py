@@ -0,0 +1,26 @@
+from imports.pathfinding.path_planner import PathPlanner
+from imports.pathfinding.path_pool import MeshSnapshot, PathWorkerPool
+
+def test_snapshot_matches_nav_mesh(nav_mesh):
+	snapshot = MeshSnapshot(nav_mesh)
+	ids = list(nav_mesh.nodes)
+	assert snapshot.landmarks is nav_mesh.landmarks
+	assert snapshot.is_reachable(ids[0], ids[-1]) == nav_mesh.is_reachable(ids[0], ids[-1])
+	assert all(snapshot.edge_cost(a, b) == nav_mesh.edge_cost(a, b) for a in ids[:50] for b in nav_mesh.graph[a])
+
+def test_pool_round_trip_matches_planner(nav_mesh):
+	ids = list(nav_mesh.nodes)
+	requests = [(ids[i], ids[-1 - i]) for i in range(0, 200, 7)]
+	planner = PathPlanner(nav_mesh, cache_size=0, heuristic='alt')
+	pool = PathWorkerPool(nav_mesh, planner=planner)
+	try:
+		futures = pool.submit_many(requests)
+		for profile in ('fast', 'rough'):
+			futures += [pool.submit(start, goal, profile) for start, goal in requests[:5]]
+		results = [future.result(timeout=60) for future in futures]
+	finally:
+		pool.shutdown()
+	expected = [planner.find_path(start, goal) for start, goal in requests]
+	expected += [planner.find_path(start, goal, profile) for profile in ('fast', 'rough') for start, goal in requests[:5]]
+	assert results == expected
+	assert all(path is not None for path in results)
@@ -0,0 +1,114 @@
+import math
+import random
+import pytest
+from reference import dijkstra_distances, walk_cost
+from imports.pathfinding.path_planner import PathPlanner, QUALITY_PROFILES
+from imports.pathfinding.path_queue import PathRequestQueue, PathSearch
+
+# Presupuesto mínimo para que cada búsqueda se reparta entre muchos ticks
+BUDGET_MS = 0.05
+# Margen sobre el presupuesto: el reloj se consulta cada 16 expansiones y la entrega va después
+BUDGET_SLACK_MS = 2.0
+
+def _random_pairs(nav_mesh, count, seed):
+	node_ids = list(nav_mesh.nodes)
+	rng = random.Random(seed)
+	return [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(count)]
+
+def _long_pair(nav_mesh, planner, seed):
+	"""El par con el camino de más nodos entre unos cuantos al azar (su búsqueda ocupa varios ticks)."""
+	return max(_random_pairs(nav_mesh, 50, seed), key=lambda pair: len(planner.find_path(*pair) or ()))
+
+def _run(queue, max_ticks=100000):
+	"""Hace tick hasta vaciar la cola. Devuelve cuántos ticks hicieron falta y el mayor tiempo de uno."""
+	ticks = 0
+	slowest = 0.0
+	while len(queue._heap) and ticks < max_ticks:
+		queue.tick()
+		ticks += 1
+		slowest = max(slowest, queue.last_tick_ms)
+	assert not queue._heap
+	return ticks, slowest
+
+@pytest.mark.parametrize("profile", list(QUALITY_PROFILES))
+def test_resumed_search_matches_one_shot(nav_mesh, profile):
+	planner = PathPlanner(nav_mesh, cache_size=0)
+	quality = QUALITY_PROFILES[profile]
+	for start, goal in _random_pairs(nav_mesh, 40, seed=3):
+		one_shot = PathSearch(planner, start, goal, quality['epsilon'], quality['max_expansions'])
+		assert one_shot.step(math.inf)
+		resumed = PathSearch(planner, start, goal, quality['epsilon'], quality['max_expansions'])
+		# Plazo ya vencido: cada llamada saca del open set sólo 3 nodos antes de consultar el reloj
+		slices = 1
+		while not resumed.step(0.0, check_every=4):
+			slices += 1
+		assert resumed.path == one_shot.path
+		assert resumed.partial == one_shot.partial
+		assert resumed.expanded == one_shot.expanded
+		if one_shot.path is not None:
+			assert slices >= resumed.expanded // 3
+			cost = walk_cost(nav_mesh.graph, nav_mesh.edge_cost, resumed.path)
+			if profile == 'default':
+				assert cost == pytest.approx(dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)[goal], abs=1e-6)
+
+def test_queue_slices_within_budget(nav_mesh):
+	queue = PathRequestQueue(PathPlanner(nav_mesh, cache_size=0), budget_ms=BUDGET_MS)
+	delivered = {}
+	pairs = _random_pairs(nav_mesh, 20, seed=4)
+	for i, (start, goal) in enumerate(pairs):
+		queue.request(start, goal, lambda path, request, i=i: delivered.setdefault(i, path))
+	ticks, slowest = _run(queue)
+	assert ticks > len(pairs)
+	assert slowest <= BUDGET_MS + BUDGET_SLACK_MS
+	assert sorted(delivered) == list(range(len(pairs)))
+	for i, (start, goal) in enumerate(pairs):
+		distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, delivered[i]) == pytest.approx(distance[goal], abs=1e-6)
+
+def test_queue_serves_by_priority_then_arrival(nav_mesh):
+	queue = PathRequestQueue(PathPlanner(nav_mesh, cache_size=0), budget_ms=BUDGET_MS)
+	order = []
+	pairs = _random_pairs(nav_mesh, 12, seed=5)
+	priorities = [2, 0, 1, 0, 2, 1, 0, 1, 2, 0, 1, 2]
+	for i, ((start, goal), priority) in enumerate(zip(pairs, priorities)):
+		queue.request(start, goal, lambda path, request, i=i: order.append(i), priority=priority)
+	_run(queue)
+	assert order == sorted(range(len(pairs)), key=lambda i: (priorities[i], i))
+
+def test_cancelled_requests_are_not_delivered(nav_mesh):
+	planner = PathPlanner(nav_mesh, cache_size=0)
+	queue = PathRequestQueue(planner, budget_ms=BUDGET_MS)
+	delivered = []
+	pairs = [_long_pair(nav_mesh, planner, seed=6)] + _random_pairs(nav_mesh, 9, seed=6)
+	requests = [queue.request(start, goal, lambda path, request: delivered.append(request)) for start, goal in pairs]
+	# Una antes de empezar y otra a medias de su búsqueda
+	requests[3].cancel()
+	queue.tick()
+	assert requests[0].search is not None and not requests[0].search.finished
+	requests[0].cancel()
+	_run(queue)
+	assert requests[0] not in delivered and requests[3] not in delivered
+	assert len(delivered) == len(pairs) - 2
+
+def test_stale_searches_restart_on_mesh_change(own_nav_mesh):
+	nav_mesh = own_nav_mesh
+	planner = PathPlanner(nav_mesh, cache_size=0)
+	queue = PathRequestQueue(planner, budget_ms=BUDGET_MS)
+	start, goal = _long_pair(nav_mesh, planner, seed=7)
+	old_path = planner.find_path(start, goal)
+	delivered = []
+	request = queue.request(start, goal, lambda path, request: delivered.append(path))
+	queue.tick()
+	assert request.search is not None and not request.search.finished and not delivered
+
+	# La malla cambia con la búsqueda a medias: el camino del grafo anterior no debe entregarse
+	middle = len(old_path) // 2
+	nav_mesh.block_edge(old_path[middle], old_path[middle + 1])
+	_run(queue)
+	assert len(delivered) == 1
+	distance = dijkstra_distances(nav_mesh.graph, nav_mesh.edge_cost, start)
+	if goal not in distance:
+		assert delivered[0] is None
+	else:
+		assert delivered[0] != old_path
+		assert walk_cost(nav_mesh.graph, nav_mesh.edge_cost, delivered[0]) == pytest.approx(distance[goal], abs=1e-6)